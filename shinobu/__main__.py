@@ -22,16 +22,22 @@ import time
 import copy
 import argparse
 import traceback
+import typing
 import ujson as json
 import orjson
 import getpass
 import uuid
+import secrets
+import tomllib
 import asyncio
+import threading
 import discord
+from concurrent.futures import Future, ThreadPoolExecutor
 from discord.ext import commands
 from dotenv import load_dotenv
 from shinobu.runtime import runtime
-from shinobu.runtime.secrets import manager, fine_grained, encryptor
+from shinobu.runtime.secrets import (manager, fine_grained, encryptor, writer, storage, calibration, benchmark, compressor,
+                                    backup, archive, store)
 from shinobu.runtime.models import shinobu_cog
 from shinobu.cli import secrets as secrets_cli, installer as installer_cli
 from shinobu.runtime.secrets.encryptor import EncryptedData
@@ -51,11 +57,23 @@ parser = argparse.ArgumentParser(
 parser.add_argument("--secrets", help="Launches the Secrets Manager CLI.", action="store_true")
 parser.add_argument("--installer", help="Launches the installer CLI.", action="store_true")
 parser.add_argument("--devmode", help="Launches Shinobu with developer mode.", action="store_true")
+parser.add_argument("--benchmark", help="Runs the encryption benchmark suite.", action="store_true")
+parser.add_argument(
+    "--benchmark-output", help="Path to write benchmark results to.", default="benchmark.json"
+)
+parser.add_argument(
+    "--benchmark-max-size", help="Largest payload size to benchmark in bytes.", type=int,
+    default=benchmark.payload_sizes[-1]
+)
+parser.add_argument(
+    "--benchmark-iterations", help="Iterations per benchmark case.", type=int, default=20
+)
 launch_args = parser.parse_args()
 
 # Get launch options
 launch_secrets_cli: bool = launch_args.secrets
 launch_installer_cli: bool = launch_args.installer
+launch_benchmark: bool = launch_args.benchmark
 devmode: bool = launch_args.devmode
 
 # Store restart options
@@ -90,6 +108,30 @@ for plugin in plugins_data:
 
     plugins_data.update({plugin: plugin_data})
 
+def load_secrets_config() -> dict:
+    """Loads secrets manager options from the main config."""
+
+    try:
+        with open("configs/main.toml", "rb") as file:
+            return tomllib.load(file).get("secrets", {})
+    except (FileNotFoundError, tomllib.TOMLDecodeError):
+        return {}
+
+def get_compression_options(secrets_config: dict) -> dict:
+    """Returns compression options for raw encryptors. A compression level of 0 uses the algorithm's default."""
+
+    return {
+        "compression": compressor.resolve(secrets_config.get("compression", "auto")),
+        "compression_level": secrets_config.get("compression_level") or None
+    }
+
+def apply_kdf_memory_budget(secrets_config: dict):
+    """Applies the memory budget for concurrent Argon2 derivations. A budget of 0 uses half of the host's
+    memory."""
+
+    budget: int = secrets_config.get("kdf_memory_budget", 0) * 1048576
+    encryptor.set_kdf_memory_budget(budget or int(encryptor.available_mib * 524288))
+
 def compare_manifests() -> list[str]:
     """Compares manifests to scan for possible changes to the manifest file during reboots.
     DOES NOT protect against changes between shutdowns (i.e. when the bootscript is not running)."""
@@ -141,7 +183,7 @@ def compare_manifests() -> list[str]:
 class SecretsIssuingAuthority:
     """Issues FineGrainedSecrets objects."""
 
-    def __init__(self):
+    def __init__(self, writer_threads: int = 2, container: str = "binary", backup_keep: int = 24):
         self._wrappers_secrets: dict = {}
         self._wrappers_files: dict = {}
         self._wrappers_uuids: dict = {}
@@ -152,6 +194,32 @@ class SecretsIssuingAuthority:
         self._accessed_secrets: set = set()
         self._accessed_files: set = set()
 
+        # Set container format for new writes
+        if container not in storage.container_extensions:
+            raise ValueError(f"Invalid container {container}")
+
+        self._container: str = container
+
+        # Number of incremental backups to keep per file
+        self._backup_keep: int = backup_keep
+        self._backup_locks: dict[str, threading.Lock] = {}
+
+        # Encrypted stores, opened when they're first used
+        self._stores: dict[str, store.SecureStore] = {}
+        self._stores_lock: threading.Lock = threading.Lock()
+
+        # Queued store operations run in order on a single thread, so reads always see earlier writes
+        self._store_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shinobu-store")
+
+        # Remove temporary files left behind by interrupted writes
+        storage.remove_temp_files("data")
+
+        # Create writer for asynchronous saves
+        self._writer: writer.SecureFileWriter = writer.SecureFileWriter(self._write_file, max_workers=writer_threads)
+
+        # Create writer for journals
+        self._journal: writer.SecureJournalWriter = writer.SecureJournalWriter(self._append_file, self._compact_file)
+
         # Load plugins
         self.load_plugins()
 
@@ -382,30 +450,178 @@ class SecretsIssuingAuthority:
         if not filename.isalnum():
             raise ValueError("Filename should be alphanumeric")
 
-        # Load file
+        # Find file (binary containers are preferred over legacy JSON files)
+        path: str | None = storage.find_secure_file(filename)
+
+        if not path:
+            # Return empty file
+            return ""
+
+        # Load and decrypt file
         try:
-            with open(f"data/{filename}.json", 'r') as file:
-                data: dict = json.load(file)
+            return raw_encryptor.decrypt_file(path)
         except FileNotFoundError:
             # Return empty file
             return ""
 
-        encrypted_data = encryptor.EncryptedData.from_dict(data)
+    def _write_file(self, filename: str, data: str | bytes | None):
+        if data is None:
+            # Remove file
+            storage.remove_secure_file(filename)
+            return
+
+        path: str = storage.get_secure_file_path(filename, self._container)
 
-        # Decrypt file
-        return raw_encryptor.decrypt(encrypted_data)
+        # Segments are stored in subdirectories, so ensure the directory exists
+        os.makedirs(os.path.dirname(path), exist_ok=True)
 
-    def save(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, data: str):
+        # Encrypt data in chunks and replace the file once it's fully written
+        raw_encryptor.encrypt_to_file(data, path, container=self._container)
+
+        # Remove copies in other formats so they can't shadow this one
+        storage.remove_other_containers(filename, self._container)
+
+    def save(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, data: str | bytes):
         # Ensure wrapper has entitlements
         self._check_file_entitlement(wrapper, filename)
 
-        # Encrypt data
-        encrypted_data: encryptor.EncryptedData = raw_encryptor.encrypt(data)
+        # Queue write and wait for it, so this can't race with pending asynchronous writes to the same file
+        self._writer.submit(filename, data).result()
 
-        # Save encrypted data
-        with open(f"data/{filename}.json", 'w+') as file:
-            # noinspection PyTypeChecker
-            json.dump(encrypted_data.to_dict(), file)
+    async def save_async(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, data: str | bytes):
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        # Queue write (if there's already a pending write for this file, it will be replaced)
+        await self._writer.write(filename, data)
+
+    def list_segments(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str) -> list[str]:
+        """Lists a file's segments for a FineGrainedSecureFiles object."""
+
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        if not filename.isalnum():
+            raise ValueError("Filename should be alphanumeric")
+
+        return storage.list_segments(filename)
+
+    def read_segment(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, segment: str) -> str:
+        """Reads a file segment for a FineGrainedSecureFiles object."""
+
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        if not filename.isalnum():
+            raise ValueError("Filename should be alphanumeric")
+
+        # Find segment
+        path: str | None = storage.find_secure_file(storage.get_segment_name(filename, segment))
+
+        if not path:
+            # Return empty segment
+            return ""
+
+        # Load and decrypt segment
+        try:
+            return raw_encryptor.decrypt_file(path)
+        except FileNotFoundError:
+            # Return empty segment
+            return ""
+
+    def save_segment(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, segment: str,
+                     data: str | bytes | None):
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        if not filename.isalnum():
+            raise ValueError("Filename should be alphanumeric")
+
+        # Queue write and wait for it, so this can't race with pending asynchronous writes to the same segment
+        self._writer.submit(storage.get_segment_name(filename, segment), data).result()
+
+    async def save_segment_async(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, segment: str,
+                                 data: str | bytes | None):
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        if not filename.isalnum():
+            raise ValueError("Filename should be alphanumeric")
+
+        # Queue write (if there's already a pending write for this segment, it will be replaced)
+        await self._writer.write(storage.get_segment_name(filename, segment), data)
+
+    def read_journal(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str) -> list[str]:
+        """Reads a file's journal for a FineGrainedSecureFiles object."""
+
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        if not filename.isalnum():
+            raise ValueError("Filename should be alphanumeric")
+
+        # Load and decrypt records
+        try:
+            return raw_encryptor.decrypt_records(storage.get_journal_path(filename))
+        except FileNotFoundError:
+            # Return empty journal
+            return []
+
+    @staticmethod
+    def _append_file(filename: str, data: str | bytes):
+        # Encrypt data and append it as a new record
+        raw_encryptor.append_to_file(data, storage.get_journal_path(filename))
+
+    def _compact_file(self, filename: str, data: str | bytes):
+        # Write snapshot first, so the journal is only discarded once its records are safely on disk
+        self._write_file(filename, data)
+
+        # Discard journal
+        try:
+            os.remove(storage.get_journal_path(filename))
+        except FileNotFoundError:
+            pass
+
+    async def append_async(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, data: str | bytes):
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        # Queue record (records are always appended in order)
+        await asyncio.wrap_future(self._journal.append(filename, data))
+
+    def compact(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, data: str | bytes):
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        # Queue compaction and wait for it, so queued records are written before the journal is discarded
+        self._journal.compact(filename, data).result()
+
+    async def compact_async(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, data: str | bytes):
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        # Queue compaction
+        await asyncio.wrap_future(self._journal.compact(filename, data))
+
+    async def flush(self, wrapper: fine_grained.FineGrainedSecureFiles):
+        # Ensure wrapper is valid
+        self._validate_wrapper(wrapper)
+
+        # Wait for pending writes
+        await self._writer.flush()
+        await self._journal.flush()
+
+    def close(self):
+        """Writes any pending data. Should be called after the bot has shut down."""
+        self._journal.close()
+        self._writer.close()
+        self._store_executor.shutdown(wait=True)
+
+        with self._stores_lock:
+            for secure_store in self._stores.values():
+                secure_store.close()
+
+            self._stores.clear()
 
     def export(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, data: str,
                use_strong_kdf: bool = True) -> EncryptedData:
@@ -420,6 +636,151 @@ class SecretsIssuingAuthority:
         # Return encrypted data
         return raw_encryptor.encrypt(data, kdf_profile=kdf_profile)
 
+    def _get_backup_lock(self, filename: str) -> threading.Lock:
+        return self._backup_locks.setdefault(filename, threading.Lock())
+
+    def backup(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, data: dict,
+               use_strong_kdf: bool = True) -> dict:
+        """Takes an incremental backup of a file for a FineGrainedSecureFiles object."""
+
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        # Use argon2_high where possible (this only runs once per backup chain)
+        kdf_profile: str = "argon2_low"
+        if use_strong_kdf and "argon2_high" in encryptor.argon2_available:
+            kdf_profile = "argon2_high"
+
+        store: backup.BackupStore = backup.BackupStore(filename, raw_encryptor)
+
+        # Backups of the same file can't run at once, as they'd write the same manifest
+        with self._get_backup_lock(filename):
+            manifest: backup.BackupManifest = store.backup(data, kdf_profile=kdf_profile)
+            store.prune(self._backup_keep)
+
+        return manifest.to_dict()
+
+    async def backup_async(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, data: dict,
+                           use_strong_kdf: bool = True) -> dict:
+        return await asyncio.to_thread(self.backup, wrapper, filename, data, use_strong_kdf)
+
+    def list_backups(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str) -> list[dict]:
+        """Lists a file's backups for a FineGrainedSecureFiles object."""
+
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        return [manifest.to_dict() for manifest in backup.BackupStore(filename, raw_encryptor).list()]
+
+    def restore_backup(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str,
+                       seq: int | None = None) -> dict:
+        """Restores a file's backup for a FineGrainedSecureFiles object."""
+
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        with self._get_backup_lock(filename):
+            return backup.BackupStore(filename, raw_encryptor).restore(seq)
+
+    def _get_store(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str) -> store.SecureStore:
+        # Ensure wrapper has entitlements
+        self._check_file_entitlement(wrapper, filename)
+
+        with self._stores_lock:
+            if filename not in self._stores:
+                self._stores.update({filename: store.SecureStore(store.get_store_path(filename), raw_encryptor)})
+
+            return self._stores[filename]
+
+    def store_put(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, key: str, value: str,
+                  aliases: typing.Iterable[str] = ()):
+        """Stores a value in a file's encrypted store for a FineGrainedSecureFiles object."""
+        self._get_store(wrapper, filename).put(key, value, aliases=aliases)
+
+    def store_get(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, key: str) -> str | None:
+        """Reads a value from a file's encrypted store for a FineGrainedSecureFiles object."""
+        return self._get_store(wrapper, filename).get(key)
+
+    def store_find(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, alias: str) -> str | None:
+        """Reads a value from a file's encrypted store by one of its aliases for a FineGrainedSecureFiles
+        object."""
+
+        entry: tuple[str, str] | None = self._get_store(wrapper, filename).find(alias)
+        return entry[1] if entry else None
+
+    def store_remove(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, key: str):
+        """Removes a value from a file's encrypted store for a FineGrainedSecureFiles object."""
+        self._get_store(wrapper, filename).remove(key)
+
+    def store_prune(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str, max_age: float) -> int:
+        """Removes old values from a file's encrypted store for a FineGrainedSecureFiles object."""
+        return self._get_store(wrapper, filename).prune(max_age)
+
+    def store_open(self, wrapper: fine_grained.FineGrainedSecureFiles, filename: str):
+        """Opens a file's encrypted store for a FineGrainedSecureFiles object."""
+        self._get_store(wrapper, filename)
+
+    def queue_store(self, func, *args, **kwargs) -> Future:
+        """Queues a store operation (e.g. store_put) to run on the store thread. Entitlements are checked when
+        the operation runs, so errors are raised through the future."""
+        return self._store_executor.submit(func, *args, **kwargs)
+
+    def _check_archive_documents(self, wrapper: fine_grained.FineGrainedSecureFiles,
+                                 documents: typing.Iterable[archive.ArchiveDocument]):
+        for document in documents:
+            # Ensure wrapper has entitlements to every file in the archive
+            self._check_file_entitlement(wrapper, document.filename)
+            yield document
+
+    def write_archive(self, wrapper: fine_grained.FineGrainedSecureFiles, name: str,
+                      documents: typing.Iterable[archive.ArchiveDocument], progress=None,
+                      use_strong_kdf: bool = True) -> dict:
+        """Writes a full backup archive for a FineGrainedSecureFiles object."""
+
+        # Ensure wrapper is valid
+        self._validate_wrapper(wrapper)
+
+        # Use argon2_high where possible (this only runs once per archive)
+        kdf_profile: str = "argon2_low"
+        if use_strong_kdf and "argon2_high" in encryptor.argon2_available:
+            kdf_profile = "argon2_high"
+
+        return archive.write_archive(
+            raw_encryptor, archive.get_archive_path(name), self._check_archive_documents(wrapper, documents),
+            kdf_profile=kdf_profile, progress=progress
+        )
+
+    def verify_archive(self, wrapper: fine_grained.FineGrainedSecureFiles, name: str, progress=None) -> dict:
+        """Validates a full backup archive for a FineGrainedSecureFiles object."""
+
+        # Ensure wrapper is valid
+        self._validate_wrapper(wrapper)
+
+        summary: dict = archive.verify_archive(raw_encryptor, archive.get_archive_path(name), progress=progress)
+
+        for filename in summary["files"]:
+            self._check_file_entitlement(wrapper, filename)
+
+        return summary
+
+    def iter_archive(self, wrapper: fine_grained.FineGrainedSecureFiles, name: str, progress=None):
+        """Reads a full backup archive for a FineGrainedSecureFiles object."""
+
+        # Ensure wrapper is valid
+        self._validate_wrapper(wrapper)
+
+        for document, data in archive.iter_documents(raw_encryptor, archive.get_archive_path(name), progress=progress):
+            self._check_file_entitlement(wrapper, document.filename)
+            yield document, data
+
+    def list_archives(self, wrapper: fine_grained.FineGrainedSecureFiles) -> list[str]:
+        """Lists full backup archives for a FineGrainedSecureFiles object."""
+
+        # Ensure wrapper is valid
+        self._validate_wrapper(wrapper)
+
+        return archive.list_archives()
+
 # Create variable for SecretsIssuingAuthority (do not initialize yet)
 secrets_authority: SecretsIssuingAuthority | None = None
 
@@ -450,8 +811,59 @@ class ActualFineGrainedSecureFiles(fine_grained.FineGrainedSecureFiles):
 
         secrets_authority.save(self, filename, data)
 
-    def save_json(self, filename: str, data: dict):
-        secrets_authority.save(self, filename, orjson.dumps(data).decode())
+    def save_json(self, filename: str, data: dict) -> int:
+        serialized: bytes = orjson.dumps(data)
+        secrets_authority.save(self, filename, serialized)
+        return len(serialized)
+
+    async def save_async(self, filename: str, data: str):
+        await secrets_authority.save_async(self, filename, data)
+
+    async def save_json_async(self, filename: str, data: dict) -> int:
+        # Large dicts can take a while to serialize, so don't block the event loop
+        serialized: bytes = await asyncio.to_thread(orjson.dumps, data)
+        await secrets_authority.save_async(self, filename, serialized)
+        return len(serialized)
+
+    def list_segments(self, filename: str) -> list[str]:
+        return secrets_authority.list_segments(self, filename)
+
+    def read_segment_json(self, filename: str, segment: str) -> dict:
+        return orjson.loads(secrets_authority.read_segment(self, filename, segment) or "{}")
+
+    def save_segment_json(self, filename: str, segment: str, data: dict):
+        secrets_authority.save_segment(self, filename, segment, orjson.dumps(data))
+
+    async def save_segment_json_async(self, filename: str, segment: str, data: dict):
+        await secrets_authority.save_segment_async(self, filename, segment, orjson.dumps(data))
+
+    def remove_segment(self, filename: str, segment: str):
+        secrets_authority.save_segment(self, filename, segment, None)
+
+    async def remove_segment_async(self, filename: str, segment: str):
+        await secrets_authority.save_segment_async(self, filename, segment, None)
+
+    def read_journal_json(self, filename: str) -> list[dict]:
+        return [orjson.loads(record) for record in secrets_authority.read_journal(self, filename)]
+
+    async def append_json_async(self, filename: str, data: dict) -> int:
+        serialized: bytes = orjson.dumps(data)
+        await secrets_authority.append_async(self, filename, serialized)
+        return len(serialized)
+
+    def compact_json(self, filename: str, data: dict) -> int:
+        serialized: bytes = orjson.dumps(data)
+        secrets_authority.compact(self, filename, serialized)
+        return len(serialized)
+
+    async def compact_json_async(self, filename: str, data: dict) -> int:
+        # Snapshots can take a while to serialize, so don't block the event loop
+        serialized: bytes = await asyncio.to_thread(orjson.dumps, data)
+        await secrets_authority.compact_async(self, filename, serialized)
+        return len(serialized)
+
+    async def flush(self):
+        await secrets_authority.flush(self)
 
     def export(self, filename: str, data: str, use_strong_kdf: bool = True) -> EncryptedData | None:
         return secrets_authority.export(self, filename, data, use_strong_kdf=use_strong_kdf)
@@ -461,6 +873,65 @@ class ActualFineGrainedSecureFiles(fine_grained.FineGrainedSecureFiles):
             self, filename, orjson.dumps(data).decode(), use_strong_kdf=use_strong_kdf
         )
 
+    def backup_json(self, filename: str, data: dict, use_strong_kdf: bool = True) -> dict:
+        return secrets_authority.backup(self, filename, data, use_strong_kdf=use_strong_kdf)
+
+    async def backup_json_async(self, filename: str, data: dict, use_strong_kdf: bool = True) -> dict:
+        return await secrets_authority.backup_async(self, filename, data, use_strong_kdf=use_strong_kdf)
+
+    def list_backups(self, filename: str) -> list[dict]:
+        return secrets_authority.list_backups(self, filename)
+
+    def restore_backup_json(self, filename: str, seq: int | None = None) -> dict:
+        return secrets_authority.restore_backup(self, filename, seq=seq)
+
+    def write_archive(self, name: str, documents, progress=None, use_strong_kdf: bool = True) -> dict:
+        return secrets_authority.write_archive(self, name, documents, progress=progress, use_strong_kdf=use_strong_kdf)
+
+    def verify_archive(self, name: str, progress=None) -> dict:
+        return secrets_authority.verify_archive(self, name, progress=progress)
+
+    def iter_archive(self, name: str, progress=None):
+        return secrets_authority.iter_archive(self, name, progress=progress)
+
+    def list_archives(self) -> list[str]:
+        return secrets_authority.list_archives(self)
+
+    def store_put_json(self, filename: str, key: str, data: dict, aliases: typing.Iterable[str] = ()):
+        secrets_authority.store_put(self, filename, key, json.dumps(data), aliases=aliases)
+
+    def store_get_json(self, filename: str, key: str) -> dict | None:
+        value: str | None = secrets_authority.store_get(self, filename, key)
+        return json.loads(value) if value is not None else None
+
+    def store_find_json(self, filename: str, alias: str) -> dict | None:
+        value: str | None = secrets_authority.store_find(self, filename, alias)
+        return json.loads(value) if value is not None else None
+
+    def store_remove(self, filename: str, key: str):
+        secrets_authority.store_remove(self, filename, key)
+
+    def store_prune(self, filename: str, max_age: float) -> int:
+        return secrets_authority.store_prune(self, filename, max_age)
+
+    def store_open(self, filename: str):
+        secrets_authority.store_open(self, filename)
+
+    def queue_store_put_json(self, filename: str, key: str, data: dict, aliases: typing.Iterable[str] = ()) -> Future:
+        return secrets_authority.queue_store(self.store_put_json, filename, key, data, aliases=aliases)
+
+    def queue_store_remove(self, filename: str, key: str) -> Future:
+        return secrets_authority.queue_store(self.store_remove, filename, key)
+
+    def queue_store_prune(self, filename: str, max_age: float) -> Future:
+        return secrets_authority.queue_store(self.store_prune, filename, max_age)
+
+    async def store_get_json_async(self, filename: str, key: str) -> dict | None:
+        return await asyncio.wrap_future(secrets_authority.queue_store(self.store_get_json, filename, key))
+
+    async def store_find_json_async(self, filename: str, alias: str) -> dict | None:
+        return await asyncio.wrap_future(secrets_authority.queue_store(self.store_find_json, filename, alias))
+
 class ExtensionCogMap:
     """Keeps track of extensions and its cogs."""
 
@@ -580,18 +1051,28 @@ def start_bot() -> bool:
     asyncio.set_event_loop(asyncio.new_event_loop())
 
     # Regenerate bootscript-level objects
+    secrets_config: dict = load_secrets_config()
+    calibration.load_calibration()
+    apply_kdf_memory_budget(secrets_config)
     tokenstore = manager.TokenStore(
         password,
         debug=False,
         read_only=True,
-        onetime=["TOKEN"]
+        onetime=["TOKEN"],
+        cache_ttl=secrets_config.get("token_cache_ttl", 0)
     )
     if tokenstore.needs_reencryption:
         print("TokenStore is using outdated encryption. Please re-encrypt your secrets.")
 
-    secrets_authority = SecretsIssuingAuthority()
+    secrets_authority = SecretsIssuingAuthority(
+        writer_threads=secrets_config.get("writer_threads", 2),
+        container=secrets_config.get("container", "binary"),
+        backup_keep=secrets_config.get("backup_keep", 24)
+    )
     raw_encryptor = manager.RawEncryptor(
-        password
+        password,
+        session_key=secrets_config.get("session_key", True),
+        **get_compression_options(secrets_config)
     )
     extension_map = ExtensionCogMap()
 
@@ -628,6 +1109,13 @@ def start_bot() -> bool:
     # Run cleanup
     bot.cleanup()
 
+    # Write pending secure files
+    secrets_authority.close()
+
+    # Clear session key and cached secrets
+    raw_encryptor.clear()
+    tokenstore.clear_cache()
+
     # Set restart state and channel
     if bot.requested_restart:
         should_restart = True
@@ -642,15 +1130,73 @@ def start_bot() -> bool:
 def start_secrets_cli():
     """Launches the Secrets Manager CLI."""
     global password
+    calibration.load_calibration()
+    secrets_config: dict = load_secrets_config()
+    apply_kdf_memory_budget(secrets_config)
     cli_tokenstore = manager.TokenStore(password, debug=False, read_only=False)
-    cli_encryptor = manager.RawEncryptor(password)
+    cli_encryptor = manager.RawEncryptor(password, **get_compression_options(secrets_config))
 
     if cli_tokenstore.needs_reencryption:
         print("TokenStore is using outdated encryption. Please re-encrypt your secrets.")
 
-    cli: secrets_cli.ShinobuSecretsCLI = secrets_cli.ShinobuSecretsCLI(cli_tokenstore, cli_encryptor)
+    cli: secrets_cli.ShinobuSecretsCLI = secrets_cli.ShinobuSecretsCLI(
+        cli_tokenstore,
+        cli_encryptor,
+        container=secrets_config.get("container", "binary"),
+        workers=secrets_config.get("reencrypt_workers", 0),
+        memory_budget=secrets_config.get("reencrypt_memory_budget", 1024) * 1048576
+    )
     cli.run()
 
+def start_benchmark():
+    """Runs the encryption benchmark suite."""
+    global secrets_authority, raw_encryptor
+
+    secrets_config: dict = load_secrets_config()
+    calibration.load_calibration()
+
+    # Use a throwaway password, so the benchmark never touches real secrets
+    raw_encryptor = manager.RawEncryptor(
+        secrets.token_urlsafe(32),
+        session_key=secrets_config.get("session_key", True),
+        **get_compression_options(secrets_config)
+    )
+    secrets_authority = SecretsIssuingAuthority(
+        writer_threads=secrets_config.get("writer_threads", 2),
+        container=secrets_config.get("container", "binary")
+    )
+    wrapper: fine_grained.FineGrainedSecureFiles = secrets_authority.issue(["benchmark"], is_file=True)
+
+    def print_progress(group: str, params: dict):
+        print(f'\x1b[36m{group}: {", ".join([f"{key}={value}" for key, value in params.items()])}\x1b[0m')
+
+    sizes: list[int] = [size for size in benchmark.payload_sizes if size <= launch_args.benchmark_max_size]
+
+    try:
+        results: dict = benchmark.run(
+            sizes=sizes,
+            iterations=launch_args.benchmark_iterations,
+            save=lambda data: wrapper.save("benchmark", data),
+            read=lambda: wrapper.read("benchmark"),
+            progress=print_progress
+        )
+    finally:
+        secrets_authority.close()
+        raw_encryptor.clear()
+        storage.remove_secure_file("benchmark")
+
+    benchmark.write_results(results, launch_args.benchmark_output)
+
+    for result in results["results"]:
+        params: str = "".join([f" {key}={value}" for key, value in result["params"].items()])
+        throughput: str = f'{round(result["throughput_mib_s"], 1)} MiB/s' if result["throughput_mib_s"] else "-"
+        print(
+            f'{result["name"]}{params} size={result["size"]}: p50={round(result["latency_ms"]["p50"], 3)}ms '
+            f'p99={round(result["latency_ms"]["p99"], 3)}ms {throughput} rss={round(result["peak_rss_mib"])} MiB'
+        )
+
+    print(f'\x1b[36;1mResults written to {launch_args.benchmark_output}.\x1b[0m')
+
 def start_installer_cli():
     """Launches the installer CLI."""
     cli: installer_cli.ShinobuInstallerCLI = installer_cli.ShinobuInstallerCLI()
@@ -665,8 +1211,8 @@ if __name__ == "__main__":
         if os.environ.get("SHINOBU_ENCRYPTION_PASSWORD"):
             print("WARNING: Inheriting password from .env file. Do not store your password here for production environments.")
             password = os.environ.get("SHINOBU_ENCRYPTION_PASSWORD")
-        elif launch_installer_cli:
-            # We're reinstalling (or installing), so we don't need the password
+        elif launch_installer_cli or launch_benchmark:
+            # We're reinstalling (or installing) or benchmarking, so we don't need the password
             pass
         else:
             # Prompt for password (safer!)
@@ -676,6 +1222,8 @@ if __name__ == "__main__":
             start_secrets_cli()
         elif launch_installer_cli:
             start_installer_cli()
+        elif launch_benchmark:
+            start_benchmark()
         else:
             while True:
                 restart_bot: bool = start_bot()
@@ -42,6 +42,9 @@ class BeaconBackend(shinobu_cog.ShinobuCog):
         self._beacon = beacon.Beacon(self.bot, self._shinobu_files, config=self.bot.config.get("beacon"))
         self.bot.shared_objects.add("beacon", self._beacon)
 
+        # Start decrypting saved data while we log in
+        self._beacon.prefetch_data()
+
     @commands.Cog.listener()
     async def on_ready(self):
         if not self._beacon.initialized:
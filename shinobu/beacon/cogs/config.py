@@ -230,7 +230,7 @@ class BeaconConfig(beacon_cog.BeaconCog):
             skip_response = False
 
             if is_done:
-                await self.bot.loop.run_in_executor(None, lambda: self._beacon.save_data())
+                await self._beacon.save_data_async()
                 break
 
             def check(incoming: discord.Interaction):
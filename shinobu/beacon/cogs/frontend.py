@@ -87,7 +87,7 @@ class BeaconFrontend(beacon_cog.BeaconCog):
         )
         self._beacon.spaces.add_space(new_space)
         await ctx.respond(f"space created!\n- id: `{new_space.id}`\n- name: {new_space.name}")
-        await self.bot.loop.run_in_executor(None, self._beacon.save_data)
+        await self._beacon.save_data_async()
 
     async def list_spaces_autocomplete(self, ctx: discord.AutocompleteContext) -> list[discord.OptionChoice]:
         priority_matches: list[str] = []
@@ -237,7 +237,7 @@ class BeaconFrontend(beacon_cog.BeaconCog):
             return await ctx.respond("already in space? :/")
 
         await ctx.respond("space joined! :3")
-        await self.bot.loop.run_in_executor(None, self._beacon.save_data)
+        await self._beacon.save_data_async()
 
     @bridge_universal.command(name="leave-space")
     @bridge.bridge_option("space_id", description="The ID of the Space to leave.")
@@ -281,7 +281,7 @@ class BeaconFrontend(beacon_cog.BeaconCog):
             return await ctx.respond("you are not a member of this space :/")
 
         await ctx.respond("space left :<")
-        await self.bot.loop.run_in_executor(None, self._beacon.save_data)
+        await self._beacon.save_data_async()
 
         # Delete webhook
         if webhook:
@@ -343,7 +343,7 @@ class BeaconFrontend(beacon_cog.BeaconCog):
             embed.colour = self.bot.colors.success
             embed.set_footer(text=None)
             await interaction.response.edit_message(embed=embed, view=None)
-            await self.bot.loop.run_in_executor(None, self._beacon.save_data)
+            await self._beacon.save_data_async()
         else:
             if interaction:
                 await interaction.response.edit_message(view=None)
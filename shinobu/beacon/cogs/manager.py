@@ -16,10 +16,21 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import time
+import asyncio
+import traceback
+import discord
 from discord.ext import commands
 from shinobu.runtime.models import shinobu_cog
 from shinobu.beacon.models import beacon_cog
 
+# Seconds between backup and restore progress updates
+progress_update_interval: int = 3
+
+# Seconds between cache stats updates, and how long they're updated for
+stats_update_interval: int = 5
+stats_live_duration: int = 60
+
 class BeaconManager(beacon_cog.BeaconCog):
     def __init__(self, bot):
         # Register cog metadata
@@ -84,6 +95,160 @@ class BeaconManager(beacon_cog.BeaconCog):
         self._beacon.disable_debug()
         await ctx.send(f":white_check_mark: debug mode off")
 
+    @staticmethod
+    async def _run_with_progress(message: discord.Message, action: str, coroutine) -> dict:
+        """Runs a backup or restore, editing a message with its progress every few seconds."""
+
+        progress: dict = {"entries": 0, "size": 0}
+
+        def update_progress(entries: int, size: int):
+            progress.update({"entries": entries, "size": size})
+
+        task: asyncio.Task = asyncio.create_task(coroutine(update_progress))
+
+        while not task.done():
+            await asyncio.wait({task}, timeout=progress_update_interval)
+
+            if not task.done():
+                await message.edit(
+                    content=f"{action}... {progress['entries']} entries, {round(progress['size'] / 1048576, 1)} MiB"
+                )
+
+        return task.result()
+
+    @beacon_text.command(name="backup")
+    @commands.is_owner()
+    async def backup(self, ctx: commands.Context):
+        """Backs up Beacon data and the message cache."""
+
+        message: discord.Message = await ctx.send("backing up...")
+
+        try:
+            summary: dict = await self._run_with_progress(
+                message, "backing up", lambda progress: self._beacon.backup(progress=progress)
+            )
+        except Exception:
+            traceback.print_exc()
+            return await message.edit(content=":x: backup failed, check the console for details")
+
+        await message.edit(
+            content=f":white_check_mark: backed up {summary['entries']} entries to `{summary['name']}`"
+        )
+
+    @beacon_text.command(name="list-backups")
+    @commands.is_owner()
+    async def list_backups(self, ctx: commands.Context):
+        """Lists Beacon backups."""
+
+        backups: list[str] = self._beacon.list_backups()
+
+        if len(backups) == 0:
+            return await ctx.send("no backups found")
+
+        await ctx.send("\n".join([f"`{name}`" for name in backups[:25]]))
+
+    @beacon_text.command(name="restore")
+    @commands.is_owner()
+    async def restore(self, ctx: commands.Context, name: str):
+        """Restores Beacon data and the message cache from a backup."""
+
+        message: discord.Message = await ctx.send("validating backup...")
+
+        try:
+            summary: dict = await self._run_with_progress(
+                message, "validating backup", lambda progress: self._beacon.restore(name, progress=progress)
+            )
+        except FileNotFoundError:
+            return await message.edit(content=f":x: backup `{name}` not found")
+        except ValueError as e:
+            return await message.edit(content=f":x: backup `{name}` can't be restored: {e}")
+        except Exception:
+            traceback.print_exc()
+            return await message.edit(content=":x: restore failed, check the console for details")
+
+        await message.edit(
+            content=f":white_check_mark: restored {summary['entries']} entries from `{name}`"
+        )
+
+    def _get_cache_stats_embed(self) -> discord.Embed:
+        stats: dict = self._beacon.messages.stats()
+        hours: float = max(time.time() - stats["since"], 1) / 3600
+        evictions: int = stats["evictions_count"] + stats["evictions_size"]
+        size_limit: str = f"{round(stats['size_limit'] / 1048576, 1)} MiB" if stats["size_limit"] else "none"
+        hit_rate: float = stats["lookup_hits"] / stats["lookups"] * 100 if stats["lookups"] > 0 else 0
+        average_write: float = stats["write_time_total"] / stats["writes"] if stats["writes"] > 0 else 0
+
+        embed: discord.Embed = discord.Embed(title="Message cache", color=self.bot.colors.shinobu)
+        embed.add_field(
+            name="Contents",
+            value=(
+                f"{stats['groups']}/{stats['group_limit']} groups{' (packed)' if stats['compact_groups'] else ''}\n"
+                f"{stats['messages']} messages\n"
+                f"{round(stats['size'] / 1048576, 1)} MiB used, limit {size_limit}"
+            )
+        )
+        embed.add_field(
+            name="Lookups",
+            value=(
+                f"{stats['lookups']} lookups, {round(hit_rate, 1)}% in memory\n"
+                f"{stats['lookup_misses']} misses\n"
+                f"cold store: {stats['cold_hits']} hits, {stats['cold_misses']} misses, "
+                f"{stats['cold_writes']} writes"
+            )
+        )
+        embed.add_field(
+            name="Evictions",
+            value=(
+                f"{stats['evictions_count']} over group limit\n"
+                f"{stats['evictions_size']} over memory limit\n"
+                f"{round(stats['evicted_bytes'] / 1048576, 1)} MiB evicted, {round(evictions / hours, 1)}/hour"
+            )
+        )
+        embed.add_field(
+            name="Saves",
+            value=(
+                f"{stats['writes']} writes, last {round(stats['write_time'] * 1000, 1)} ms, "
+                f"average {round(average_write * 1000, 1)} ms\n"
+                f"serializing took {round(stats['serialize_time'] * 1000, 1)} ms\n"
+                f"{round(stats['write_bytes'] / 1024, 1)} KiB last, "
+                f"{round(stats['bytes_written'] / 1048576, 1)} MiB total\n"
+                f"{stats['unsaved']} unsaved changes, {stats['journal_records']} journal records"
+            )
+        )
+        embed.add_field(
+            name="Reply previews",
+            value=f"{stats['preview_hits']} hits, {stats['preview_misses']} misses"
+        )
+
+        return embed
+
+    @beacon_text.command(name="cache-stats")
+    @commands.is_owner()
+    async def cache_stats(self, ctx: commands.Context):
+        """Shows message cache metrics, updating them every few seconds for a minute."""
+
+        embed: discord.Embed = self._get_cache_stats_embed()
+        embed.set_footer(text=f"Updates every {stats_update_interval} seconds")
+        message: discord.Message = await ctx.send(embed=embed)
+
+        for _ in range(stats_live_duration // stats_update_interval):
+            await asyncio.sleep(stats_update_interval)
+
+            embed = self._get_cache_stats_embed()
+            embed.set_footer(text=f"Updates every {stats_update_interval} seconds")
+
+            try:
+                await message.edit(embed=embed)
+            except discord.HTTPException:
+                # Message was probably deleted
+                return
+
+        embed.set_footer(text="No longer updating, run the command again to refresh")
+        try:
+            await message.edit(embed=embed)
+        except discord.HTTPException:
+            pass
+
 def get_cog_type():
     return BeaconManager
 
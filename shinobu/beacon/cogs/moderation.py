@@ -43,7 +43,7 @@ class BeaconModeration(beacon_cog.BeaconCog):
     @CommandChecks.can_check_details()
     async def properties(self, ctx: discord.ApplicationContext, message: discord.Message):
         # Get message
-        message_obj: beacon_message.BeaconMessage = self._beacon.messages.get_message(str(message.id))
+        message_obj: beacon_message.BeaconMessage = await self._beacon.messages.fetch_message(str(message.id))
 
         if not message_obj:
             return await ctx.respond("could not get message :c", ephemeral=True)
@@ -119,6 +119,30 @@ class BeaconModeration(beacon_cog.BeaconCog):
 
         await ctx.respond(f"unbanned **{target}** :D")
 
+    @moderation_universal.command(name="purge")
+    @bridge.bridge_option("target", description="The user or channel ID. This may be an ID from any platform.")
+    @bridge.bridge_option("limit", description="The maximum number of messages to purge.")
+    @bridge.bridge_option("space_id", description="The Space ID. Leave empty to use the Space linked to this channel.")
+    @CommandChecks.can_manage()
+    async def purge(self, ctx: bridge.BridgeApplicationContext | bridge.BridgeExtContext,
+                    target: str, limit: int = 100, space_id: str | None = None):
+        """Purges recent messages sent to a Space by a user or from a channel."""
+        space: beacon_space.BeaconSpace = self.autodetect(ctx.channel, space_id)
+
+        if not self.can_manage(space, ctx.guild.id, user_id=ctx.author.id):
+            raise commands.CheckFailure()
+
+        if limit < 1:
+            raise errors.ShinobuBadArgumentValue("limit")
+
+        # Purge messages
+        purged: int = await self._beacon.purge_recent(target, space, limit=limit)
+
+        if purged == 0:
+            return await ctx.respond("there are no recent messages to purge :c")
+
+        await ctx.respond(f"purged **{purged}** messages from **{target}** >:<")
+
 def get_cog_type():
     return BeaconModeration
 
@@ -105,7 +105,7 @@ class BeaconPairing(beacon_cog.BeaconCog):
             )
 
             await ctx.respond(embed=embed)
-            await self.bot.loop.run_in_executor(None, self._beacon.save_data)
+            await self._beacon.save_data_async()
         else:
             # Create pairing code
             code: str = self._beacon.pairing.new_pairing_code(server)
@@ -158,7 +158,7 @@ class BeaconPairing(beacon_cog.BeaconCog):
             color=self.bot.colors.success
         )
         await ctx.respond(embed=embed)
-        await self.bot.loop.run_in_executor(None, self._beacon.save_data)
+        await self._beacon.save_data_async()
 
     @pairing_universal.command(name="pair-info")
     @CommandChecks.can_manage()
@@ -104,7 +104,7 @@ class DiscordDriverParent(shinobu_cog.ShinobuCog):
         reply_attachments: int = 0
 
         if message.reference:
-            reply_group: beacon_message.BeaconMessageGroup | None = self._beacon.messages.get_group_from_message(
+            reply_group: beacon_message.BeaconMessageGroup | None = await self._beacon.messages.fetch_group_from_message(
                 str(message.reference.message_id)
             )
             if reply_group:
@@ -116,10 +116,16 @@ class DiscordDriverParent(shinobu_cog.ShinobuCog):
             if message.reference.cached_message:
                 reply_message = message.reference.cached_message
             else:
-                try:
-                    reply_message = await message.channel.fetch_message(message.reference.message_id)
-                except discord.HTTPException:
-                    pass
+                # Use the cached preview if we have one, so we don't need to fetch the message
+                reply_content = self._beacon.messages.get_reply_preview(replies[0])
+
+                if reply_content is None:
+                    try:
+                        reply_message = await message.channel.fetch_message(message.reference.message_id)
+                    except discord.HTTPException:
+                        pass
+                else:
+                    reply_attachments = len(message.attachments)
 
             if reply_message:
                 uses_components_v2: bool = reply_message.flags.is_components_v2
@@ -199,7 +205,7 @@ class DiscordDriverParent(shinobu_cog.ShinobuCog):
         origin_driver: beacon_driver.BeaconDriver = self._beacon.drivers.get_driver("discord")
 
         # Get the BeaconMessage object for the message
-        message_obj: beacon_message.BeaconMessage = self._beacon.messages.get_message(str(message.id))
+        message_obj: beacon_message.BeaconMessage = await self._beacon.messages.fetch_message(str(message.id))
         if not message_obj:
             # We can't edit messages that aren't cached
             return
@@ -264,7 +270,7 @@ class DiscordDriverParent(shinobu_cog.ShinobuCog):
         origin_driver: beacon_driver.BeaconDriver = self._beacon.drivers.get_driver("discord")
 
         # Get the BeaconMessage object for the message
-        message_obj: beacon_message.BeaconMessage = self._beacon.messages.get_message(str(message.id))
+        message_obj: beacon_message.BeaconMessage = await self._beacon.messages.fetch_message(str(message.id))
         if not message_obj:
             # We can't remove messages that aren't cached
             return
@@ -303,7 +309,7 @@ class DiscordDriverParent(shinobu_cog.ShinobuCog):
         origin_driver: beacon_driver.BeaconDriver = self._beacon.drivers.get_driver("discord")
 
         # Get the BeaconMessage object for the message
-        message_obj: beacon_message.BeaconMessage = self._beacon.messages.get_message(str(message.id))
+        message_obj: beacon_message.BeaconMessage = await self._beacon.messages.fetch_message(str(message.id))
         if not message_obj:
             # We can't pin messages that aren't cached
             return
@@ -490,7 +496,7 @@ class DiscordDriverParent(shinobu_cog.ShinobuCog):
         # Get messages
         for message in messages:
             # Get the BeaconMessage object for the message
-            message_obj: beacon_message.BeaconMessage = self._beacon.messages.get_message(str(message.id))
+            message_obj: beacon_message.BeaconMessage = await self._beacon.messages.fetch_message(str(message.id))
             if not message_obj:
                 # We can't remove messages that aren't cached
                 continue
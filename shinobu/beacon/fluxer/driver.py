@@ -284,8 +284,8 @@ class FluxerDriver(beacon_driver.BeaconDriver):
             if not reply_message:
                 continue
 
-            reply_author: str = f"{reply_message.author.display_name if reply_message.author else '[unknown]'}"
-            reply_url: str = f"https://web.fluxer.app/channels/{reply_message.server.id}/{reply_message.channel.id}/{reply_message.id}"
+            reply_author: str = f"{reply_message.author.display_name if reply_message.author else reply_message_group.author_name or '[unknown]'}"
+            reply_url: str = f"https://web.fluxer.app/channels/{reply_message.server_id}/{reply_message.channel_id}/{reply_message.id}"
             reply_content: str | None = content.reply_content_all[reply_message_group.id] if content.reply_content_all else None
 
             # Apply preferred name
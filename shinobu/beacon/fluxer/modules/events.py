@@ -88,7 +88,7 @@ class FluxerEvents(cog.Cog):
 
         if message.referenced_message:
             # noinspection PyUnresolvedReferences
-            reply_group: beacon_message.BeaconMessageGroup | None = self.bot.beacon.messages.get_group_from_message(
+            reply_group: beacon_message.BeaconMessageGroup | None = await self.bot.beacon.messages.fetch_group_from_message(
                 str(message.referenced_message.id)
             )
             if reply_group:
@@ -163,7 +163,7 @@ class FluxerEvents(cog.Cog):
         origin_driver: beacon_driver.BeaconDriver = beacon_obj.drivers.get_driver("fluxer")
 
         # Get the BeaconMessage object for the message
-        message_obj: beacon_message.BeaconMessage = beacon_obj.messages.get_message(str(message.id))
+        message_obj: beacon_message.BeaconMessage = await beacon_obj.messages.fetch_message(str(message.id))
 
         if not message_obj:
             # Message isn't cached
@@ -227,7 +227,7 @@ class FluxerEvents(cog.Cog):
         origin_driver: beacon_driver.BeaconDriver = beacon_obj.drivers.get_driver("discord")
 
         # Get the BeaconMessage object for the message
-        message_obj: beacon_message.BeaconMessage = beacon_obj.messages.get_message(str(message["id"]))
+        message_obj: beacon_message.BeaconMessage = await beacon_obj.messages.fetch_message(str(message["id"]))
         if not message_obj:
             # We can't remove messages that aren't cached
             return
@@ -401,7 +401,7 @@ class FluxerEvents(cog.Cog):
         # Get messages
         for message_id in message_ids:
             # Get the BeaconMessage object for the message
-            message_obj: beacon_message.BeaconMessage = beacon_obj.messages.get_message(str(message_id))
+            message_obj: beacon_message.BeaconMessage = await beacon_obj.messages.fetch_message(str(message_id))
             if not message_obj:
                 # We can't remove messages that aren't cached
                 continue
@@ -16,7 +16,6 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import asyncio
 import uuid
 import fluxer
 from fluxer import cog
@@ -45,9 +44,7 @@ class BeaconFrontend(cog.Cog):
         self._beacon.spaces.add_space(new_space)
         await ctx.send(f"space created!\n- id: `{new_space.id}`\n- name: {new_space.name}")
 
-        loop = asyncio.get_event_loop()
-        # noinspection PyTypeChecker
-        await loop.run_in_executor(None, self._beacon.save_data)
+        await self._beacon.save_data_async()
 
     @cog.Cog.command(name="join-space")
     async def join_space(self, ctx: fluxer.Message, space_id: str):
@@ -90,9 +87,7 @@ class BeaconFrontend(cog.Cog):
             return await ctx.send("already in space? :/")
 
         await ctx.send("space joined! :3")
-        loop = asyncio.get_event_loop()
-        # noinspection PyTypeChecker
-        await loop.run_in_executor(None, self._beacon.save_data)
+        await self._beacon.save_data_async()
 
 async def setup(bot):
     await bot.add_cog(BeaconFrontend(bot))
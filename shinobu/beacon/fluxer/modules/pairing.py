@@ -16,7 +16,6 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import asyncio
 import uuid
 import fluxer
 from fluxer import cog
@@ -95,9 +94,7 @@ class BeaconPairing(cog.Cog):
 
             await ctx.reply(embeds=[embed])
 
-            loop = asyncio.get_event_loop()
-            # noinspection PyTypeChecker
-            await loop.run_in_executor(None, self._beacon.save_data)
+            await self._beacon.save_data_async()
         else:
             # Create pairing code
             code: str = self._beacon.pairing.new_pairing_code(server)
@@ -151,9 +148,7 @@ class BeaconPairing(cog.Cog):
         )
         await ctx.reply(embed=embed)
 
-        loop = asyncio.get_event_loop()
-        # noinspection PyTypeChecker
-        await loop.run_in_executor(None, self._beacon.save_data)
+        await self._beacon.save_data_async()
 
     @cog.Cog.command(name="pair-info")
     async def pair_info(self, ctx: fluxer.Message):
@@ -16,6 +16,7 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import time
 from enum import Enum
 from shinobu.beacon.models import (content as beacon_content, abc, user as beacon_user, channel as beacon_channel,
                                    server as beacon_server, webhook as beacon_webhook, file as beacon_file,
@@ -140,6 +141,15 @@ class BeaconMessageContent:
 
         return "\n".join(components)
 
+    def to_preview(self, length: int) -> str:
+        """Returns the message's text, cut to the given number of characters."""
+
+        components: list[str] = [
+            block.content for block in self._blocks.values() if isinstance(block, beacon_content.BeaconContentText)
+        ]
+
+        return "\n".join(components)[:length]
+
 class BeaconLegacyMessageContent:
     def __init__(self):
         self._content: str = ""
@@ -151,17 +161,30 @@ class BeaconMessageGroup:
     This is to be used to store bridged messages in the cache."""
 
     def __init__(self, group_id: str, author: beacon_user.BeaconUser | str, space_id: str,
-                 messages: list['BeaconMessage'], replies: list[str]):
+                 messages: list['BeaconMessage'], replies: list[str], preview: str | None = None,
+                 author_name: str | None = None, created: float | None = None):
+        """If created isn't given, the group is assumed to have been created now."""
+
         self._id: str = group_id
-        self._author: beacon_user.BeaconUser | None = author if type(author) is beacon_user.BeaconUser else None
+        self._author: beacon_user.BeaconUser | None = author if type(author) is not str else None
         self._author_id: str | None = author if type(author) is str else None
         self._space_id: str = space_id
         self._messages: dict[str, BeaconMessage] = {}
         self._replies: list[str] = replies
+        self._created: float = created if created is not None else time.time()
+
+        # Channel ID, server ID and platform to message indexes, so copies can be found without going through
+        # every message
+        self._channel_messages: dict[str, BeaconMessage] = {}
+        self._server_messages: dict[str, BeaconMessage] = {}
+        self._platform_messages: dict[str, list[BeaconMessage]] = {}
+
+        # Used to show replies without fetching the message (these aren't saved to disk)
+        self._preview: str | None = preview
+        self._author_name: str | None = author_name
 
         for message in messages:
-            self._messages.update({message.id: message})
-            message.group = self
+            self.add_message(message)
 
     @property
     def id(self) -> str:
@@ -187,12 +210,89 @@ class BeaconMessageGroup:
     def replies(self) -> list:
         return self._replies
 
+    @property
+    def created(self) -> float:
+        """Returns when the group was created as a UNIX timestamp. Groups saved before this was tracked
+        have a timestamp of 0."""
+        return self._created
+
+    @property
+    def preview(self) -> str | None:
+        """Returns the start of the message's text, if it's known."""
+        return self._preview
+
+    @preview.setter
+    def preview(self, preview: str | None):
+        self._preview = preview
+
+    @property
+    def author_name(self) -> str | None:
+        """Returns the author's display name at the time the message was sent, if it's known."""
+        return self._author_name
+
+    def add_message(self, message: 'BeaconMessage'):
+        """Adds a message to the group."""
+
+        if message.id in self._messages:
+            self.remove_message(message.id)
+
+        self._messages.update({message.id: message})
+        message.group = self
+
+        # Keep the first copy for each channel and server
+        if message.channel_id and message.channel_id not in self._channel_messages:
+            self._channel_messages.update({message.channel_id: message})
+
+        if message.server_id and message.server_id not in self._server_messages:
+            self._server_messages.update({message.server_id: message})
+
+        self._platform_messages.setdefault(message.platform, []).append(message)
+
+    def remove_message(self, message_id: str) -> 'BeaconMessage | None':
+        """Removes a message from the group."""
+
+        message: BeaconMessage | None = self._messages.pop(message_id, None)
+
+        if not message:
+            return None
+
+        # Point to another copy in the same channel or server, if there is one
+        if self._channel_messages.get(message.channel_id) is message:
+            self._channel_messages.pop(message.channel_id)
+
+            for other_message in self._messages.values():
+                if other_message.channel_id == message.channel_id:
+                    self._channel_messages.update({message.channel_id: other_message})
+                    break
+
+        if self._server_messages.get(message.server_id) is message:
+            self._server_messages.pop(message.server_id)
+
+            for other_message in self._messages.values():
+                if other_message.server_id == message.server_id:
+                    self._server_messages.update({message.server_id: other_message})
+                    break
+
+        platform_messages: list[BeaconMessage] = self._platform_messages.get(message.platform, [])
+        if message in platform_messages:
+            platform_messages.remove(message)
+
+        if message.group is self:
+            message.group = None
+
+        return message
+
     def get_message_for(self, messageable: beacon_messageable.BeaconMessageable) -> 'BeaconMessage | None':
-        for _, message in self._messages.items():
-            if message.channel.id == messageable.id:
-                return message
+        """Gets the message sent to a channel."""
+        return self._channel_messages.get(messageable.id)
 
-        return None
+    def get_message_for_server(self, server_id: str) -> 'BeaconMessage | None':
+        """Gets the message sent to a server."""
+        return self._server_messages.get(server_id)
+
+    def get_messages_for_platform(self, platform: str) -> list['BeaconMessage']:
+        """Gets the messages sent to a platform."""
+        return self._platform_messages.get(platform, []).copy()
 
     def to_dict(self) -> dict:
         data = {
@@ -200,21 +300,34 @@ class BeaconMessageGroup:
             "author": self.author_id,
             "space": self._space_id,
             "messages": list(self._messages.keys()),
-            "replies": self.replies.copy()
+            "replies": self.replies.copy(),
+            "created": self._created
         }
 
         return data
 
 class BeaconMessage(abc.BeaconABC):
-    def __init__(self, message_id: str, platform: str, origin_platform: str, author: beacon_user.BeaconUser,
-                 server: beacon_server.BeaconServer | None = None, channel: beacon_channel.BeaconChannel | None = None,
+    """A class representing a message.
+
+    The author, server and channel can be given as IDs along with a resolver, in which case they're resolved
+    the first time they're accessed. The resolver is called with the message and should return the author,
+    server and channel (or None for any that can't be resolved yet)."""
+
+    def __init__(self, message_id: str, platform: str, origin_platform: str, author: beacon_user.BeaconUser | str,
+                 server: beacon_server.BeaconServer | str | None = None,
+                 channel: beacon_channel.BeaconChannel | str | None = None,
                  content: str | dict | None = None, attachments: int = 0, replies: list['BeaconMessage'] | None = None,
-                 preferred_name: str | None = None, preferred_avatar: str | None = None, webhook_id: str | None = None):
+                 preferred_name: str | None = None, preferred_avatar: str | None = None, webhook_id: str | None = None,
+                 resolver=None):
         super().__init__(message_id, platform)
         self._origin_platform: str = origin_platform
-        self._author: beacon_user.BeaconUser = author
-        self._server: beacon_server.BeaconServer | None = server
-        self._channel: beacon_channel.BeaconChannel | None = channel
+        self._author: beacon_user.BeaconUser | None = author if type(author) is not str else None
+        self._author_id: str | None = author if type(author) is str else None
+        self._server: beacon_server.BeaconServer | None = server if type(server) is not str else None
+        self._server_id: str | None = server if type(server) is str else None
+        self._channel: beacon_channel.BeaconChannel | None = channel if type(channel) is not str else None
+        self._channel_id: str | None = channel if type(channel) is str else None
+        self._resolver = resolver
         self._content: str | dict | None = content
         self._attachments: int = attachments
         self._replies: list[BeaconMessage] = replies or []
@@ -228,17 +341,56 @@ class BeaconMessage(abc.BeaconABC):
         return self._origin_platform
 
     @property
-    def author(self) -> beacon_user.BeaconUser:
+    def hydrated(self) -> bool:
+        """Whether the author, server and channel have been resolved."""
+        return self._resolver is None
+
+    def _hydrate(self):
+        if not self._resolver:
+            return
+
+        author, server, channel = self._resolver(self)
+        self._author = self._author or author
+        self._server = self._server or server
+        self._channel = self._channel or channel
+
+        # Keep the resolver until everything is resolved, as the platform may not be connected yet
+        if self._author and (self._server or not self._server_id) and (self._channel or not self._channel_id):
+            self._resolver = None
+
+    @property
+    def author(self) -> beacon_user.BeaconUser | None:
+        if not self._author:
+            self._hydrate()
+
         return self._author
 
+    @property
+    def author_id(self) -> str:
+        return self._author.id if self._author else self._author_id
+
     @property
     def server(self) -> beacon_server.BeaconServer | None:
+        if not self._server and self._server_id:
+            self._hydrate()
+
         return self._server
 
+    @property
+    def server_id(self) -> str | None:
+        return self._server.id if self._server else self._server_id
+
     @property
     def channel(self) -> beacon_channel.BeaconChannel | None:
+        if not self._channel and self._channel_id:
+            self._hydrate()
+
         return self._channel
 
+    @property
+    def channel_id(self) -> str | None:
+        return self._channel.id if self._channel else self._channel_id
+
     @property
     def content(self) -> str | dict | None:
         return self._content
@@ -282,9 +434,9 @@ class BeaconMessage(abc.BeaconABC):
             "id": self.id,
             "platform": self.platform,
             "origin_platform": self.origin_platform,
-            "author_id": self.author.id,
-            "server_id": self.server.id if self.server else None,
-            "channel_id": self.channel.id if self.channel else None,
+            "author_id": self.author_id,
+            "server_id": self.server_id,
+            "channel_id": self.channel_id,
             "webhook_id": self.webhook_id,
             "preferred_name": self.preferred_name,
             "preferred_avatar": self.preferred_avatar,
@@ -218,6 +218,7 @@ class BeaconSpace:
         self._invites: list[BeaconSpaceInvite] = invites or []
         self._bans: list[str] = bans or []
         self._deleted: bool = False
+        self._dirty: bool = False
 
         # Room options
         self._private: bool = private
@@ -244,6 +245,7 @@ class BeaconSpace:
     @name.setter
     def name(self, new_name: str):
         self._name = new_name
+        self._dirty = True
 
     @property
     def description(self) -> str | None:
@@ -252,6 +254,7 @@ class BeaconSpace:
     @description.setter
     def description(self, new_description: str | None):
         self._description = new_description
+        self._dirty = True
 
     @property
     def quoted_description(self) -> str | None:
@@ -271,6 +274,7 @@ class BeaconSpace:
     @emoji.setter
     def emoji(self, new_emoji: str | None):
         self._emoji = new_emoji
+        self._dirty = True
 
     @property
     def decorated_name(self) -> str:
@@ -311,6 +315,7 @@ class BeaconSpace:
     @nsfw.setter
     def nsfw(self, new_value: bool):
         self._nsfw = new_value
+        self._dirty = True
 
     @property
     def relay_deletes(self) -> bool:
@@ -319,6 +324,7 @@ class BeaconSpace:
     @relay_deletes.setter
     def relay_deletes(self, new_value: bool):
         self._deletes = new_value
+        self._dirty = True
 
     @property
     def relay_edits(self) -> bool:
@@ -327,6 +333,7 @@ class BeaconSpace:
     @relay_edits.setter
     def relay_edits(self, new_value: bool):
         self._edits = new_value
+        self._dirty = True
 
     @property
     def relay_pins(self) -> bool:
@@ -335,6 +342,7 @@ class BeaconSpace:
     @relay_pins.setter
     def relay_pins(self, new_value: bool):
         self._pins = new_value
+        self._dirty = True
 
     @property
     def convert_large_files(self) -> bool:
@@ -343,6 +351,7 @@ class BeaconSpace:
     @convert_large_files.setter
     def convert_large_files(self, new_value: bool):
         self._attachments_url = new_value
+        self._dirty = True
 
     @property
     def compatibility(self) -> bool:
@@ -351,6 +360,7 @@ class BeaconSpace:
     @compatibility.setter
     def compatibility(self, new_value: bool):
         self._compatibility = new_value
+        self._dirty = True
 
     @property
     def filters(self) -> list:
@@ -364,8 +374,20 @@ class BeaconSpace:
     def deleted(self) -> bool:
         return self._deleted
 
+    @property
+    def dirty(self) -> bool:
+        """Whether the Space has changed since it was last saved."""
+        return self._dirty
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def mark_clean(self):
+        self._dirty = False
+
     def add_invite(self, invite: BeaconSpaceInvite):
         self._invites.append(invite)
+        self._dirty = True
 
     def use_invite(self, invite: BeaconSpaceInvite):
         invite_entry: BeaconSpaceInvite | None = None
@@ -379,6 +401,7 @@ class BeaconSpace:
             raise BeaconSpaceInvalidInvite("Invalid invite")
 
         invite_entry.use_invite()
+        self._dirty = True
 
     def is_banned(self, server: beacon_server.BeaconServer | str):
         if isinstance(server, beacon_server.BeaconServer):
@@ -442,6 +465,7 @@ class BeaconSpace:
             )
 
         self._members.append(new_membership)
+        self._dirty = True
 
     def partial_join(self, platform: str, server_id: str, channel_id: str, webhook_id: str | None = None,
                      invite: str | None = None):
@@ -464,8 +488,11 @@ class BeaconSpace:
 
         # Join space
         self._partial_members.append(new_membership)
+        self._dirty = True
 
     def leave(self, member: BeaconSpaceMember | BeaconPartialSpaceMember):
+        self._dirty = True
+
         # We'll only remove a full member if the type of member is BeaconSpaceMember
         # Otherwise, we can only assume a partial join and skip this
         if member in self._members and isinstance(member, BeaconSpaceMember):
@@ -504,8 +531,11 @@ class BeaconSpace:
         else:
             self._bans.append(member)
 
+        self._dirty = True
+
     def unban(self, server_id: str):
         self._bans.remove(server_id)
+        self._dirty = True
     
     def get_member(self, server: beacon_server.BeaconServer | str) -> BeaconSpaceMember | None:
         """Gets a Space member."""
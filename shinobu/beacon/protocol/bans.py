@@ -78,14 +78,24 @@ class BeaconBanManager:
     def __init__(self):
         self._scheme_version: int = 1
         self._bans: dict[str, BeaconBan] = {}
+        self._dirty: bool = False
 
     @property
     def bans(self) -> list[BeaconBan]:
         return list(self._bans.values())
 
+    @property
+    def dirty(self) -> bool:
+        """Whether data has changed since it was last saved."""
+        return self._dirty
+
+    def mark_clean(self):
+        self._dirty = False
+
     def add_ban(self, ban: BeaconBan):
         """Adds a Beacon ban."""
         self._bans.update({ban.id: ban})
+        self._dirty = True
 
     def add_bans(self, bans: list[BeaconBan]):
         """Adds Beacon bans."""
@@ -120,6 +130,7 @@ class BeaconBanManager:
         else:
             self._bans.update({ban.id: ban})
 
+        self._dirty = True
         return ban.expiry
 
     def is_banned(self, user_or_server: beacon_user.BeaconUser | beacon_server.BeaconServer | str):
@@ -138,6 +149,7 @@ class BeaconBanManager:
 
     def remove_ban(self, ban_id: str):
         self._bans.pop(ban_id)
+        self._dirty = True
 
     def to_dict(self) -> dict:
         data = {}
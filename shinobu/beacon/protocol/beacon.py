@@ -17,7 +17,11 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import asyncio
+import hashlib
+import time
+import traceback
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
 from discord.ext import bridge
 from shinobu.beacon.protocol import (drivers as beacon_drivers, spaces as beacon_spaces, messages as beacon_messages,
@@ -26,7 +30,11 @@ from shinobu.beacon.protocol import (drivers as beacon_drivers, spaces as beacon
 from shinobu.beacon.models import (space as beacon_space, message as beacon_message, content as beacon_content,
                                    filter as beacon_filter, member as beacon_member, channel as beacon_channel,
                                    driver as beacon_driver, server as beacon_server, user as beacon_user)
-from shinobu.runtime.secrets import fine_grained
+from shinobu.runtime.secrets import fine_grained, archive, backup
+
+# Segments Beacon data is split into (Spaces are stored as one segment per Space)
+beacon_segments: list[str] = ["raw", "moderators", "bans", "paused", "pairing"]
+beacon_segments_version: int = 1
 
 class BeaconMessageBlockedReason(Enum):
     bridge_paused = 1
@@ -82,6 +90,15 @@ class Beacon:
         # Get data
         self._data: dict = {}
 
+        # Rewrite all segments on next save (e.g. when migrating from the single-file format)
+        self._full_save: bool = False
+
+        # Saved data being decrypted in the background, and how long each boot phase took (in milliseconds)
+        self._prefetch: dict[str, Future] | None = None
+        self._loading: asyncio.Task | None = None
+        self._boot_start: float | None = None
+        self._boot_timings: dict[str, float] = {}
+
         # Create message ID reservations
         self._pending: dict = {}
 
@@ -94,7 +111,20 @@ class Beacon:
             self._config.get("enabled_platforms")
         )
         self._spaces: beacon_spaces.BeaconSpaceManager = beacon_spaces.BeaconSpaceManager()
-        self._messages: beacon_messages.BeaconMessageCache = beacon_messages.BeaconMessageCache(self.__wrapper)
+        self._messages: beacon_messages.BeaconMessageCache = beacon_messages.BeaconMessageCache(
+            self.__wrapper,
+            cache_limit=self._config.get("cache_limit", 10000),
+            journal=self._config.get("cache_journal", False),
+            compact_threshold=self._config.get("cache_compact_threshold", 1000),
+            size_limit=self._config.get("cache_memory_limit", 0) * 1048576 or None,
+            cold_store=self._config.get("cache_cold_store", False),
+            cold_retention=self._config.get("cache_cold_retention", 0) * 86400 or None,
+            compact_groups=self._config.get("cache_pack_groups", False),
+            save_interval=self._config.get("cache_save_interval", 0),
+            save_threshold=self._config.get("cache_save_threshold", 1)
+        )
+        self._messages.set_cold_loader(self._load_group_record)
+        self._messages.set_resolver(self._resolve_message)
         self._filters: beacon_filters.BeaconFilterManager = beacon_filters.BeaconFilterManager()
         self._pausing: beacon_pausing.BeaconPauseManager = beacon_pausing.BeaconPauseManager()
         self._moderators: beacon_mods.BeaconModManager = beacon_mods.BeaconModManager()
@@ -105,6 +135,11 @@ class Beacon:
     def initialized(self) -> bool:
         return self._init and not self._shutdown
 
+    @property
+    def boot_timings(self) -> dict[str, float]:
+        """Durations of each boot phase in milliseconds."""
+        return self._boot_timings
+
     @property
     def config(self) -> dict:
         return self._config
@@ -230,7 +265,47 @@ class Beacon:
 
         self._bridge_tasks.clear()
 
+    @staticmethod
+    def _timed(timings: dict[str, float], phase: str, func, *args):
+        start: float = time.perf_counter()
+
+        try:
+            return func(*args)
+        finally:
+            timings.update({phase: (time.perf_counter() - start) * 1000})
+
+    def prefetch_data(self):
+        """Starts decrypting saved data in the background, so it's ready by the time drivers are. Files are
+        decrypted in parallel, and files written by the same session share a single key derivation."""
+
+        if self._prefetch is not None:
+            return
+
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="beacon-load")
+        self._boot_start = time.perf_counter()
+
+        self._prefetch = {
+            "beacon": executor.submit(self._timed, self._boot_timings, "decrypt_beacon", self._read_data),
+            "cache": executor.submit(
+                self._timed, self._boot_timings, "decrypt_cache", self.__wrapper.read_json, "cache"
+            ),
+            "journal": executor.submit(
+                self._timed, self._boot_timings, "decrypt_journal", self.__wrapper.read_journal_json, "cache"
+            )
+        }
+
+        # Opening the cold store derives its key, which shouldn't happen on the event loop when it's first used
+        if self._messages.cold_store:
+            self._prefetch.update({"store": executor.submit(
+                self._timed, self._boot_timings, "open_cold_store", self.__wrapper.store_open, "cache"
+            )})
+
+        # Threads exit once reads are done
+        executor.shutdown(wait=False)
+
     def load_data(self):
+        self.prefetch_data()
+
         if self.drivers.has_reserved:
             # Wait for all drivers to load
             self.drivers.set_setup_callback(self._load_data)
@@ -238,14 +313,72 @@ class Beacon:
             self._load_data()
 
     def _load_data(self):
-        if self.initialized:
+        if self.initialized or self._loading is not None:
             return
 
-        # Get data from wrapper
-        data: dict = self.__wrapper.read_json("beacon")
+        # Saved data is awaited, so the event loop isn't blocked while it's being decrypted
+        self._loading = asyncio.create_task(self._load_data_async())
+        self._loading.add_done_callback(self._report_load_error)
+
+    @staticmethod
+    def _report_load_error(task: asyncio.Task):
+        # Nothing awaits the loading task, so its errors would otherwise go unnoticed
+        if not task.cancelled() and task.exception():
+            traceback.print_exception(task.exception())
+
+    async def _load_data_async(self):
+        # Wait for saved data to be decrypted
+        self.prefetch_data()
+        timings: dict[str, float] = self._boot_timings
+        phase_start: float = time.perf_counter()
+
+        data: dict = await asyncio.wrap_future(self._prefetch["beacon"])
+        cache: dict = await asyncio.wrap_future(self._prefetch["cache"])
+        journal: list[dict] = await asyncio.wrap_future(self._prefetch["journal"])
+
+        if "store" in self._prefetch:
+            try:
+                await asyncio.wrap_future(self._prefetch["store"])
+            except Exception:
+                # The cold store is best-effort, it'll be opened again when it's first used
+                traceback.print_exc()
+
+        self._prefetch = None
+
+        timings.update({"wait": (time.perf_counter() - phase_start) * 1000})
 
-        # Get cache from wrapper
-        cache: dict = self.__wrapper.read_json("cache")
+        # Load data into managers
+        self._apply_data(data, cache, journal, timings)
+        timings.update({"total": (time.perf_counter() - self._boot_start) * 1000})
+
+        self._init = True
+
+        # Loading data marks everything as changed, but it's already on disk
+        self._mark_clean()
+
+        # Add shutdown cleanup
+        # noinspection PyUnresolvedReferences
+        self.__bot.add_cleanup_func("bridge-close", self._mark_shutdown)
+        # noinspection PyUnresolvedReferences
+        self.__bot.add_cleanup_func("bridge-save-data", self.save_data)
+        # noinspection PyUnresolvedReferences
+        self.__bot.add_cleanup_func("bridge-save-cache", self.messages.save)
+        # noinspection PyUnresolvedReferences
+        self.__bot.add_cleanup_func("bridge-flush-files", self.__wrapper.flush)
+
+        print("Beacon is ready!")
+        print(
+            f"Beacon boot: {round(timings['total'])} ms total, decrypted beacon in "
+            f"{round(timings.get('decrypt_beacon', 0))} ms, cache in {round(timings.get('decrypt_cache', 0))} ms "
+            f"and journal in {round(timings.get('decrypt_journal', 0))} ms (in parallel), waited "
+            f"{round(timings['wait'])} ms, loaded spaces in {round(timings['load_spaces'])} ms, cache in "
+            f"{round(timings['load_cache'])} ms and moderation data in {round(timings['load_moderation'])} ms"
+        )
+
+    def _apply_data(self, data: dict, cache: dict, journal: list[dict], timings: dict[str, float]):
+        """Loads Beacon data and the message cache into the managers, recording how long each phase took."""
+
+        phase_start: float = time.perf_counter()
 
         # Load raw data
         self._data = data.get("raw", {})
@@ -320,60 +453,42 @@ class Beacon:
             # Add space
             self.spaces.add_space(space)
 
+        timings.update({"load_spaces": (time.perf_counter() - phase_start) * 1000})
+        phase_start = time.perf_counter()
+
         # Load bridge pause data
         for user_id, user_pause_data in data.get("paused", {}).items():
             self._pausing.add_pause_from_dict(user_id, user_pause_data)
 
-        # Load message cache
-        for message_id, message_data in cache.get("messages", {}).items():
-            origin_driver: beacon_driver.BeaconDriver = self._drivers.get_driver(message_data.get("origin_platform"))
-            destination_driver: beacon_driver.BeaconDriver = self._drivers.get_driver(message_data.get("platform"))
-
-            if not origin_driver or not destination_driver:
-                continue
+        # Load message cache (this doesn't need to be journaled)
+        self.messages.start_loading()
 
-            user: beacon_user.BeaconUser = origin_driver.get_user(message_data.get("author_id"))
-            server: beacon_server.BeaconServer = destination_driver.get_server(message_data.get("server_id"))
-            channel: beacon_channel.BeaconChannel | None = destination_driver.get_channel(server, message_data.get("channel_id")) if server else None
-
-            if not user or not server or not channel:
-                continue
-
-            message: beacon_message.BeaconMessage = beacon_message.BeaconMessage(
-                message_id=message_id,
-                platform=message_data.get("platform"),
-                origin_platform=message_data.get("origin_platform"),
-                author=user,
-                server=server,
-                channel=channel,
-                preferred_name=message_data.get("preferred_name"),
-                preferred_avatar=message_data.get("preferred_avatar"),
-                webhook_id=message_data.get("webhook_id")
-            )
-
-            self.messages.add_message(message)
+        for message_id, message_data in cache.get("messages", {}).items():
+            self._load_cached_message(message_id, message_data)
 
         # Load message groups
         for group_id, group_data in cache.get("groups", {}).items():
-            group_messages: list[beacon_message.BeaconMessage] = []
+            self._load_cached_group(group_id, group_data)
 
-            for message_id in group_data.get("messages", []):
-                message: beacon_message.BeaconMessage | None = self.messages.get_message(message_id)
+        # Replay message cache journal (records already included in the snapshot are skipped)
+        snapshot_seq: int = cache.get("seq", 0)
+        journal_seq: int = snapshot_seq
+        journal_records: int = 0
 
-                if not message:
-                    continue
+        for record in journal:
+            if record.get("seq", 0) <= snapshot_seq:
+                continue
 
-                group_messages.append(message)
+            for op in record.get("ops", []):
+                self._replay_cache_op(op)
 
-            group: beacon_message.BeaconMessageGroup = beacon_message.BeaconMessageGroup(
-                group_id=group_id,
-                author=group_data.get("author_id"),
-                space_id=group_data.get("author_id"),
-                messages=group_messages,
-                replies=group_data.get("replies", [])
-            )
+            journal_seq = max(journal_seq, record["seq"])
+            journal_records += 1
+
+        self.messages.reset_journal(journal_seq, records=journal_records)
 
-            self.messages.add_message(group)
+        timings.update({"load_cache": (time.perf_counter() - phase_start) * 1000})
+        phase_start = time.perf_counter()
 
         # Load moderators
         if data.get("moderators"):
@@ -421,36 +536,361 @@ class Beacon:
 
             self.pairing.add_pairing(pairing)
 
-        self._init = True
+        timings.update({"load_moderation": (time.perf_counter() - phase_start) * 1000})
+
+    def _resolve_message(self, message: beacon_message.BeaconMessage) -> tuple[
+        beacon_user.BeaconUser | None, beacon_server.BeaconServer | None, beacon_channel.BeaconChannel | None
+    ]:
+        """Resolves the author, server and channel of a cached message."""
+
+        origin_driver: beacon_driver.BeaconDriver = self._drivers.get_driver(message.origin_platform)
+        destination_driver: beacon_driver.BeaconDriver = self._drivers.get_driver(message.platform)
+
+        user: beacon_user.BeaconUser | None = origin_driver.get_user(message.author_id) if origin_driver else None
+        server: beacon_server.BeaconServer | None = destination_driver.get_server(
+            message.server_id
+        ) if destination_driver and message.server_id else None
+        channel: beacon_channel.BeaconChannel | None = destination_driver.get_channel(
+            server, message.channel_id
+        ) if server and message.channel_id else None
+
+        return user, server, channel
+
+    def _load_cached_message(self, message_id: str, message_data: dict) -> beacon_message.BeaconMessage | None:
+        if self.messages.get_message(message_id):
+            return None
+
+        if not message_data.get("platform") or not message_data.get("author_id"):
+            return None
+
+        # Drivers may not be connected yet, so the author, server and channel are resolved when first needed
+        message: beacon_message.BeaconMessage = beacon_message.BeaconMessage(
+            message_id=message_id,
+            platform=message_data.get("platform"),
+            origin_platform=message_data.get("origin_platform"),
+            author=message_data.get("author_id"),
+            server=message_data.get("server_id"),
+            channel=message_data.get("channel_id"),
+            preferred_name=message_data.get("preferred_name"),
+            preferred_avatar=message_data.get("preferred_avatar"),
+            webhook_id=message_data.get("webhook_id"),
+            resolver=self._resolve_message
+        )
 
-        # Add shutdown cleanup
-        # noinspection PyUnresolvedReferences
-        self.__bot.add_cleanup_func("bridge-close", self._mark_shutdown)
-        # noinspection PyUnresolvedReferences
-        self.__bot.add_cleanup_func("bridge-save-data", self.save_data)
-        # noinspection PyUnresolvedReferences
-        self.__bot.add_cleanup_func("bridge-save-cache", self.messages.save)
+        self.messages.add_message(message)
+        return message
 
-        print("Beacon is ready!")
+    def _load_cached_group(self, group_id: str, group_data: dict) -> beacon_message.BeaconMessageGroup | None:
+        if self.messages.get_message_group(group_id):
+            return None
+
+        group_messages: list[beacon_message.BeaconMessage] = []
+
+        for message_id in group_data.get("messages", []):
+            message: beacon_message.BeaconMessage | None = self.messages.get_message(message_id)
+
+            if not message:
+                continue
+
+            group_messages.append(message)
+
+        group: beacon_message.BeaconMessageGroup = beacon_message.BeaconMessageGroup(
+            group_id=group_id,
+            author=group_data.get("author", group_data.get("author_id")),
+            space_id=group_data.get("space", group_data.get("space_id")),
+            messages=group_messages,
+            replies=group_data.get("replies", []),
+            created=group_data.get("created", 0)
+        )
+
+        self.messages.add_message(group)
+        return group
+
+    def _load_group_record(self, record: dict) -> beacon_message.BeaconMessageGroup | None:
+        """Loads a group and its messages (see BeaconMessageCache.get_group_record) into the message cache."""
+
+        for message_id, message_data in record.get("messages", {}).items():
+            self._load_cached_message(message_id, message_data)
+
+        group_data: dict = record.get("group", {})
+        if not group_data.get("id"):
+            return None
+
+        return self._load_cached_group(group_data["id"], group_data) or self.messages.get_message_group(
+            group_data["id"]
+        )
+
+    def _replay_cache_op(self, op: dict):
+        if op.get("op") == "add":
+            self._load_group_record(op)
+        elif op.get("op") == "remove":
+            group: beacon_message.BeaconMessageGroup | None = self.messages.get_message_group(op.get("group"))
+
+            if group:
+                self.messages.remove_message_group(group, save=False)
+
+    @staticmethod
+    def _get_space_segment(space_id: str) -> str:
+        # Space IDs aren't guaranteed to be alphanumeric, so we'll use a hash instead
+        return "space" + hashlib.sha256(space_id.encode()).hexdigest()[:32]
+
+    def _read_data(self) -> dict:
+        segments: list[str] = self.__wrapper.list_segments("beacon")
+
+        if "meta" not in segments:
+            # Segments haven't been fully written yet, so use the single-file format and migrate on next save
+            self._full_save = True
+            return self.__wrapper.read_json("beacon")
+
+        data: dict = {"spaces": {}}
+        segments = [segment for segment in segments if segment.startswith("space") or segment in beacon_segments]
+
+        # Segments written by the same session share a master key, so only the first one needs a key derivation
+        for segment in segments:
+            segment_data: dict = self.__wrapper.read_segment_json("beacon", segment)
+
+            if segment.startswith("space"):
+                if segment_data.get("id"):
+                    data["spaces"].update({segment_data["id"]: segment_data})
+            else:
+                data.update({segment: segment_data})
+
+        return data
+
+    def _mark_clean(self):
+        self._spaces.mark_clean()
+        self._moderators.mark_clean()
+        self._bans.mark_clean()
+        self._pausing.mark_clean()
+        self._pairing.mark_clean()
+
+    def _get_dirty_segments(self) -> dict[str, dict | None]:
+        """Returns segments that need to be saved. Segments that need to be removed are set to None."""
+
+        full: bool = self._full_save
+        segments: dict[str, dict | None] = {}
+
+        if full:
+            # Raw data is only changed when loading
+            segments.update({"raw": self._data})
+
+        if full or self._moderators.dirty:
+            segments.update({"moderators": self._moderators.to_dict()})
+
+        if full or self._bans.dirty:
+            segments.update({"bans": self._bans.to_dict()})
+
+        if full or self._pausing.dirty:
+            segments.update({"paused": self._pausing.to_dict()})
+
+        if full or self._pairing.dirty:
+            segments.update({"pairing": self._pairing.to_dict()})
+
+        for space in self._spaces.all_spaces if full else self._spaces.dirty_spaces:
+            segments.update({self._get_space_segment(space.id): space.to_dict()})
+
+        for space_id in self._spaces.deleted_spaces:
+            segments.update({self._get_space_segment(space_id): None})
+
+        return segments
 
     def _mark_shutdown(self):
         self._shutdown = True
 
+    def _to_dict(self) -> dict:
+        return {
+            "spaces": self._spaces.to_dict(),
+            "moderators": self._moderators.to_dict(),
+            "bans": self._bans.to_dict(),
+            "paused": self._pausing.to_dict(),
+            "pairing": self._pairing.to_dict(),
+            "raw": self._data
+        }
+
     def save_data(self):
+        """Saves Beacon data. Only segments that have changed since the last save are written."""
+
         if not self.initialized:
             raise BeaconNotInit()
 
-        # Assemble data dict
-        data: dict = {
-            "spaces": self._spaces.to_dict(),
+        full: bool = self._full_save
+        segments: dict[str, dict | None] = self._get_dirty_segments()
+        self._mark_clean()
+
+        try:
+            for segment, segment_data in segments.items():
+                if segment_data is None:
+                    self.__wrapper.remove_segment("beacon", segment)
+                else:
+                    self.__wrapper.save_segment_json("beacon", segment, segment_data)
+
+            if full:
+                # Mark segments as fully written
+                self.__wrapper.save_segment_json("beacon", "meta", {"version": beacon_segments_version})
+                self._full_save = False
+        except:
+            # We don't know which segments were written, so write everything next time
+            self._full_save = True
+            raise
+
+    async def save_data_async(self):
+        """Saves Beacon data without blocking the event loop. Only segments that have changed since the
+        last save are written. If a segment is saved again before the write starts, only the newest copy
+        is written."""
+
+        if not self.initialized:
+            raise BeaconNotInit()
+
+        full: bool = self._full_save
+        segments: dict[str, dict | None] = self._get_dirty_segments()
+        self._mark_clean()
+
+        try:
+            await asyncio.gather(*[
+                self.__wrapper.remove_segment_async("beacon", segment) if segment_data is None else
+                self.__wrapper.save_segment_json_async("beacon", segment, segment_data)
+                for segment, segment_data in segments.items()
+            ])
+
+            if full:
+                # Mark segments as fully written
+                await self.__wrapper.save_segment_json_async(
+                    "beacon", "meta", {"version": beacon_segments_version}
+                )
+                self._full_save = False
+        except:
+            # We don't know which segments were written, so write everything next time
+            self._full_save = True
+            raise
+
+    def _get_archive_documents(self) -> list[archive.ArchiveDocument]:
+        """Returns archive documents for Beacon data and the message cache. Segments are converted now, while
+        the message cache is converted as the archive is written."""
+
+        segments: dict[str, dict] = {
+            "meta": {"version": beacon_segments_version},
+            "raw": self._data.copy(),
             "moderators": self._moderators.to_dict(),
             "bans": self._bans.to_dict(),
             "paused": self._pausing.to_dict(),
-            "pairing": self._pairing.to_dict(),
-            "raw": self._data
+            "pairing": self._pairing.to_dict()
         }
 
-        self.__wrapper.save_json("beacon", data)
+        for space in self._spaces.all_spaces:
+            segments.update({self._get_space_segment(space.id): space.to_dict()})
+
+        documents: list[archive.ArchiveDocument] = [
+            archive.ArchiveDocument("beacon", segment, entries=backup.iter_entries(segment_data))
+            for segment, segment_data in segments.items()
+        ]
+        documents.append(archive.ArchiveDocument("cache", entries=self.messages.iter_entries()))
+
+        return documents
+
+    async def backup(self, name: str | None = None, progress=None) -> dict:
+        """Writes Beacon data and the message cache to an archive without blocking the event loop. Returns
+        the archive's summary, along with its name.
+
+        progress is called from another thread with the number of entries and bytes written so far."""
+
+        if not self.initialized:
+            raise BeaconNotInit()
+
+        name = name or f"beacon{time.strftime('%Y%m%d%H%M%S')}"
+        documents: list[archive.ArchiveDocument] = self._get_archive_documents()
+
+        summary: dict = await asyncio.to_thread(self.__wrapper.write_archive, name, documents, progress)
+        summary.update({"name": name})
+        return summary
+
+    def list_backups(self) -> list[str]:
+        """Lists archives, newest first."""
+        return self.__wrapper.list_archives()
+
+    def _read_archive(self, name: str, progress=None) -> tuple[dict, dict, list[dict], dict]:
+        """Reads an archive into Beacon data, the message cache and its journal, along with the archive's
+        summary. The archive is decrypted once and validated as it's read, so if it's damaged, this raises
+        ValueError before anything read from it can be used."""
+
+        data: dict = {"spaces": {}}
+        single: dict | None = None
+        cache: dict = {}
+        journal: list[dict] = []
+        has_meta: bool = False
+        summary: dict = {"documents": 0, "entries": 0, "size": 0, "files": set()}
+
+        def update_progress(entries: int, size: int):
+            summary.update({"entries": entries, "size": size})
+
+            if progress:
+                progress(entries, size)
+
+        for document, content in self.__wrapper.iter_archive(name, update_progress):
+            summary["documents"] += 1
+            summary["files"].add(document.filename)
+
+            if document.filename == "cache":
+                if document.journal:
+                    journal = content
+                elif document.segment is None:
+                    cache = content
+            elif document.filename == "beacon" and not document.journal:
+                if document.segment is None:
+                    single = content
+                elif document.segment == "meta":
+                    has_meta = True
+                elif document.segment.startswith("space"):
+                    if content.get("id"):
+                        data["spaces"].update({content["id"]: content})
+                elif document.segment in beacon_segments:
+                    data.update({document.segment: content})
+
+        if not has_meta:
+            # Segments weren't fully written when the archive was taken, so use the single-file format
+            if single is None:
+                raise ValueError("Archive does not contain Beacon data")
+
+            data = single
+
+        summary.update({"files": sorted(summary["files"])})
+        return data, cache, journal, summary
+
+    async def restore(self, name: str, progress=None) -> dict:
+        """Restores Beacon data and the message cache from an archive. The whole archive is decrypted and
+        validated before anything is changed, so a damaged archive leaves the current state untouched.
+        Returns the archive's summary.
+
+        progress is called from another thread with the number of entries and bytes validated so far."""
+
+        if not self.initialized:
+            raise BeaconNotInit()
+
+        # Decrypt and validate archive (nothing is applied until it's been fully read)
+        data, cache, journal, summary = await asyncio.to_thread(self._read_archive, name, progress)
+
+        # Swap state in (nothing is awaited here, so other tasks never see partially restored data)
+        self._data = {}
+        self._spaces = beacon_spaces.BeaconSpaceManager()
+        self._pausing = beacon_pausing.BeaconPauseManager()
+        self._moderators = beacon_mods.BeaconModManager()
+        self._bans = beacon_bans.BeaconBanManager()
+        self._pairing = beacon_pairing.BeaconPairingManager()
+        self._messages.clear()
+        self._apply_data(data, cache, journal, {})
+
+        # Restored data replaces everything on disk, including Spaces that don't exist in the archive
+        restored: set[str] = {self._get_space_segment(space.id) for space in self._spaces.all_spaces}
+        stale: list[str] = [
+            segment for segment in self.__wrapper.list_segments("beacon")
+            if segment.startswith("space") and segment not in restored
+        ]
+
+        self._full_save = True
+        await self.save_data_async()
+        await asyncio.gather(*[self.__wrapper.remove_segment_async("beacon", segment) for segment in stale])
+        await self.messages.save_snapshot_async()
+
+        return summary
 
     def _reserve_message(self, message_id: str, group_id: str):
         self._pending.update({message_id: {"group_id": group_id, "callbacks": []}})
@@ -614,7 +1054,8 @@ class Beacon:
     async def _edit_platform(self, driver: beacon_driver.BeaconDriver, message_group: beacon_message.BeaconMessageGroup,
                              content: beacon_message.BeaconMessageContent, emoji_mapping: dict | None = None):
         platform_messages: list[beacon_message.BeaconMessage] = [
-            message for _, message in message_group.messages.items() if message.platform == driver.platform and message.id != content.original_id
+            message for message in message_group.get_messages_for_platform(driver.platform) if
+            message.id != content.original_id and message.channel
         ]
         tasks: list[BeaconCallback] = []
 
@@ -649,8 +1090,8 @@ class Beacon:
                                message_group: beacon_message.BeaconMessageGroup, original: beacon_message.BeaconMessage
                                ):
         platform_messages: list[beacon_message.BeaconMessage] = [
-            message for _, message in message_group.messages.items() if message.platform == driver.platform and
-                                                                        message.id != original.id
+            message for message in message_group.get_messages_for_platform(driver.platform) if
+            message.id != original.id and message.channel
         ]
         tasks = []
 
@@ -672,8 +1113,8 @@ class Beacon:
 
         # Get messages
         for message_group in message_groups:
-            for message in message_group.messages.values():
-                if message.platform != driver.platform:
+            for message in message_group.get_messages_for_platform(driver.platform):
+                if not message.channel:
                     continue
 
                 if message.channel.id not in platform_channel_messages:
@@ -699,8 +1140,8 @@ class Beacon:
                             message_group: beacon_message.BeaconMessageGroup, original: beacon_message.BeaconMessage,
                             unpin: bool = False):
         platform_messages: list[beacon_message.BeaconMessage] = [
-            message for _, message in message_group.messages.items() if message.platform == driver.platform and
-                                                                        message.id != original.id
+            message for message in message_group.get_messages_for_platform(driver.platform) if
+            message.id != original.id and message.channel
         ]
         tasks = []
 
@@ -844,20 +1285,23 @@ class Beacon:
         for reply in content.replies:
             replies_groups.append(reply.id)
 
+        # Keep a preview so replies to this message can be shown without fetching it
+        preview_length: int = self._config.get("cache_preview_length", 0)
+
         # Create message group
         message_group: beacon_message.BeaconMessageGroup = beacon_message.BeaconMessageGroup(
             group_id=group_id,
             author=author,
             space_id=space.id,
             messages=results_final,
-            replies=replies_groups
+            replies=replies_groups,
+            preview=content.to_preview(preview_length) if preview_length > 0 else None,
+            author_name=(preferred_name or author.display_name) if preview_length > 0 else None
         )
 
         # Cache message group
-        # noinspection PyTypeChecker
-        await self.__bot.loop.run_in_executor(
-            None, lambda: self._messages.add_message(message_group, save=True)
-        )
+        self._messages.add_message(message_group)
+        await self._messages.save_async()
 
         # Run pending actions
         await self._run_pending_actions(content.original_id)
@@ -889,7 +1333,7 @@ class Beacon:
         author: beacon_member.BeaconMember = origin_driver.get_member(server, message.author.id)
 
         # Get message group
-        message_group: beacon_message.BeaconMessageGroup = self.messages.get_group_from_message(message.id)
+        message_group: beacon_message.BeaconMessageGroup = await self.messages.fetch_group_from_message(message.id)
         if not message_group:
             # We can't do anything with uncached messages
             return
@@ -949,6 +1393,11 @@ class Beacon:
         # Bridge to platforms
         await self._strategy_async(tasks, return_exceptions=not self.debug)
 
+        # Replies to this message should show the edited text
+        preview_length: int = self._config.get("cache_preview_length", 0)
+        if preview_length > 0:
+            self.messages.set_preview(message_group.id, content.to_preview(preview_length))
+
     async def delete(self, message: beacon_message.BeaconMessage):
         """Deletes a message sent to a Space."""
 
@@ -963,7 +1412,7 @@ class Beacon:
             raise BeaconIsBanned(message.server.id)
 
         # Get message group
-        message_group: beacon_message.BeaconMessageGroup = self.messages.get_group_from_message(message.id)
+        message_group: beacon_message.BeaconMessageGroup = await self.messages.fetch_group_from_message(message.id)
         if not message_group:
             # We can't do anything with uncached messages
             return
@@ -995,8 +1444,8 @@ class Beacon:
         await self._strategy_async(tasks, return_exceptions=not self.debug)
 
         # Remove message group from cache
-        # noinspection PyTypeChecker
-        await self.__bot.loop.run_in_executor(None, lambda: self.messages.remove_message_group(message_group))
+        self.messages.remove_message_group(message_group, save=False)
+        await self.messages.save_async()
 
     async def purge(self, messages: list[beacon_message.BeaconMessage]):
         """Purges messages sent to a Space."""
@@ -1014,7 +1463,7 @@ class Beacon:
         # Get message groups
         message_groups: list[beacon_message.BeaconMessageGroup] = []
         for message in messages:
-            message_group: beacon_message.BeaconMessageGroup = self.messages.get_group_from_message(message.id)
+            message_group: beacon_message.BeaconMessageGroup = await self.messages.fetch_group_from_message(message.id)
             if not message_group:
                 # We can't do anything with uncached messages
                 continue
@@ -1031,6 +1480,30 @@ class Beacon:
 
             message_groups.append(message_group)
 
+        await self._purge_groups(message_groups)
+
+    async def purge_recent(self, target_id: str, space: beacon_space.BeaconSpace, limit: int = 100) -> int:
+        """Purges the most recent messages sent to a Space by a user, or sent from a channel. Only messages in
+        the message cache's memory are looked up. Returns the number of purged messages."""
+
+        if not self.initialized:
+            raise BeaconNotInit()
+
+        # Both lookups only go through groups of the target, rather than the whole cache
+        message_groups: list[beacon_message.BeaconMessageGroup] = (
+            self.messages.get_author_groups(target_id) or self.messages.get_channel_groups(target_id)
+        )
+        message_groups = [
+            message_group for message_group in message_groups if message_group.space_id == space.id
+        ][:limit]
+
+        if len(message_groups) == 0:
+            return 0
+
+        await self._purge_groups(message_groups)
+        return len(message_groups)
+
+    async def _purge_groups(self, message_groups: list[beacon_message.BeaconMessageGroup]):
         # Edit message for each platform
         tasks = []
         for platform in self._drivers.platforms:
@@ -1049,8 +1522,9 @@ class Beacon:
 
         # Remove message groups from cache
         for message_group in message_groups:
-            # noinspection PyTypeChecker
-            await self.__bot.loop.run_in_executor(None, lambda: self.messages.remove_message_group(message_group))
+            self.messages.remove_message_group(message_group, save=False)
+
+        await self.messages.save_async()
 
     async def pin(self, message: beacon_message.BeaconMessage, unpin: bool = False):
         """Pins or unpins a message sent to a Space."""
@@ -1070,7 +1544,7 @@ class Beacon:
             raise BeaconIsBanned(message.server.id)
 
         # Get message group
-        message_group: beacon_message.BeaconMessageGroup = self.messages.get_group_from_message(message.id)
+        message_group: beacon_message.BeaconMessageGroup = await self.messages.fetch_group_from_message(message.id)
         if not message_group:
             # We can't do anything with uncached messages
             return
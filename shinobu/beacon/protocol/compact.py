@@ -0,0 +1,238 @@
+"""
+Shinobu - Converse from anywhere, anytime.
+Copyright (C) 2026-present  Green (@greeeen-dev)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import struct
+from shinobu.beacon.models import message as beacon_message
+
+# Group header: author ID, space, number of replies, number of messages, preview, author name, creation time
+group_struct: struct.Struct = struct.Struct("<qIHHhhd")
+
+# Reply: group ID
+reply_struct: struct.Struct = struct.Struct("<q")
+
+# Message: ID, platform, origin platform, author ID, server ID, channel ID, webhook ID, preferred name,
+# preferred avatar
+message_struct: struct.Struct = struct.Struct("<qBBqqqqhh")
+
+# Estimated memory used by a compact group (object, bytes and strings headers) in bytes
+compact_overhead: int = 160
+string_overhead: int = 56
+
+# IDs up to this value are stored as integers, anything else is stored as a string
+max_int_id: int = 2 ** 63 - 1
+
+class BeaconInternTable:
+    """Maps strings that repeat a lot (e.g. platforms and space IDs) to small integers."""
+
+    def __init__(self, limit: int):
+        self._limit: int = limit
+        self._values: list[str] = []
+        self._indexes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def intern(self, value: str) -> int:
+        index: int | None = self._indexes.get(value)
+
+        if index is None:
+            if len(self._values) >= self._limit:
+                raise ValueError("Intern table is full")
+
+            index = len(self._values)
+            self._values.append(value)
+            self._indexes.update({value: index})
+
+        return index
+
+    def get(self, index: int) -> str:
+        return self._values[index]
+
+def _add_string(value: str, strings: list[str]) -> int:
+    try:
+        return strings.index(value)
+    except ValueError:
+        strings.append(value)
+        return len(strings) - 1
+
+def _encode_id(value: str | None, strings: list[str]) -> int:
+    """Encodes an ID as an integer. Snowflakes are stored as they are, None is -1 and anything else is an
+    index into the group's strings."""
+
+    if value is None:
+        return -1
+
+    if value.isascii() and value.isdigit() and (value == "0" or value[0] != "0") and int(value) <= max_int_id:
+        return int(value)
+
+    return -2 - _add_string(value, strings)
+
+def _decode_id(value: int, strings: tuple[str, ...]) -> str | None:
+    if value >= 0:
+        return str(value)
+
+    if value == -1:
+        return None
+
+    return strings[-2 - value]
+
+def _encode_string(value: str | None, strings: list[str]) -> int:
+    return _add_string(value, strings) if value is not None else -1
+
+class BeaconCompactGroup:
+    """A message group and its messages packed into bytes.
+
+    Snowflake IDs are stored as integers, and platforms and spaces are interned, so a group takes a fraction
+    of the memory of a BeaconMessageGroup and its BeaconMessage objects. Message content, attachments and
+    replies aren't kept, as they aren't saved to disk either (the group's preview is). Use unpack to get a BeaconMessageGroup view."""
+
+    __slots__ = ("_id", "_data", "_strings")
+
+    def __init__(self, group_id: str, data: bytes, strings: tuple[str, ...]):
+        self._id: str = group_id
+        self._data: bytes = data
+        self._strings: tuple[str, ...] = strings
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def messages(self) -> list[str]:
+        """Returns the IDs of the group's messages."""
+
+        _, _, reply_count, message_count, _, _, _ = group_struct.unpack_from(self._data, 0)
+        offset: int = group_struct.size + reply_struct.size * reply_count
+
+        return [
+            _decode_id(message_struct.unpack_from(self._data, offset + message_struct.size * index)[0], self._strings)
+            for index in range(message_count)
+        ]
+
+    @property
+    def author_id(self) -> str | None:
+        return _decode_id(group_struct.unpack_from(self._data, 0)[0], self._strings)
+
+    @property
+    def channels(self) -> list[str]:
+        """Returns the IDs of the channels the group's messages were sent to."""
+
+        _, _, reply_count, message_count, _, _, _ = group_struct.unpack_from(self._data, 0)
+        offset: int = group_struct.size + reply_struct.size * reply_count
+
+        return [
+            _decode_id(message_struct.unpack_from(self._data, offset + message_struct.size * index)[5], self._strings)
+            for index in range(message_count)
+        ]
+
+    @property
+    def created(self) -> float:
+        return group_struct.unpack_from(self._data, 0)[6]
+
+    @property
+    def size(self) -> int:
+        """Estimated memory used by the group in bytes."""
+        return compact_overhead + len(self._data) + sum(string_overhead + len(string) for string in self._strings)
+
+    @classmethod
+    def pack(cls, message_group: beacon_message.BeaconMessageGroup, platforms: BeaconInternTable,
+             spaces: BeaconInternTable) -> 'BeaconCompactGroup':
+        """Packs a group. Raises ValueError if the group can't be packed."""
+
+        strings: list[str] = []
+        messages: list[beacon_message.BeaconMessage] = [
+            message for message in message_group.messages.values() if message
+        ]
+
+        try:
+            parts: list[bytes] = [group_struct.pack(
+                _encode_id(message_group.author_id, strings),
+                spaces.intern(message_group.space_id),
+                len(message_group.replies),
+                len(messages),
+                _encode_string(message_group.preview, strings),
+                _encode_string(message_group.author_name, strings),
+                message_group.created
+            )]
+
+            for reply in message_group.replies:
+                parts.append(reply_struct.pack(_encode_id(reply, strings)))
+
+            for message in messages:
+                parts.append(message_struct.pack(
+                    _encode_id(message.id, strings),
+                    platforms.intern(message.platform),
+                    platforms.intern(message.origin_platform),
+                    _encode_id(message.author_id, strings),
+                    _encode_id(message.server_id, strings),
+                    _encode_id(message.channel_id, strings),
+                    _encode_id(message.webhook_id, strings),
+                    _encode_string(message.preferred_name, strings),
+                    _encode_string(message.preferred_avatar, strings)
+                ))
+        except (struct.error, AttributeError, TypeError) as e:
+            raise ValueError("Group can't be packed") from e
+
+        return cls(message_group.id, b"".join(parts), tuple(strings))
+
+    def unpack(self, platforms: BeaconInternTable, spaces: BeaconInternTable,
+               resolver=None) -> beacon_message.BeaconMessageGroup:
+        """Returns a BeaconMessageGroup view of the group. Authors, servers and channels are resolved with
+        the resolver when they're first accessed (see BeaconMessage)."""
+
+        (
+            author_id, space, reply_count, message_count, preview, author_name, created
+        ) = group_struct.unpack_from(self._data, 0)
+        offset: int = group_struct.size
+
+        replies: list[str] = []
+        for _ in range(reply_count):
+            replies.append(_decode_id(reply_struct.unpack_from(self._data, offset)[0], self._strings))
+            offset += reply_struct.size
+
+        messages: list[beacon_message.BeaconMessage] = []
+        for _ in range(message_count):
+            (
+                message_id, platform, origin_platform, message_author_id, server_id, channel_id, webhook_id,
+                preferred_name, preferred_avatar
+            ) = message_struct.unpack_from(self._data, offset)
+            offset += message_struct.size
+
+            messages.append(beacon_message.BeaconMessage(
+                message_id=_decode_id(message_id, self._strings),
+                platform=platforms.get(platform),
+                origin_platform=platforms.get(origin_platform),
+                author=_decode_id(message_author_id, self._strings),
+                server=_decode_id(server_id, self._strings),
+                channel=_decode_id(channel_id, self._strings),
+                webhook_id=_decode_id(webhook_id, self._strings),
+                preferred_name=self._strings[preferred_name] if preferred_name >= 0 else None,
+                preferred_avatar=self._strings[preferred_avatar] if preferred_avatar >= 0 else None,
+                resolver=resolver
+            ))
+
+        return beacon_message.BeaconMessageGroup(
+            group_id=self._id,
+            author=_decode_id(author_id, self._strings),
+            space_id=spaces.get(space),
+            messages=messages,
+            replies=replies,
+            preview=self._strings[preview] if preview >= 0 else None,
+            author_name=self._strings[author_name] if author_name >= 0 else None,
+            created=created
+        )
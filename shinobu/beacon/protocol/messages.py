@@ -16,23 +16,350 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import typing
+import time
+import heapq
+import asyncio
+import traceback
+import collections
+import ujson as json
+from concurrent.futures import Future
 from shinobu.runtime.secrets import fine_grained
 from shinobu.beacon.models import message as beacon_message
+from shinobu.beacon.protocol import compact
+
+# Estimated memory used by a cached message or group, not counting message content
+message_overhead: int = 1024
+group_overhead: int = 512
 
 class BeaconMessageCache:
-    def __init__(self, wrapper: fine_grained.FineGrainedSecureFiles, cache_limit: int = 10000):
+    def __init__(self, wrapper: fine_grained.FineGrainedSecureFiles, cache_limit: int = 10000, journal: bool = False,
+                 compact_threshold: int = 1000, size_limit: int | None = None, cold_store: bool = False,
+                 cold_retention: float | None = None, compact_groups: bool = False, save_interval: float = 0,
+                 save_threshold: int = 1):
         self.__wrapper: fine_grained.FineGrainedSecureFiles = wrapper
         self._cache_limit = cache_limit
+        self._size_limit: int | None = size_limit
         self._data: dict[str, beacon_message.BeaconMessage] = {}
-        self._data_groups: dict[str, beacon_message.BeaconMessageGroup] = {}
+
+        # Groups are kept in least to most recently used order
+        self._data_groups: collections.OrderedDict[
+            str, beacon_message.BeaconMessageGroup | compact.BeaconCompactGroup
+        ] = collections.OrderedDict()
+
+        # Groups can be packed into bytes, in which case their messages aren't kept in _data. Views are
+        # created when they're accessed, and their authors, servers and channels are resolved by Beacon.
+        self._compact_groups: bool = compact_groups
+        self._compact_messages: int = 0
+        self._resolver = None
+        self._platforms: compact.BeaconInternTable = compact.BeaconInternTable(256)
+        self._spaces: compact.BeaconInternTable = compact.BeaconInternTable(2 ** 32)
+
+        # Estimated size of each group (including its messages) in bytes
+        self._group_sizes: dict[str, int] = {}
+        self._size: int = 0
+
+        # Eviction metrics
+        self._evictions_count: int = 0
+        self._evictions_size: int = 0
+        self._evicted_bytes: int = 0
+
+        # Message ID to group ID index, so groups can be found without scanning every group
+        self._message_groups: dict[str, str] = {}
+
+        # Channel ID and author ID to group IDs indexes, along with when each group was created (groups loaded
+        # back from the cold store are added after newer groups, so insertion order can't be used)
+        self._channel_groups: dict[str, dict[str, float]] = {}
+        self._author_groups: dict[str, dict[str, float]] = {}
+
+        # Evicted groups are moved to an encrypted on-disk store, and loaded back in when they're needed.
+        # Loading needs drivers to resolve users and channels, so Beacon provides the loader.
+        self._cold_store: bool = cold_store
+        self._cold_retention: float | None = cold_retention
+        self._cold_loader = None
+        self._cold_hits: int = 0
+        self._cold_misses: int = 0
+        self._cold_writes: int = 0
+        self._cold_last_prune: float = 0
+
+        # Lookup metrics (cold store hits are counted separately)
+        self._stats_since: float = time.time()
+        self._lookups: int = 0
+        self._lookup_hits: int = 0
+        self._lookup_misses: int = 0
+
+        # Save metrics (times are in seconds, the last save's values are kept along with totals)
+        self._writes: int = 0
+        self._write_time: float = 0
+        self._write_time_total: float = 0
+        self._write_bytes: int = 0
+        self._bytes_written: int = 0
+        self._serialize_time: float = 0
+
+        # Reply preview metrics (misses mean the platform had to fetch the message)
+        self._preview_hits: int = 0
+        self._preview_misses: int = 0
+
+        # Changes are saved once enough of them have been made or enough time has passed since the last save,
+        # so a busy bridge doesn't write the cache for every message
+        self._save_interval: float = save_interval
+        self._save_threshold: int = save_threshold
+        self._unsaved: int = 0
+        self._last_save: float = time.monotonic()
+        self._save_task: asyncio.Task | None = None
+
+        # Snapshots are converted off the event loop, so saves are queued in order to keep an older snapshot
+        # from replacing a newer one (or a compaction from discarding a newer journal record)
+        self._save_lock: asyncio.Lock = asyncio.Lock()
+
+        # Journal state
+        self._journal: bool = journal
+        self._compact_threshold: int = compact_threshold
+        self._journal_seq: int = 0
+        self._journal_records: int = 0
+        self._journal_ops: list[dict] = []
+        self._loading: bool = False
 
     @property
     def cache_limit(self) -> int:
         return self._cache_limit
 
+    @property
+    def size_limit(self) -> int | None:
+        """Estimated memory the cache may use in bytes. None means there's no limit."""
+        return self._size_limit
+
+    @property
+    def size(self) -> int:
+        """Estimated memory used by cached groups in bytes."""
+        return self._size
+
     @property
     def messages(self) -> int:
-        return len(self._data.keys())
+        return len(self._data.keys()) + self._compact_messages
+
+    @property
+    def compact_groups(self) -> bool:
+        return self._compact_groups and self._resolver is not None
+
+    def set_resolver(self, resolver):
+        """Sets the function used to resolve the authors, servers and channels of messages in packed groups
+        (see BeaconMessage)."""
+        self._resolver = resolver
+
+    def _materialize(self, message_group: beacon_message.BeaconMessageGroup | compact.BeaconCompactGroup | None
+                     ) -> beacon_message.BeaconMessageGroup | None:
+        """Returns a group as a BeaconMessageGroup, unpacking it if it's been packed."""
+
+        if type(message_group) is compact.BeaconCompactGroup:
+            return message_group.unpack(self._platforms, self._spaces, resolver=self._resolver)
+
+        return message_group
+
+    @property
+    def cold_store(self) -> bool:
+        return self._cold_store and self._cold_loader is not None
+
+    def set_cold_loader(self, loader):
+        """Sets the function used to load groups from the cold store. It's called with a group record (see
+        get_group_record) and should add the group and its messages to the cache."""
+        self._cold_loader = loader
+
+    @property
+    def journal(self) -> bool:
+        return self._journal
+
+    @property
+    def unsaved(self) -> int:
+        """Number of changes that haven't been saved yet. These are lost if Shinobu crashes."""
+        return self._unsaved
+
+    @property
+    def journal_seq(self) -> int:
+        return self._journal_seq
+
+    @property
+    def journal_records(self) -> int:
+        return self._journal_records
+
+    def _add_journal_op(self, op: dict):
+        if self._journal and not self._loading:
+            self._journal_ops.append(op)
+
+    def start_loading(self):
+        """Stops changes from being added to the journal until reset_journal is called, as changes made while
+        the cache is being loaded are already on disk."""
+        self._loading = True
+
+    def reset_journal(self, seq: int, records: int = 0):
+        """Sets the journal state after the cache has been loaded. Any changes made while loading are
+        discarded from the journal, as they're already on disk."""
+
+        self._loading = False
+        self._journal_seq = seq
+        self._journal_records = records
+        self._journal_ops.clear()
+        self._mark_saved()
+
+    @staticmethod
+    def _get_group_channels(message_group: beacon_message.BeaconMessageGroup | compact.BeaconCompactGroup
+                            ) -> set[str]:
+        if type(message_group) is compact.BeaconCompactGroup:
+            channels: list[str | None] = message_group.channels
+        else:
+            channels: list[str | None] = [message.channel_id for message in message_group.messages.values() if message]
+
+        return {channel_id for channel_id in channels if channel_id}
+
+    def _index_group(self, message_group: beacon_message.BeaconMessageGroup | compact.BeaconCompactGroup):
+        for message_id in message_group.messages:
+            self._message_groups.update({message_id: message_group.id})
+
+        for channel_id in self._get_group_channels(message_group):
+            self._channel_groups.setdefault(channel_id, {}).update({message_group.id: message_group.created})
+
+        if message_group.author_id:
+            self._author_groups.setdefault(message_group.author_id, {}).update(
+                {message_group.id: message_group.created}
+            )
+
+    def _unindex_group(self, message_group: beacon_message.BeaconMessageGroup | compact.BeaconCompactGroup):
+        for message_id in message_group.messages:
+            # Only remove entries that still point to this group
+            if self._message_groups.get(message_id) == message_group.id:
+                self._message_groups.pop(message_id)
+
+        for channel_id in self._get_group_channels(message_group):
+            self._unindex_key(self._channel_groups, channel_id, message_group.id)
+
+        self._unindex_key(self._author_groups, message_group.author_id, message_group.id)
+
+    @staticmethod
+    def _unindex_key(index: dict[str, dict[str, float]], key: str | None, group_id: str):
+        group_ids: dict[str, float] | None = index.get(key)
+
+        if group_ids is None:
+            return
+
+        group_ids.pop(group_id, None)
+
+        # Don't keep empty entries around
+        if len(group_ids) == 0:
+            index.pop(key)
+
+    @staticmethod
+    def estimate_size(message_group: beacon_message.BeaconMessageGroup | compact.BeaconCompactGroup) -> int:
+        """Estimates the memory used by a group and its messages in bytes."""
+
+        if type(message_group) is compact.BeaconCompactGroup:
+            return message_group.size
+
+        size: int = group_overhead + 64 * len(message_group.replies)
+
+        for message in message_group.messages.values():
+            size += message_overhead
+
+            try:
+                content = message.content
+            except AttributeError:
+                # Assume something is just set to None
+                continue
+
+            if type(content) is str:
+                size += len(content)
+            elif content:
+                size += len(json.dumps(content))
+
+        return size
+
+    def _touch(self, group_id: str | None):
+        """Marks a group as the most recently used one."""
+
+        if group_id in self._data_groups:
+            self._data_groups.move_to_end(group_id)
+
+    @staticmethod
+    def get_group_record(message_group: beacon_message.BeaconMessageGroup) -> dict:
+        """Returns a group and its messages as a dict."""
+
+        group_messages: dict = {}
+        for group_message in message_group.messages.values():
+            try:
+                group_messages.update({group_message.id: group_message.to_dict()})
+            except AttributeError:
+                # Assume something is just set to None
+                continue
+
+        return {"group": message_group.to_dict(), "messages": group_messages}
+
+    @staticmethod
+    def _report_store_error(future: Future):
+        # The cold store is best-effort, so errors shouldn't stop messages from being bridged
+        if not future.cancelled() and future.exception():
+            traceback.print_exception(future.exception())
+
+    def _watch_store(self, future: Future | None):
+        """Reports errors of a queued cold store write once it's done."""
+
+        if future is not None:
+            future.add_done_callback(self._report_store_error)
+
+    def _spill(self, message_group: beacon_message.BeaconMessageGroup):
+        """Moves an evicted group to the cold store. The group is encrypted and written on the store's
+        thread, so this doesn't block the event loop."""
+
+        record: dict = self.get_group_record(message_group)
+        aliases: list[str] = list(message_group.messages)
+
+        self._watch_store(self.__wrapper.queue_store_put_json("cache", message_group.id, record, aliases=aliases))
+        self._cold_writes += 1
+
+        # Remove groups that are too old to be useful, at most once an hour
+        if self._cold_retention and time.time() - self._cold_last_prune > 3600:
+            self._cold_last_prune = time.time()
+            self._watch_store(self.__wrapper.queue_store_prune("cache", self._cold_retention))
+
+    def _evict(self, reason: str):
+        """Evicts the least recently used group and its messages."""
+
+        group_id, message_group = self._data_groups.popitem(last=False)
+
+        if self.cold_store:
+            self._spill(self._materialize(message_group))
+
+        if type(message_group) is compact.BeaconCompactGroup:
+            self._compact_messages -= len(message_group.messages)
+
+        size: int = self._group_sizes.pop(group_id, 0)
+        self._size -= size
+        self._unindex_group(message_group)
+
+        for group_message in message_group.messages:
+            if type(group_message) is str:
+                self._data.pop(group_message, None)
+            else:
+                self._data.pop(group_message.id, None)
+
+        if reason == "size":
+            self._evictions_size += 1
+        else:
+            self._evictions_count += 1
+
+        self._evicted_bytes += size
+
+    def _needs_eviction(self, size: int) -> str | None:
+        """Returns why a group needs to be evicted to fit a new group of the given size, if one does."""
+
+        if len(self._data_groups) == 0:
+            return None
+
+        if len(self._data_groups) >= self.cache_limit:
+            return "count"
+
+        if self._size_limit and self._size + size > self._size_limit:
+            return "size"
+
+        return None
 
     def add_message(self, message: beacon_message.BeaconMessage | beacon_message.BeaconMessageGroup, save: bool = False):
         target_dict = self._data_groups if type(message) is beacon_message.BeaconMessageGroup else self._data
@@ -41,16 +368,39 @@ class BeaconMessageCache:
             raise ValueError("Message already cached")
 
         if type(message) is beacon_message.BeaconMessageGroup:
-            while len(self._data_groups.keys()) >= self.cache_limit:
-                message_group: beacon_message.BeaconMessageGroup = self._data_groups.pop(next(iter(self._data_groups)))
+            entry: beacon_message.BeaconMessageGroup | compact.BeaconCompactGroup = message
 
-                for group_message in message_group.messages:
-                    if type(group_message) is str:
-                        self._data.pop(group_message, None)
-                    else:
-                        self._data.pop(group_message.id, None)
+            if self.compact_groups:
+                try:
+                    entry = compact.BeaconCompactGroup.pack(message, self._platforms, self._spaces)
+                except ValueError:
+                    # Keep the group as it is
+                    pass
 
-            self._data_groups.update({message.id: message})
+            # Evict least recently used groups until the new group fits
+            size: int = self.estimate_size(entry)
+            reason: str | None = self._needs_eviction(size)
+
+            while reason:
+                self._evict(reason)
+                reason = self._needs_eviction(size)
+
+            # Messages of packed groups live in the group
+            if type(entry) is compact.BeaconCompactGroup:
+                for message_id in message.messages:
+                    self._data.pop(message_id, None)
+
+                self._compact_messages += len(entry.messages)
+
+            self._data_groups.update({message.id: entry})
+            self._group_sizes.update({message.id: size})
+            self._size += size
+            self._index_group(entry)
+            self._unsaved += 1
+
+            # Add group and its messages to journal
+            if self._journal and not self._loading:
+                self._add_journal_op({"op": "add"} | self.get_group_record(message))
         else:
             self._data.update({message.id: message})
 
@@ -58,63 +408,453 @@ class BeaconMessageCache:
         if save:
             self.save()
 
-    def remove_message_group(self, message_group: beacon_message.BeaconMessageGroup):
+    def remove_message_group(self, message_group: beacon_message.BeaconMessageGroup, save: bool = True):
         for message in message_group.messages:
             self._data.pop(message, None)
 
-        self._data_groups.pop(message_group.id, None)
+        entry: beacon_message.BeaconMessageGroup | compact.BeaconCompactGroup | None = self._data_groups.pop(
+            message_group.id, None
+        )
+
+        if entry:
+            self._size -= self._group_sizes.pop(message_group.id, 0)
+
+        if type(entry) is compact.BeaconCompactGroup:
+            self._compact_messages -= len(entry.messages)
+
+        self._unindex_group(message_group)
+        self._add_journal_op({"op": "remove", "group": message_group.id})
+        self._unsaved += 1
+
+        # Removed groups shouldn't come back from the cold store
+        if self.cold_store:
+            self._watch_store(self.__wrapper.queue_store_remove("cache", message_group.id))
 
         # Save data
-        self.save()
+        if save:
+            self.save()
+
+    def _count_lookup(self, in_memory: bool, found: bool):
+        self._lookups += 1
+
+        if in_memory:
+            self._lookup_hits += 1
+        elif not found:
+            self._lookup_misses += 1
 
     def get_message(self, message_id: str) -> beacon_message.BeaconMessage | None:
-        """Gets a message from the cache."""
-        return self._data.get(message_id)
+        """Gets a message from memory. Use fetch_message to also look in the cold store."""
+
+        message: beacon_message.BeaconMessage | None = self._data.get(message_id)
+
+        if message:
+            self._touch(self._message_groups.get(message_id))
+            return message
+
+        # The message may be in a packed group
+        message_group: beacon_message.BeaconMessageGroup | None = self.get_group_from_message(message_id)
+        return message_group.messages.get(message_id) if message_group else None
 
     def get_message_group(self, group_id: str) -> beacon_message.BeaconMessageGroup | None:
-        """Gets a message from the cache."""
-        return self._data_groups.get(group_id)
+        """Gets a message group from memory. Use fetch_message_group to also look in the cold store."""
+
+        self._touch(group_id)
+        return self._materialize(self._data_groups.get(group_id))
 
     def get_group_from_message(self, message_id: str) -> beacon_message.BeaconMessageGroup | None:
-        """Gets a message group from the cache."""
+        """Gets the group a message belongs to from memory. Use fetch_group_from_message to also look in the
+        cold store."""
 
-        for _, group in self._data_groups.items():
-            matches = [message for _, message in group.messages.items() if message.id == message_id]
+        group_id: str | None = self._message_groups.get(message_id)
 
-            if len(matches) > 0:
-                return group
+        if not group_id:
+            return None
 
-        return None
+        self._touch(group_id)
+        return self._materialize(self._data_groups.get(group_id))
 
-    def save(self):
-        """Saves cache as an encrypted file."""
+    async def _fetch_cold(self, lookup, key: str) -> beacon_message.BeaconMessageGroup | None:
+        """Loads a group from the cold store without blocking the event loop. Lookups are queued behind
+        pending spills, so a group that was just evicted is always found."""
+
+        if not self.cold_store:
+            return None
+
+        try:
+            record: dict | None = await lookup("cache", key)
+        except Exception:
+            traceback.print_exc()
+            return None
+
+        if not record:
+            self._cold_misses += 1
+            return None
+
+        # Resolving users and channels needs drivers, so groups are loaded back in on the event loop
+        self._cold_hits += 1
+        return self._cold_loader(record)
+
+    async def fetch_message(self, message_id: str) -> beacon_message.BeaconMessage | None:
+        """Gets a message from the cache. If it's not in memory, it's loaded from the cold store."""
+
+        message: beacon_message.BeaconMessage | None = self.get_message(message_id)
+        in_memory: bool = message is not None
+
+        if not message:
+            message_group: beacon_message.BeaconMessageGroup | None = await self._fetch_cold(
+                self.__wrapper.store_find_json_async, message_id
+            )
+            message = message_group.messages.get(message_id) if message_group else None
+
+        self._count_lookup(in_memory, message is not None)
+        return message
+
+    async def fetch_message_group(self, group_id: str) -> beacon_message.BeaconMessageGroup | None:
+        """Gets a message group from the cache. If it's not in memory, it's loaded from the cold store."""
+
+        message_group: beacon_message.BeaconMessageGroup | None = self.get_message_group(group_id)
+        in_memory: bool = message_group is not None
+
+        if not message_group:
+            message_group = await self._fetch_cold(self.__wrapper.store_get_json_async, group_id)
+
+        self._count_lookup(in_memory, message_group is not None)
+        return message_group
+
+    async def fetch_group_from_message(self, message_id: str) -> beacon_message.BeaconMessageGroup | None:
+        """Gets the group a message belongs to from the cache. If it's not in memory, it's loaded from the
+        cold store."""
+
+        message_group: beacon_message.BeaconMessageGroup | None = self.get_group_from_message(message_id)
+        in_memory: bool = message_group is not None
+
+        if not message_group:
+            message_group = await self._fetch_cold(self.__wrapper.store_find_json_async, message_id)
+
+        self._count_lookup(in_memory, message_group is not None)
+        return message_group
+
+    def set_preview(self, group_id: str, preview: str | None):
+        """Replaces the preview of a group in memory (e.g. after its message has been edited). Packed groups
+        are repacked, as changes to their views aren't kept."""
+
+        entry: beacon_message.BeaconMessageGroup | compact.BeaconCompactGroup | None = self._data_groups.get(group_id)
+
+        if entry is None:
+            return
+
+        if type(entry) is not compact.BeaconCompactGroup:
+            entry.preview = preview
+            return
+
+        message_group: beacon_message.BeaconMessageGroup = self._materialize(entry)
+        message_group.preview = preview
+        self._compact_messages -= len(entry.messages)
+
+        try:
+            new_entry: beacon_message.BeaconMessageGroup | compact.BeaconCompactGroup = compact.BeaconCompactGroup.pack(
+                message_group, self._platforms, self._spaces
+            )
+            self._compact_messages += len(new_entry.messages)
+        except ValueError:
+            # Keep the group unpacked, along with its messages
+            new_entry = message_group
+
+            for message in message_group.messages.values():
+                self._data.update({message.id: message})
+
+        # The group keeps its place in the eviction order
+        size: int = self.estimate_size(new_entry)
+        self._size += size - self._group_sizes.get(group_id, 0)
+        self._group_sizes.update({group_id: size})
+        self._data_groups.update({group_id: new_entry})
+
+    def get_reply_preview(self, message_group: beacon_message.BeaconMessageGroup) -> str | None:
+        """Gets the preview of a group being replied to. If this returns None, the platform needs to fetch
+        the message to show its content."""
+
+        if message_group.preview is None:
+            self._preview_misses += 1
+            return None
+
+        self._preview_hits += 1
+        return message_group.preview
+
+    def _get_indexed_groups(self, group_ids: dict[str, float] | None,
+                            limit: int | None) -> list[beacon_message.BeaconMessageGroup]:
+        group_ids = group_ids or {}
+
+        # Newest groups first (only the newest groups need to be sorted if there's a limit)
+        if limit is None:
+            newest: list[str] = sorted(group_ids, key=group_ids.get, reverse=True)
+        else:
+            newest: list[str] = heapq.nlargest(limit, group_ids, key=group_ids.get)
+
+        groups: list[beacon_message.BeaconMessageGroup] = []
+
+        for group_id in newest:
+            message_group: beacon_message.BeaconMessageGroup | None = self._materialize(
+                self._data_groups.get(group_id)
+            )
+
+            if message_group:
+                groups.append(message_group)
+
+        return groups
+
+    def get_channel_groups(self, channel_id: str, limit: int | None = None) -> list[beacon_message.BeaconMessageGroup]:
+        """Gets groups with a message in a channel, newest first. Only groups in memory are returned."""
+        return self._get_indexed_groups(self._channel_groups.get(channel_id), limit)
+
+    def get_author_groups(self, author_id: str, limit: int | None = None) -> list[beacon_message.BeaconMessageGroup]:
+        """Gets groups sent by an author, newest first. Only groups in memory are returned."""
+        return self._get_indexed_groups(self._author_groups.get(author_id), limit)
+
+    def stats(self) -> dict:
+        """Returns cache metrics. Memory sizes are estimates in bytes, times are in seconds and bytes written
+        are before encryption."""
 
+        return {
+            "since": self._stats_since,
+            "groups": len(self._data_groups),
+            "messages": self.messages,
+            "channels": len(self._channel_groups),
+            "authors": len(self._author_groups),
+            "compact_groups": self.compact_groups,
+            "group_limit": self._cache_limit,
+            "size": self._size,
+            "size_limit": self._size_limit,
+            "evictions_count": self._evictions_count,
+            "evictions_size": self._evictions_size,
+            "evicted_bytes": self._evicted_bytes,
+            "lookups": self._lookups,
+            "lookup_hits": self._lookup_hits,
+            "lookup_misses": self._lookup_misses,
+            "cold_hits": self._cold_hits,
+            "cold_misses": self._cold_misses,
+            "cold_writes": self._cold_writes,
+            "preview_hits": self._preview_hits,
+            "preview_misses": self._preview_misses,
+            "unsaved": self._unsaved,
+            "journal_records": self._journal_records,
+            "writes": self._writes,
+            "write_time": self._write_time,
+            "write_time_total": self._write_time_total,
+            "write_bytes": self._write_bytes,
+            "bytes_written": self._bytes_written,
+            "serialize_time": self._serialize_time
+        }
+
+    def to_dict(self) -> dict:
+        """Returns the cache as a dictionary."""
+        return self._convert(self._data.copy(), self._data_groups.copy(), self._journal_seq)
+
+    def _convert(self, data: dict, data_groups: dict, seq: int) -> dict:
+        """Converts copies of the cache's dicts into a dictionary, timing how long the conversion takes. This
+        can be run in another thread."""
+
+        start: float = time.perf_counter()
+
+        # The journal sequence number tells us which journal records are already included here
+        converted: dict = {"messages": {}, "groups": {}, "seq": seq}
+
+        for entry in self._iter_entries(data, data_groups, seq):
+            if len(entry) == 3:
+                converted[entry[0]].update({entry[1]: entry[2]})
+
+        self._serialize_time = time.perf_counter() - start
+        return converted
+
+    def iter_entries(self) -> typing.Iterator[list]:
+        """Returns an iterator over the cache's entries, in the same layout as to_dict (see
+        backup.iter_entries). The cache is copied when this is called, but messages are only converted as
+        the iterator is consumed, so the whole cache is never converted at once."""
+
+        return self._iter_entries(self._data.copy(), self._data_groups.copy(), self._journal_seq)
+
+    def _iter_entries(self, data: dict, data_groups: dict, seq: int) -> typing.Iterator[list]:
         # As this is the message cache, we can lose this data and still be fine.
         # So if any errors arise, it may be acceptable to ignore them and lose the cached message
         # or message group causing the errors.
-
-        # Copy data
-        data: dict = self._data.copy()
-        data_groups: dict = self._data_groups.copy()
-
-        # Convert data to dictionary
-        converted = {}
-        for message in data:
+        for message_id, message in data.items():
             try:
-                converted.update({message: data[message].to_dict()})
+                yield ["messages", message_id, message.to_dict()]
             except AttributeError:
                 # Assume something is just set to None
                 continue
 
-        converted_groups = {}
-        for group in data_groups:
+        for group_id, message_group in data_groups.items():
             try:
-                converted_groups.update({group: data_groups[group].to_dict()})
+                # Messages of packed groups aren't in data
+                if type(message_group) is compact.BeaconCompactGroup:
+                    message_group = self._materialize(message_group)
+
+                    for message_id, message in message_group.messages.items():
+                        yield ["messages", message_id, message.to_dict()]
+
+                yield ["groups", group_id, message_group.to_dict()]
             except AttributeError:
                 # Assume something is just set to None
                 continue
 
-        # Save data as JSON
-        self.__wrapper.save_json("cache", {
-            "messages": converted, "groups": converted_groups
-        })
+        yield ["seq", seq]
+
+    def clear(self):
+        """Removes all messages and message groups from the cache. The journal is reset, so the cache should
+        be saved with save_snapshot_async afterwards."""
+
+        self._data.clear()
+        self._data_groups.clear()
+        self._message_groups.clear()
+        self._channel_groups.clear()
+        self._author_groups.clear()
+        self._group_sizes.clear()
+        self._size = 0
+        self._compact_messages = 0
+        self._journal_records = 0
+        self._journal_ops.clear()
+
+    def _mark_saved(self, changes: int | None = None):
+        """Marks changes as saved. Changes made while a save was being written stay unsaved."""
+
+        self._unsaved = self._unsaved - changes if changes is not None else 0
+        self._last_save = time.monotonic()
+
+    def _should_save(self) -> bool:
+        return self._unsaved >= self._save_threshold or time.monotonic() - self._last_save >= self._save_interval
+
+    def _schedule_save(self):
+        """Saves the cache once the save interval has passed, unless a save is already scheduled."""
+
+        if self._save_task and not self._save_task.done():
+            return
+
+        delay: float = max(self._save_interval - (time.monotonic() - self._last_save), 0)
+        self._save_task = asyncio.get_running_loop().create_task(self._save_later(delay))
+
+    async def _save_later(self, delay: float):
+        await asyncio.sleep(delay)
+
+        # The cache may have been saved in the meantime
+        if self._unsaved > 0:
+            await self.save_async(force=True)
+
+    async def _snapshot(self) -> dict:
+        """Returns the cache as a dictionary without blocking the event loop. Only the cache's dicts are
+        copied here, groups and messages are converted in another thread."""
+
+        return await asyncio.to_thread(
+            self._convert, self._data.copy(), self._data_groups.copy(), self._journal_seq
+        )
+
+    def _count_write(self, start: float, written: int | None):
+        self._writes += 1
+        self._write_time = time.perf_counter() - start
+        self._write_time_total += self._write_time
+        self._write_bytes = written or 0
+        self._bytes_written += self._write_bytes
+
+    async def save_snapshot_async(self):
+        """Saves the whole cache without blocking the event loop, discarding the journal in journal mode."""
+
+        async with self._save_lock:
+            unsaved: int = self._unsaved
+            start: float = time.perf_counter()
+
+            if self._journal:
+                ops: list[dict] = self._journal_ops
+                records: int = self._journal_records
+                self._journal_ops = []
+                self._journal_records = 0
+
+                try:
+                    written: int | None = await self.__wrapper.compact_json_async("cache", await self._snapshot())
+                except BaseException:
+                    # Put the changes back, so they're written with the next save
+                    self._journal_ops = ops + self._journal_ops
+                    self._journal_records = records
+                    raise
+            else:
+                written: int | None = await self.__wrapper.save_json_async("cache", await self._snapshot())
+
+            self._mark_saved(unsaved)
+            self._count_write(start, written)
+
+    def save(self):
+        """Saves cache as an encrypted file."""
+
+        start: float = time.perf_counter()
+
+        if self._journal:
+            # Write snapshot and discard journal
+            written: int | None = self.__wrapper.compact_json("cache", self.to_dict())
+            self._journal_ops.clear()
+            self._journal_records = 0
+        else:
+            # Save data as JSON
+            written: int | None = self.__wrapper.save_json("cache", self.to_dict())
+
+        self._mark_saved()
+        self._count_write(start, written)
+
+    async def save_async(self, force: bool = False):
+        """Saves cache as an encrypted file without blocking the event loop.
+        If the cache is saved again before the write starts, only the newest copy is written.
+
+        Unless force is True, changes are only saved once save_threshold changes have been made or
+        save_interval seconds have passed since the last save. Otherwise, a save is scheduled for when the
+        interval ends.
+
+        In journal mode, only changes since the last save are appended to the journal. Once enough records
+        have been appended, a snapshot is written and the journal is discarded."""
+
+        if self._unsaved == 0:
+            return
+
+        if not force and not self._should_save():
+            self._schedule_save()
+            return
+
+        async with self._save_lock:
+            # Changes may have been saved while we were waiting
+            if self._unsaved == 0:
+                return
+
+            # Changes are only marked as saved once they've been written, so failed writes are retried
+            unsaved: int = self._unsaved
+            start: float = time.perf_counter()
+
+            if self._journal:
+                if len(self._journal_ops) == 0:
+                    self._mark_saved(unsaved)
+                    return
+
+                ops: list[dict] = self._journal_ops
+                records: int = self._journal_records
+                self._journal_ops = []
+                self._journal_seq += 1
+
+                try:
+                    if records + 1 >= self._compact_threshold:
+                        # Compact journal (the snapshot includes this record's changes)
+                        self._journal_records = 0
+                        written: int | None = await self.__wrapper.compact_json_async(
+                            "cache", await self._snapshot()
+                        )
+                    else:
+                        self._journal_records += 1
+                        written: int | None = await self.__wrapper.append_json_async(
+                            "cache", {"seq": self._journal_seq, "ops": ops}
+                        )
+                except BaseException:
+                    # Put the changes back, so they're written with the next save
+                    self._journal_ops = ops + self._journal_ops
+                    self._journal_seq -= 1
+                    self._journal_records = records
+                    raise
+            else:
+                # Save data as JSON
+                written: int | None = await self.__wrapper.save_json_async("cache", await self._snapshot())
+
+            self._mark_saved(unsaved)
+            self._count_write(start, written)
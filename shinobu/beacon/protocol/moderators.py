@@ -49,6 +49,15 @@ class BeaconModManager:
         self._scheme_version: int = 1
         self._moderators: dict[str, BeaconModerator] = {}
         self._admins: dict[str, BeaconAdmin] = {}
+        self._dirty: bool = False
+
+    @property
+    def dirty(self) -> bool:
+        """Whether data has changed since it was last saved."""
+        return self._dirty
+
+    def mark_clean(self):
+        self._dirty = False
 
     @property
     def moderators(self) -> list[BeaconModerator]:
@@ -61,6 +70,7 @@ class BeaconModManager:
     def add_moderator(self, moderator: BeaconModerator):
         """Adds a Beacon moderator."""
         self._moderators.update({moderator.id: moderator})
+        self._dirty = True
 
     def add_moderators(self, moderators: list[BeaconModerator]):
         """Adds Beacon moderators."""
@@ -71,6 +81,7 @@ class BeaconModManager:
     def add_admin(self, admin: BeaconAdmin):
         """Adds a Beacon admin."""
         self._moderators.update({admin.id: admin})
+        self._dirty = True
 
     def add_admins(self, admins: list[BeaconAdmin]):
         """Adds Beacon admins."""
@@ -92,9 +103,11 @@ class BeaconModManager:
 
     def remove_moderator(self, mod_id: str):
         self._moderators.pop(mod_id)
+        self._dirty = True
 
     def remove_admin(self, admin_id: str):
         self._admins.pop(admin_id)
+        self._dirty = True
 
     def to_dict(self) -> dict:
         data = {"moderators": {}, "admins": {}}
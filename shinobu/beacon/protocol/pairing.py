@@ -27,11 +27,20 @@ class BeaconPairing:
         self._id: str = group_id
         self._servers: dict = {}
         self._partial_servers: list = []
+        self._dirty: bool = False
 
     @property
     def id(self) -> str:
         return self._id
 
+    @property
+    def dirty(self) -> bool:
+        """Whether data has changed since it was last saved."""
+        return self._dirty
+
+    def mark_clean(self):
+        self._dirty = False
+
     @property
     def servers(self) -> list:
         return list(self._servers.values())
@@ -54,6 +63,7 @@ class BeaconPairing:
             return
         
         self._partial_servers.append({"id": server_id, "platform": platform})
+        self._dirty = True
 
     def upgrade_partial_server(self, server):
         if server.id in self._servers:
@@ -74,6 +84,7 @@ class BeaconPairing:
         for server in self._partial_servers:
             if server["id"] == server_id and server["platform"] == platform:
                 self._partial_servers.remove(server)
+                self._dirty = True
                 break
 
     def get_matches_for(self, server):
@@ -120,11 +131,23 @@ class BeaconPairingManager:
         self._pairings: dict[str, BeaconPairing] = {}
         self._pairing_codes: dict = {}
         self._server_mapping: dict[str, dict[str, str]] = {}
+        self._dirty: bool = False
 
     @property
     def pairings(self) -> list[BeaconPairing]:
         return list(self._pairings.values())
 
+    @property
+    def dirty(self) -> bool:
+        """Whether any pairing has been changed, added or removed since it was last saved."""
+        return self._dirty or any(pairing.dirty for pairing in self._pairings.values())
+
+    def mark_clean(self):
+        for pairing in self._pairings.values():
+            pairing.mark_clean()
+
+        self._dirty = False
+
     @staticmethod
     def _generate_unique_code() -> str:
         """Generates a pairing code using CSPRNG."""
@@ -153,6 +176,7 @@ class BeaconPairingManager:
         """Adds a Beacon server pair."""
         self._pairings.update({pairing.id: pairing})
         self.update_pairing(pairing.id)
+        self._dirty = True
 
     def update_pairing(self, pairing_id: str):
         pairing: BeaconPairing | None = self._pairings.get(pairing_id)
@@ -170,6 +194,7 @@ class BeaconPairingManager:
 
     def remove_pairing(self, pairing_id: str):
         self._pairings.pop(pairing_id)
+        self._dirty = True
 
     def get_pairing(self, group_id: str) -> BeaconPairing | None:
         return self._pairings.get(group_id)
@@ -19,9 +19,19 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 class BeaconPauseManager:
     def __init__(self):
         self._data: dict = {}
+        self._dirty: bool = False
+
+    @property
+    def dirty(self) -> bool:
+        """Whether data has changed since it was last saved."""
+        return self._dirty
+
+    def mark_clean(self):
+        self._dirty = False
 
     def add_pause(self, user_id: str, mode: str = "inclusive", matches: list[dict[str, str]] | None = None):
         self._data.update({user_id: {"enabled": False, "mode": mode, "matches": matches or []}})
+        self._dirty = True
 
     def add_pause_from_dict(self, user_id: str, data: dict):
         self.add_pause(user_id, mode=data.get("mode", "inclusive"), matches=data.get("matches", []))
@@ -29,12 +39,14 @@ class BeaconPauseManager:
 
     def remove_pause(self, user_id: str):
         self._data.pop(user_id, None)
+        self._dirty = True
 
     def set_pause(self, user_id: str, state: bool = False):
         if user_id not in self._data:
             return
 
         self._data["user_id"].update({"enabled": state})
+        self._dirty = True
 
     def check_can_send(self, user_id: str, content: str):
         if user_id not in self._data:
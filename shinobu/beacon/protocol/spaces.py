@@ -34,11 +34,33 @@ class BeaconSpaceManager:
         self._server_spaces: dict[str, dict[str, list[str]]] = {}
         self._invite_mapping: dict[str, str] = {}
         self._allow_private_spaces: bool = allow_private_spaces
+        self._deleted: set[str] = set()
 
     @property
     def allow_private_spaces(self) -> bool:
         return self._allow_private_spaces
 
+    @property
+    def dirty(self) -> bool:
+        """Whether any Space has been changed, added or deleted since it was last saved."""
+        return len(self._deleted) > 0 or any(space.dirty for space in self._spaces.values())
+
+    @property
+    def dirty_spaces(self) -> list[beacon_space.BeaconSpace]:
+        """Spaces that have been changed or added since they were last saved."""
+        return [space for space in self._spaces.values() if space.dirty]
+
+    @property
+    def deleted_spaces(self) -> list[str]:
+        """IDs of Spaces that have been deleted since they were last saved."""
+        return list(self._deleted)
+
+    def mark_clean(self):
+        for space in self._spaces.values():
+            space.mark_clean()
+
+        self._deleted.clear()
+
     @property
     def all_spaces(self) -> list[beacon_space.BeaconSpace]:
         return list(self._spaces.values())
@@ -61,6 +83,8 @@ class BeaconSpaceManager:
             return
 
         self._spaces.update({space.id: space})
+        self._deleted.discard(space.id)
+        space.mark_dirty()
 
         # Add invites to mapping
         for invite in space.invites:
@@ -129,6 +153,7 @@ class BeaconSpaceManager:
 
         if invite:
             space.invites.remove(invite)
+            space.mark_dirty()
 
         self._invite_mapping.pop(code, None)
 
@@ -136,6 +161,7 @@ class BeaconSpaceManager:
     def delete_space(self, space_id: str):
         space: beacon_space.BeaconSpace = self._spaces.pop(space_id)
         space.delete()
+        self._deleted.add(space_id)
 
         if space.owner_id and space.owner_platform:
             if not space.owner_platform in self._server_spaces:
@@ -264,7 +264,7 @@ class StoatDriver(beacon_driver.BeaconDriver):
             replies.append(reply_obj)
 
             if is_pin:
-                reply_author: str = f"{reply_message.author.display_name if reply_message.author else '[unknown]'}"
+                reply_author: str = f"{reply_message.author.display_name if reply_message.author else reply_message_group.author_name or '[unknown]'}"
                 embeds.append(stoat.Embed(
                     title=f"\U0001F4CC Pinned a message from @{reply_author}",
                     icon_url=reply_message.author.avatar_url if reply_message.author else None
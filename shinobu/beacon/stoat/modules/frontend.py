@@ -16,7 +16,6 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import asyncio
 import uuid
 from stoat.ext import commands
 from shinobu.beacon.protocol import beacon
@@ -48,9 +47,7 @@ class BeaconFrontend(commands.Gear):
         self._beacon.spaces.add_space(new_space)
         await ctx.send(f"space created!\n- id: `{new_space.id}`\n- name: {new_space.name}")
 
-        loop = asyncio.get_event_loop()
-        # noinspection PyTypeChecker
-        await loop.run_in_executor(None, self._beacon.save_data)
+        await self._beacon.save_data_async()
 
     @bridge_text.command(name="join-space")
     async def join_space(self, ctx: commands.Context, space_id: str):
@@ -83,9 +80,7 @@ class BeaconFrontend(commands.Gear):
             return await ctx.send("already in space? :/")
 
         await ctx.send("space joined! :3")
-        loop = asyncio.get_event_loop()
-        # noinspection PyTypeChecker
-        await loop.run_in_executor(None, self._beacon.save_data)
+        await self._beacon.save_data_async()
 
 async def setup(bot: commands.Bot):
     await bot.add_gear(BeaconFrontend(bot))
@@ -16,7 +16,6 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import asyncio
 import uuid
 import stoat
 from stoat.ext import commands
@@ -94,9 +93,7 @@ class BeaconPairing(commands.Gear):
 
             await ctx.send(embeds=[embed], replies=[ctx.message])
 
-            loop = asyncio.get_event_loop()
-            # noinspection PyTypeChecker
-            await loop.run_in_executor(None, self._beacon.save_data)
+            await self._beacon.save_data_async()
         else:
             # Create pairing code
             code: str = self._beacon.pairing.new_pairing_code(server)
@@ -145,9 +142,7 @@ class BeaconPairing(commands.Gear):
         )
         await ctx.send(embeds=[embed], replies=[ctx.message])
 
-        loop = asyncio.get_event_loop()
-        # noinspection PyTypeChecker
-        await loop.run_in_executor(None, self._beacon.save_data)
+        await self._beacon.save_data_async()
 
     @pairing_text.command(name="pair-info")
     @commands.is_owner()
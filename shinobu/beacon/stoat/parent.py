@@ -93,7 +93,7 @@ class StoatBot(stoat_commands.Bot):
         if isinstance(message, stoat.Message):
             for reply in message.replies:
                 # Try to get group from cache
-                reply_group: beacon_message.BeaconMessageGroup = self._beacon.messages.get_group_from_message(reply)
+                reply_group: beacon_message.BeaconMessageGroup = await self._beacon.messages.fetch_group_from_message(reply)
                 if not reply_group:
                     # We can't do anything with this message
                     continue
@@ -103,7 +103,12 @@ class StoatBot(stoat_commands.Bot):
                 # Get message content
                 reply_message: stoat.Message = message.channel.get_message(reply)
                 if not reply_message:
-                    # Message isn't cached, we can't do anything
+                    # Message isn't cached, use the cached preview if we have one
+                    reply_preview: str | None = self._beacon.messages.get_reply_preview(reply_group)
+
+                    if reply_preview is not None:
+                        replies_content.update({reply_group.id: self._driver.sanitize_outbound(reply_preview)})
+
                     continue
 
                 replies_content.update({reply_group.id: self._driver.sanitize_outbound(reply_message.content)})
@@ -174,7 +179,7 @@ class StoatBot(stoat_commands.Bot):
         origin_driver: beacon_driver.BeaconDriver = self._beacon.drivers.get_driver("stoat")
 
         # Get the BeaconMessage object for the message
-        message_obj: beacon_message.BeaconMessage = self._beacon.messages.get_message(str(message.id))
+        message_obj: beacon_message.BeaconMessage = await self._beacon.messages.fetch_message(str(message.id))
         if not message_obj:
             # We can't edit messages that aren't cached
             return
@@ -240,7 +245,7 @@ class StoatBot(stoat_commands.Bot):
         origin_driver: beacon_driver.BeaconDriver = self._beacon.drivers.get_driver("stoat")
 
         # Get the BeaconMessage object for the message
-        message_obj: beacon_message.BeaconMessage = self._beacon.messages.get_message(str(message.id))
+        message_obj: beacon_message.BeaconMessage = await self._beacon.messages.fetch_message(str(message.id))
         if not message_obj:
             # We can't remove messages that aren't cached
             return
@@ -273,7 +278,7 @@ class StoatBot(stoat_commands.Bot):
         origin_driver: beacon_driver.BeaconDriver = self._beacon.drivers.get_driver("stoat")
 
         # Get the BeaconMessage object for the message
-        message_obj: beacon_message.BeaconMessage = self._beacon.messages.get_message(str(message.id))
+        message_obj: beacon_message.BeaconMessage = await self._beacon.messages.fetch_message(str(message.id))
         if not message_obj:
             # We can't remove messages that aren't cached
             return
@@ -442,7 +447,7 @@ class StoatBot(stoat_commands.Bot):
         # Get messages
         for message in event.messages:
             # Get the BeaconMessage object for the message
-            message_obj: beacon_message.BeaconMessage = self._beacon.messages.get_message(str(message.id))
+            message_obj: beacon_message.BeaconMessage = await self._beacon.messages.fetch_message(str(message.id))
             if not message_obj:
                 # We can't remove messages that aren't cached
                 continue
@@ -18,16 +18,22 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
 import sys
+import time
 import traceback
+import shutil
 import getpass
 import ujson as json
 from ujson import JSONDecodeError
-from shinobu.runtime.secrets import manager, encryptor
+from shinobu.runtime.secrets import manager, storage, reencryptor, calibration, archive, store, backup
 
 class ShinobuSecretsCLI:
-    def __init__(self, tokenstore: manager.TokenStore, raw_encryptor: manager.RawEncryptor):
+    def __init__(self, tokenstore: manager.TokenStore, raw_encryptor: manager.RawEncryptor,
+                 container: str = "binary", workers: int = 1, memory_budget: int | None = None):
         self._tokenstore: manager.TokenStore = tokenstore
         self._encryptor: manager.RawEncryptor = raw_encryptor
+        self._container: str = container
+        self._workers: int = workers
+        self._memory_budget: int | None = memory_budget
         self._files: list[str] = []
 
         # Load plugins
@@ -63,6 +69,9 @@ class ShinobuSecretsCLI:
             'list-tokens': self.list_tokens,
             'list-files': self.list_files,
             'reencrypt': self.reencrypt,
+            'calibrate-kdf': self.calibrate_kdf,
+            'backup-files': self.backup_files,
+            'restore-files': self.restore_files,
             'help': self.command_help,
             'exit': lambda: sys.exit(0)
         }
@@ -170,7 +179,7 @@ class ShinobuSecretsCLI:
 
         del confirm_password
 
-        print('\x1b[37;41;1mWARNING: YOUR TOKENS AND SECURE FILES WILL BE RE-ENCRYPTED!\x1b[0m')
+        print('\x1b[37;41;1mWARNING: YOUR TOKENS, SECURE FILES AND BACKUPS WILL BE RE-ENCRYPTED!\x1b[0m')
         print('\x1b[33;1mYou will need to use your new encryption password to start Shinobu.\x1b[0m')
         print('\x1b[33;1mIt is recommended to back up your tokens and files first to prevent data loss.\x1b[0m')
         print('\x1b[33;1mThis process is irreversible. Once it\'s done, there\'s no going back!\x1b[0m')
@@ -185,39 +194,264 @@ class ShinobuSecretsCLI:
             print('\x1b[31;1mAborting.\x1b[0m')
             return
 
-        try:
-            # Test password
-            self._tokenstore.test_decrypt(current_password)
-        except ValueError:
+        # Test password
+        if not self._tokenstore.test_decrypt(current_password):
             print('\x1b[31;1mInvalid password. Your current encryption password is needed to re-encrypt tokens.\x1b[0m')
             return
 
-        # Re-encrypt tokens
-        self._tokenstore.reencrypt(current_password, password)
+        new_encryptor: manager.RawEncryptor = manager.RawEncryptor(
+            password, compression=self._encryptor.compression, compression_level=self._encryptor.compression_level
+        )
 
-        # Re-encrypt files
-        new_encryptor: manager.RawEncryptor = manager.RawEncryptor(password)
+        # Create file jobs (files are re-encrypted into staging files first)
+        jobs: list[reencryptor.ReencryptionJob] = []
+        targets: dict[str, tuple[str | None, str]] = {}
+        chains: dict[str, str] = {}
 
         for file in self._files:
-            try:
-                with open(f'data/{file}.json', 'r') as datafile:
-                    data: dict = json.load(datafile)
-            except (FileNotFoundError, JSONDecodeError):
-                continue
+            # Re-encrypt journal records
+            journal_path: str = storage.get_journal_path(file)
+
+            if os.path.exists(journal_path):
+                jobs.append(reencryptor.ReencryptionJob(
+                    f'{file} (journal)', reencryptor.reencrypt_journal,
+                    (self._encryptor, new_encryptor, journal_path),
+                    memory=reencryptor.estimate_file_memory(journal_path)
+                ))
+                targets.update({f'{file} (journal)': (None, journal_path)})
+
+            # Re-encrypt file and its segments
+            names: list[str] = [file] + [
+                storage.get_segment_name(file, segment) for segment in storage.list_segments(file)
+            ]
+
+            for name in names:
+                path: str | None = storage.find_secure_file(name)
+                if not path:
+                    continue
+
+                # This also migrates files to the configured container format
+                target_path: str = storage.get_secure_file_path(name, self._container)
+                jobs.append(reencryptor.ReencryptionJob(
+                    name, reencryptor.reencrypt_file,
+                    (self._encryptor, new_encryptor, path, target_path, self._container),
+                    memory=reencryptor.estimate_file_memory(path)
+                ))
+                targets.update({name: (name, target_path)})
+
+            # Re-encrypt store (it would start over empty if it couldn't be decrypted)
+            store_path: str = store.get_store_path(file)
+
+            if os.path.exists(store_path):
+                jobs.append(reencryptor.ReencryptionJob(
+                    f'{file} (store)', reencryptor.reencrypt_store, (self._encryptor, new_encryptor, store_path),
+                    memory=reencryptor.estimate_stream_memory()
+                ))
+                targets.update({f'{file} (store)': (None, store_path)})
+
+            # Re-encrypt backup chains (new backups would start a new chain and prune the old ones)
+            for chain in backup.BackupStore(file, self._encryptor).list_chains():
+                name: str = f'{file} (backup {os.path.basename(chain)})'
+
+                # Chains are named after their salt
+                target_path: str = os.path.join(os.path.dirname(chain), os.urandom(16).hex())
+                jobs.append(reencryptor.ReencryptionJob(
+                    name, reencryptor.reencrypt_backup_chain,
+                    (self._encryptor, new_encryptor, file, chain, target_path),
+                    memory=reencryptor.estimate_stream_memory()
+                ))
+                targets.update({name: (None, target_path)})
+                chains.update({name: chain})
+
+        # Re-encrypt archives
+        for archive_name in archive.list_archives():
+            archive_path: str = archive.get_archive_path(archive_name)
+            jobs.append(reencryptor.ReencryptionJob(
+                f'{archive_name} (archive)', reencryptor.reencrypt_archive,
+                (self._encryptor, new_encryptor, archive_path), memory=reencryptor.estimate_stream_memory(archive_path)
+            ))
+            targets.update({f'{archive_name} (archive)': (None, archive_path)})
+
+        # Re-encrypt files
+        print(f'\x1b[36;1mRe-encrypting {len(jobs)} files...\x1b[0m')
+
+        try:
+            results: dict = reencryptor.run_jobs(
+                jobs, workers=self._workers, memory_budget=self._memory_budget, progress=self.print_progress
+            )
+        except reencryptor.ReencryptionError as e:
+            reencryptor.discard_staged({
+                targets[name][1]: staging for name, staging in e.results.items() if staging
+            })
+            traceback.print_exc()
+            print(f'\x1b[31;1mCould not re-encrypt {e.name}. Nothing has been changed.\x1b[0m')
+            return
 
-            encrypted_data: encryptor.EncryptedData = encryptor.EncryptedData.from_dict(data)
-            decrypted_data: str = self._encryptor.decrypt(encrypted_data)
-            new_encrypted_data: encryptor.EncryptedData = new_encryptor.encrypt(decrypted_data)
-            new_data: dict = new_encrypted_data.to_dict()
+        staged: dict[str, str] = {targets[name][1]: staging for name, staging in results.items() if staging}
+        skipped: list[str] = [name for name, staging in results.items() if not staging]
 
-            with open(f'data/{file}.json', 'w+') as datafile:
-                json.dump(new_data, datafile)
+        # Re-encrypt tokens (this is only saved once every token has been re-encrypted)
+        print(f'\x1b[36;1mRe-encrypting {len(self._tokenstore.tokens_raw)} tokens...\x1b[0m')
+
+        try:
+            self._tokenstore.reencrypt(
+                current_password, password, workers=self._workers, memory_budget=self._memory_budget,
+                progress=self.print_progress
+            )
+        except reencryptor.ReencryptionError as e:
+            reencryptor.discard_staged(staged)
+            traceback.print_exc()
+            print(f'\x1b[31;1mCould not re-encrypt token {e.name}. Nothing has been changed.\x1b[0m')
+            return
+
+        # Move re-encrypted files into place
+        reencryptor.commit_staged(staged)
+
+        for name, target_path in targets.values():
+            if name:
+                storage.remove_other_containers(name, self._container)
+
+        # Old chains have been replaced by their re-encrypted copies
+        for name, chain in chains.items():
+            if results.get(name):
+                shutil.rmtree(chain, ignore_errors=True)
+
+        for name in skipped:
+            print(f'\x1b[33;1m{name} could not be decrypted with your current password and was left as it is.\x1b[0m')
 
         # Replace old raw encryptor
         self._encryptor = new_encryptor
 
         print('\x1b[36;1mTokens have been re-encrypted successfully.\x1b[0m')
 
+    def calibrate_kdf(self):
+        try:
+            target = float(input('Target key derivation time in milliseconds (default 250): ') or 250)
+            max_memory = int(input('Maximum memory usage in MiB (default 64): ') or 64)
+            if target <= 0 or max_memory <= 0:
+                raise ValueError()
+        except ValueError:
+            print('\x1b[31;1mInvalid value.\x1b[0m')
+            return
+
+        print('\x1b[36;1mCalibrating, this may take a while...\x1b[0m')
+        result = calibration.calibrate_argon2(target=target, max_memory=max_memory, progress=self.print_calibration)
+
+        print(f'\x1b[36;1mCalibrated profile: {result.profile}\x1b[0m')
+        print(f'\x1b[36mTime cost: {result.time_cost}\x1b[0m')
+        print(f'\x1b[36mMemory cost: {result.memory_cost // 1024} MiB\x1b[0m')
+        print(f'\x1b[36mParallelism: {result.parallelism}\x1b[0m')
+        print(f'\x1b[36mDerivation time: {round(result.duration, 1)} ms\x1b[0m')
+
+        if not result.meets_target:
+            print('\x1b[33;1mThis host could not meet the target with the minimum safe parameters.\x1b[0m')
+
+        print('\x1b[33;1mNew data will be encrypted with this profile. Existing data can still be decrypted.\x1b[0m')
+        print('\x1b[33;1mUse this profile? (y/n)\x1b[0m')
+
+        try:
+            confirm = input().lower()
+            if not confirm == 'y':
+                raise ValueError()
+        except (ValueError, KeyboardInterrupt):
+            print('\x1b[31;1mAborting.\x1b[0m')
+            return
+
+        calibration.save_calibration(result)
+        print('\x1b[36;1mProfile saved. Run "reencrypt" to apply it to existing data.\x1b[0m')
+
+    def _iter_documents(self):
+        for file in self._files:
+            yield from archive.iter_secure_file_documents(self._encryptor, file)
+
+    def backup_files(self):
+        name = input('Backup name (leave empty to use the current time): ') or f'files{time.strftime("%Y%m%d%H%M%S")}'
+
+        try:
+            path = archive.get_archive_path(name)
+        except ValueError:
+            print('\x1b[31;1mBackup name should be alphanumeric.\x1b[0m')
+            return
+
+        print(f'\x1b[36;1mBacking up {len(self._files)} files...\x1b[0m')
+
+        try:
+            summary = archive.write_archive(self._encryptor, path, self._iter_documents(), progress=self.print_archive_progress)
+        except ValueError:
+            traceback.print_exc()
+            print('\x1b[31;1mCould not back up files. Nothing has been written.\x1b[0m')
+            return
+
+        print(f'\x1b[36;1mBacked up {summary["documents"]} files and segments to {path}.\x1b[0m')
+
+    def restore_files(self):
+        backups = archive.list_archives()
+
+        if len(backups) == 0:
+            print('\x1b[31;1mNo backups found.\x1b[0m')
+            return
+
+        for index in range(len(backups)):
+            print(f'\x1b[36m{index + 1}. {backups[index]}\x1b[0m')
+
+        name = input('Backup name: ')
+        if name not in backups:
+            print('\x1b[31;1mBackup does not exist.\x1b[0m')
+            return
+
+        path = archive.get_archive_path(name)
+
+        # Validate whole backup before anything is touched
+        print('\x1b[36;1mValidating backup...\x1b[0m')
+
+        try:
+            summary = archive.verify_archive(self._encryptor, path, progress=self.print_archive_progress)
+        except ValueError as e:
+            print(f'\x1b[31;1mBackup can\'t be restored: {e}\x1b[0m')
+            return
+
+        files = [file for file in summary["files"] if file in self._files]
+
+        print(f'\x1b[36;1mBackup is valid and contains {len(files)} files ({summary["entries"]} entries).\x1b[0m')
+        print('\x1b[37;41;1mWARNING: THESE FILES WILL BE REPLACED!\x1b[0m')
+        print('\x1b[33;1mShinobu should not be running while files are restored.\x1b[0m')
+        print('\x1b[33;1mThis process is irreversible. Once it\'s done, there\'s no going back!\x1b[0m')
+        print()
+        print('\x1b[33;1mProceed anyways? (y/n)\x1b[0m')
+
+        try:
+            confirm = input().lower()
+            if not confirm == 'y':
+                raise ValueError()
+        except (ValueError, KeyboardInterrupt):
+            print('\x1b[31;1mAborting.\x1b[0m')
+            return
+
+        # Files are written into staging files first, then moved into place
+        try:
+            staged = archive.stage_documents(self._encryptor, path, files, container=self._container)
+        except ValueError:
+            traceback.print_exc()
+            print('\x1b[31;1mCould not restore files. Nothing has been changed.\x1b[0m')
+            return
+
+        reencryptor.commit_staged(staged)
+        archive.remove_unstaged(files, staged)
+
+        print(f'\x1b[36;1mRestored {len(staged)} files and segments.\x1b[0m')
+
+    @staticmethod
+    def print_archive_progress(entries: int, size: int):
+        print(f'\x1b[36m{entries} entries, {round(size / 1048576, 1)} MiB\x1b[0m')
+
+    @staticmethod
+    def print_calibration(time_cost: int, memory_cost: int, parallelism: int, duration: float):
+        print(f'\x1b[36mt={time_cost}, m={memory_cost // 1024} MiB, p={parallelism}: {round(duration, 1)} ms\x1b[0m')
+
+    @staticmethod
+    def print_progress(done: int, total: int, name: str):
+        print(f'\x1b[36m[{done}/{total}] {name}\x1b[0m')
+
     def command_help(self):
         print('\x1b[36;1mCommands:\x1b[0m')
         for command in self.commands:
@@ -17,6 +17,7 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import tomllib
+import inspect
 import ujson as json
 import discord
 from discord.ext import bridge
@@ -111,10 +112,33 @@ class ShinobuBot(bridge.Bot):
     def remove_cleanup_func(self, func_name: str):
         self._cleanups.pop(func_name, None)
 
+    async def close(self):
+        # Run async cleanup functions while the event loop is still alive
+        for name, cleanup_func in self._cleanups.items():
+            if not inspect.iscoroutinefunction(cleanup_func):
+                continue
+
+            print(f"Cleaning up runtime. ({name})")
+
+            # noinspection PyBroadException
+            try:
+                await cleanup_func()
+            except:
+                # For the sake of letting other cleanup functions run, we'll ignore the error
+                pass
+
+        await super().close()
+
     def cleanup(self):
+        # Async cleanup functions are run on close, so we'll skip them here
+        cleanups: dict = {
+            name: cleanup_func for name, cleanup_func in self._cleanups.items()
+            if not inspect.iscoroutinefunction(cleanup_func)
+        }
+
         current_index: int = 1
-        total: int = len(self._cleanups)
-        for name, cleanup_func in self._cleanups.items():
+        total: int = len(cleanups)
+        for name, cleanup_func in cleanups.items():
             print(f"Cleaning up runtime. ({name}, {current_index}/{total})")
 
             # noinspection PyBroadException
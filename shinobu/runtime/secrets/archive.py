@@ -0,0 +1,370 @@
+"""
+Shinobu - Converse from anywhere, anytime.
+Copyright (C) 2026-present  Green (@greeeen-dev)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import typing
+import contextlib
+import ujson as json
+from ujson import JSONDecodeError
+from shinobu.runtime.secrets import storage, backup
+
+# Full backups are stored here as single files
+archives_directory: str = "data/archives"
+
+# Archive format version, bump this if the archive format changes
+archive_version: int = 1
+
+# Progress is reported every this many entries
+progress_interval: int = 10000
+
+class ArchiveDocument:
+    """A secure file, one of its segments or its journal in an archive.
+
+    File and segment entries are dict entries (see backup.iter_entries), while journal entries are single
+    records. Entries can be any iterable, so large files can be generated while they're being written."""
+
+    def __init__(self, filename: str, segment: str | None = None, journal: bool = False,
+                 entries: typing.Iterable[list] = ()):
+        if not filename.isalnum() or (segment is not None and not segment.isalnum()):
+            raise ValueError("Filename and segment should be alphanumeric")
+
+        self._filename: str = filename
+        self._segment: str | None = segment
+        self._journal: bool = journal
+        self._entries: typing.Iterable[list] = entries
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def segment(self) -> str | None:
+        return self._segment
+
+    @property
+    def journal(self) -> bool:
+        return self._journal
+
+    @property
+    def entries(self) -> typing.Iterable[list]:
+        return self._entries
+
+    def to_dict(self) -> dict:
+        return {
+            "filename": self._filename,
+            "segment": self._segment,
+            "journal": self._journal
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ArchiveDocument':
+        return cls(
+            filename=data["filename"],
+            segment=data.get("segment"),
+            journal=data.get("journal", False)
+        )
+
+def get_archive_path(name: str) -> str:
+    """Returns the path of an archive in the archives directory."""
+
+    if not name.isalnum():
+        raise ValueError("Archive name should be alphanumeric")
+
+    return os.path.join(archives_directory, f"{name}.bin")
+
+def list_archives() -> list[str]:
+    """Lists archives in the archives directory, newest first."""
+
+    try:
+        entries: list[str] = [entry for entry in os.listdir(archives_directory) if entry.endswith(".bin")]
+    except FileNotFoundError:
+        return []
+
+    entries.sort(key=lambda entry: os.path.getmtime(os.path.join(archives_directory, entry)), reverse=True)
+    return [entry[:-4] for entry in entries]
+
+def _iter_lines(documents: typing.Iterable[ArchiveDocument], stats: dict, progress=None) -> typing.Iterator[bytes]:
+    # Header
+    yield json.dumps({"archive": archive_version, "created": stats["created"]}).encode() + b"\n"
+
+    for document in documents:
+        yield json.dumps({"document": document.to_dict()}).encode() + b"\n"
+        stats["documents"] += 1
+
+        for entry in document.entries:
+            line: bytes = json.dumps(entry).encode() + b"\n"
+            stats["entries"] += 1
+            stats["size"] += len(line)
+
+            if progress and stats["entries"] % progress_interval == 0:
+                progress(stats["entries"], stats["size"])
+
+            yield line
+
+    # Trailer, so a restore can tell the archive is complete
+    yield json.dumps({"end": {"documents": stats["documents"], "entries": stats["entries"]}}).encode() + b"\n"
+
+def write_archive(raw_encryptor, path: str, documents: typing.Iterable[ArchiveDocument],
+                  kdf_profile: str | None = None, progress=None) -> dict:
+    """Encrypts documents into an archive. Entries are encrypted and written as they're generated, and each
+    chunk of the archive carries its own tag, so memory use doesn't depend on the size of the documents.
+
+    progress is called with the number of entries and bytes written so far. Returns the archive's summary."""
+
+    stats: dict = {"created": time.time(), "documents": 0, "entries": 0, "size": 0}
+
+    directory: str = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    raw_encryptor.encrypt_to_file(
+        _iter_lines(documents, stats, progress=progress), path, kdf_profile=kdf_profile, container="binary"
+    )
+
+    if progress:
+        progress(stats["entries"], stats["size"])
+
+    return stats
+
+def _iter_decrypted_lines(raw_encryptor, path: str) -> typing.Iterator[bytes]:
+    buffer: bytearray = bytearray()
+
+    for piece in raw_encryptor.iter_decrypt_file(path):
+        buffer += piece
+
+        # Yield complete lines and keep the rest for the next piece
+        end: int = buffer.rfind(b"\n")
+        if end == -1:
+            continue
+
+        yield from bytes(buffer[:end]).split(b"\n")
+        del buffer[:end + 1]
+
+    if len(buffer) > 0:
+        raise ValueError("Archive is truncated")
+
+def iter_archive(raw_encryptor, path: str, progress=None) -> typing.Iterator[tuple[ArchiveDocument, list | None]]:
+    """Yields each entry of an archive along with the document it belongs to. The start of each document is
+    yielded with no entry, so empty documents aren't lost. Raises ValueError if the archive has been tampered
+    with or is incomplete.
+
+    Entries are yielded before the rest of the archive is authenticated, so use verify_archive before
+    acting on them."""
+
+    lines: typing.Iterator[bytes] = _iter_decrypted_lines(raw_encryptor, path)
+    document: ArchiveDocument | None = None
+    documents: int = 0
+    entries: int = 0
+    size: int = 0
+
+    # Decryption errors (e.g. a wrong password) should be raised as they are
+    first: bytes | None = next(lines, None)
+
+    try:
+        header: dict = json.loads(first) if first is not None else {}
+    except (JSONDecodeError, ValueError):
+        raise ValueError("Archive header is missing")
+
+    if type(header) is not dict or not header.get("archive"):
+        raise ValueError("Archive header is missing")
+
+    if header["archive"] > archive_version:
+        raise ValueError("Unsupported archive version")
+
+    for line in lines:
+        try:
+            item = json.loads(line)
+        except (JSONDecodeError, ValueError):
+            raise ValueError("Archive is corrupted")
+
+        if type(item) is list:
+            if not document:
+                raise ValueError("Archive is corrupted")
+
+            entries += 1
+            size += len(line) + 1
+
+            if progress and entries % progress_interval == 0:
+                progress(entries, size)
+
+            yield document, item
+        elif type(item) is dict and "document" in item:
+            try:
+                document = ArchiveDocument.from_dict(item["document"])
+            except (KeyError, TypeError, AttributeError):
+                raise ValueError("Archive is corrupted")
+
+            documents += 1
+            yield document, None
+        elif type(item) is dict and "end" in item:
+            if item["end"].get("documents") != documents or item["end"].get("entries") != entries:
+                raise ValueError("Archive is incomplete")
+
+            # Nothing should come after the trailer
+            if next(lines, None) is not None:
+                raise ValueError("Archive is corrupted")
+
+            if progress:
+                progress(entries, size)
+
+            return
+        else:
+            raise ValueError("Archive is corrupted")
+
+    raise ValueError("Archive is truncated")
+
+def verify_archive(raw_encryptor, path: str, progress=None) -> dict:
+    """Decrypts and validates a whole archive without keeping any of it. Raises ValueError if the archive
+    can't be restored. Returns the archive's summary."""
+
+    stats: dict = {"created": os.path.getmtime(path), "documents": 0, "entries": 0, "size": os.path.getsize(path)}
+    files: set[str] = set()
+
+    for document, entry in iter_archive(raw_encryptor, path, progress=progress):
+        if entry is None:
+            stats["documents"] += 1
+            files.add(document.filename)
+        else:
+            stats["entries"] += 1
+
+    stats.update({"files": sorted(files)})
+    return stats
+
+def iter_documents(raw_encryptor, path: str, progress=None) -> typing.Iterator[tuple[ArchiveDocument, dict | list]]:
+    """Yields each document of an archive with its contents, one document at a time. Files and segments
+    are rebuilt as dicts, while journals are rebuilt as lists of records. See iter_archive."""
+
+    current: ArchiveDocument | None = None
+    entries: list[list] = []
+
+    def rebuild() -> dict | list:
+        if current.journal:
+            return [entry[0] for entry in entries]
+
+        return backup.assemble_entries(entries)
+
+    for document, entry in iter_archive(raw_encryptor, path, progress=progress):
+        if entry is not None:
+            entries.append(entry)
+            continue
+
+        # A new document has started
+        if current:
+            yield current, rebuild()
+
+        current = document
+        entries = []
+
+    if current:
+        yield current, rebuild()
+
+def get_document_path(document: ArchiveDocument, container: str = "binary") -> str:
+    """Returns the path a document should be restored to."""
+
+    if document.journal:
+        return storage.get_journal_path(document.filename)
+
+    if document.segment is not None:
+        return storage.get_secure_file_path(
+            storage.get_segment_name(document.filename, document.segment), container
+        )
+
+    return storage.get_secure_file_path(document.filename, container)
+
+def _iter_file_entries(raw_encryptor, path: str) -> typing.Iterator[list]:
+    # Files are only decrypted once the archive reaches them
+    data = json.loads(raw_encryptor.decrypt_file(path))
+
+    if type(data) is not dict:
+        raise ValueError(f"{path} does not contain a JSON object")
+
+    yield from backup.iter_entries(data)
+
+def _iter_journal_entries(raw_encryptor, path: str) -> typing.Iterator[list]:
+    for record in raw_encryptor.decrypt_records(path):
+        yield [json.loads(record)]
+
+def iter_secure_file_documents(raw_encryptor, filename: str) -> typing.Iterator[ArchiveDocument]:
+    """Yields archive documents for a secure file stored on disk, its segments and its journal. Only one
+    file is decrypted at a time."""
+
+    path: str | None = storage.find_secure_file(filename)
+    if path:
+        yield ArchiveDocument(filename, entries=_iter_file_entries(raw_encryptor, path))
+
+    for segment in storage.list_segments(filename):
+        path = storage.find_secure_file(storage.get_segment_name(filename, segment))
+        if path:
+            yield ArchiveDocument(filename, segment, entries=_iter_file_entries(raw_encryptor, path))
+
+    journal_path: str = storage.get_journal_path(filename)
+    if os.path.exists(journal_path):
+        yield ArchiveDocument(filename, journal=True, entries=_iter_journal_entries(raw_encryptor, journal_path))
+
+def stage_documents(raw_encryptor, path: str, filenames: list[str], container: str = "binary") -> dict[str, str]:
+    """Writes each document of an archive to a staging file next to where it'll be restored, one document at
+    a time. Returns a mapping of target paths to staging paths. Documents of files not in filenames are
+    skipped. Staging files are removed if anything goes wrong."""
+
+    staged: dict[str, str] = {}
+
+    try:
+        for document, content in iter_documents(raw_encryptor, path):
+            if document.filename not in filenames:
+                continue
+
+            target_path: str = get_document_path(document, container)
+            staging_path: str = storage.get_temp_path(target_path)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            staged.update({target_path: staging_path})
+
+            if document.journal:
+                raw_encryptor.encrypt_records_to_file([json.dumps(record) for record in content], staging_path)
+            else:
+                raw_encryptor.encrypt_to_file(json.dumps(content), staging_path, container=container)
+    except BaseException:
+        for staging_path in staged.values():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(staging_path)
+
+        raise
+
+    return staged
+
+def remove_unstaged(filenames: list[str], staged: dict[str, str]):
+    """Removes copies of secure files, their segments and their journals that aren't being restored, so
+    nothing from before the restore is loaded alongside restored data."""
+
+    for filename in filenames:
+        names: list[str] = [filename] + [
+            storage.get_segment_name(filename, segment) for segment in storage.list_segments(filename)
+        ]
+
+        for name in names:
+            for container in storage.container_extensions:
+                file_path: str = storage.get_secure_file_path(name, container)
+
+                if file_path not in staged:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(file_path)
+
+        journal_path: str = storage.get_journal_path(filename)
+        if journal_path not in staged:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(journal_path)
@@ -0,0 +1,450 @@
+"""
+Shinobu - Converse from anywhere, anytime.
+Copyright (C) 2026-present  Green (@greeeen-dev)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import hmac
+import base64
+import shutil
+import typing
+import zlib
+import hashlib
+import contextlib
+import ujson as json
+from shinobu.runtime.secrets import encryptor, storage
+
+# Incremental backups are stored here, one directory per file and one subdirectory per backup chain
+backups_directory: str = "data/backups"
+
+# Manifest format version, bump this if the manifest format changes
+backup_version: int = 1
+
+# Chunk boundaries are placed after records whose hash matches the mask, so unchanged records end up in the
+# same chunks as in the previous backup. 255 gives chunks of about 256 records.
+chunk_boundary_mask: int = 255
+chunk_min_size: int = 16384
+chunk_max_size: int = 1048576
+
+# HKDF salt for the key used to hash chunks (chunk IDs shouldn't reveal anything about the plaintext)
+chunk_id_salt: bytes = b"shinobu-backup-chunk-id"
+
+class BackupManifest:
+    """Lists the chunks that make up a backup, in order."""
+
+    def __init__(self, filename: str, seq: int, chunks: list[str], parent: int | None = None,
+                 created: float | None = None, size: int = 0, added: int = 0):
+        self._filename: str = filename
+        self._seq: int = seq
+        self._chunks: list[str] = chunks
+        self._parent: int | None = parent
+        self._created: float = created or time.time()
+        self._size: int = size
+        self._added: int = added
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @property
+    def chunks(self) -> list[str]:
+        return self._chunks
+
+    @property
+    def parent(self) -> int | None:
+        """Sequence number of the previous backup in the chain."""
+        return self._parent
+
+    @property
+    def created(self) -> float:
+        return self._created
+
+    @property
+    def size(self) -> int:
+        """Size of the backed up data in bytes (before compression and encryption)."""
+        return self._size
+
+    @property
+    def added(self) -> int:
+        """Number of chunks this backup added to the chain."""
+        return self._added
+
+    def to_dict(self) -> dict:
+        return {
+            "version": backup_version,
+            "filename": self._filename,
+            "seq": self._seq,
+            "parent": self._parent,
+            "created": self._created,
+            "size": self._size,
+            "added": self._added,
+            "chunks": self._chunks
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'BackupManifest':
+        if data.get("version", 0) > backup_version:
+            raise ValueError("Unsupported backup version")
+
+        return cls(
+            filename=data["filename"],
+            seq=data["seq"],
+            chunks=data["chunks"],
+            parent=data.get("parent"),
+            created=data.get("created"),
+            size=data.get("size", 0),
+            added=data.get("added", 0)
+        )
+
+def iter_entries(data: dict) -> typing.Iterator[list]:
+    """Splits a dict into entries. Nested dicts are split into one entry per key, so a change to one key
+    only changes one entry."""
+
+    for key, value in data.items():
+        if type(value) is dict and len(value) > 0:
+            for entry_key, entry_value in value.items():
+                yield [key, entry_key, entry_value]
+        else:
+            yield [key, value]
+
+def iter_records(data: dict) -> typing.Iterator[bytes]:
+    """Splits a dict into records, one entry per line."""
+
+    for entry in iter_entries(data):
+        yield json.dumps(entry).encode() + b"\n"
+
+def iter_chunks(records: typing.Iterable[bytes]) -> typing.Iterator[bytes]:
+    """Groups records into content-defined chunks."""
+
+    chunk: bytearray = bytearray()
+
+    for record in records:
+        chunk += record
+
+        if len(chunk) >= chunk_max_size or (
+            len(chunk) >= chunk_min_size and zlib.crc32(record) & chunk_boundary_mask == 0
+        ):
+            yield bytes(chunk)
+            chunk.clear()
+
+    if len(chunk) > 0:
+        yield bytes(chunk)
+
+def assemble_entries(entries: typing.Iterable[list]) -> dict:
+    """Rebuilds a dict from its entries."""
+
+    data: dict = {}
+
+    for entry in entries:
+        if len(entry) == 3:
+            data.setdefault(entry[0], {}).update({entry[1]: entry[2]})
+        else:
+            data.update({entry[0]: entry[1]})
+
+    return data
+
+def assemble(records: typing.Iterable[bytes]) -> dict:
+    """Rebuilds a dict from its records."""
+    return assemble_entries(json.loads(record) for record in records)
+
+class BackupStore:
+    """Stores incremental, content-addressed backups of a secure file.
+
+    Backups are split into chunks that are named after a keyed hash of their contents. A chunk is only
+    encrypted and written if no earlier backup in the chain has it, and each backup's manifest lists every
+    chunk it needs. All backups in a chain share a master key, so the KDF only runs once per chain per
+    process rather than once per backup."""
+
+    def __init__(self, filename: str, raw_encryptor):
+        if not filename.isalnum():
+            raise ValueError("Filename should be alphanumeric")
+
+        self._filename: str = filename
+        self._encryptor = raw_encryptor
+        self._directory: str = os.path.join(backups_directory, filename)
+
+    def _get_chains(self) -> list[str]:
+        """Returns chain directories, newest first."""
+
+        # Chains that are still being re-encrypted are hidden
+        try:
+            chains: list[str] = [
+                os.path.join(self._directory, entry) for entry in os.listdir(self._directory)
+                if os.path.isdir(os.path.join(self._directory, entry)) and not entry.startswith(".")
+            ]
+        except FileNotFoundError:
+            return []
+
+        return sorted(chains, key=os.path.getmtime, reverse=True)
+
+    @staticmethod
+    def _get_manifest_path(chain: str, seq: int) -> str:
+        return os.path.join(chain, f"manifest{seq:08d}.bin")
+
+    @staticmethod
+    def _get_chunk_path(chain: str, chunk_id: str) -> str:
+        return os.path.join(chain, "chunks", f"{chunk_id}.bin")
+
+    @staticmethod
+    def _list_manifests(chain: str) -> list[int]:
+        """Returns sequence numbers of a chain's backups, oldest first."""
+
+        return sorted([
+            int(entry[8:-4]) for entry in os.listdir(chain)
+            if entry.startswith("manifest") and entry.endswith(".bin") and entry[8:-4].isdigit()
+        ])
+
+    def _get_session(self, chain: str) -> encryptor.SessionKey | None:
+        """Returns the session key of a chain."""
+
+        manifests: list[int] = self._list_manifests(chain)
+
+        if len(manifests) == 0:
+            return None
+
+        header: encryptor.EncryptedData | None = storage.read_binary_header(
+            self._get_manifest_path(chain, manifests[-1])
+        )
+
+        if not header:
+            return None
+
+        return self._encryptor.get_backup_session(
+            base64.b64decode(header.salt), kdf_profile=header.profile
+        )
+
+    def _get_latest_chain(self) -> tuple[str | None, encryptor.SessionKey | None]:
+        """Returns the newest chain that has backups, and its session key."""
+
+        for chain in self._get_chains():
+            session: encryptor.SessionKey | None = self._get_session(chain)
+
+            if session:
+                return chain, session
+
+        return None, None
+
+    def _read_manifest(self, chain: str, seq: int, session: encryptor.SessionKey) -> BackupManifest:
+        return BackupManifest.from_dict(
+            json.loads(self._encryptor.decrypt_file(self._get_manifest_path(chain, seq), session=session))
+        )
+
+    def _read_chunk(self, chain: str, chunk_id: str, session: encryptor.SessionKey, id_key: bytearray) -> bytes:
+        try:
+            chunk: bytes = self._encryptor.decrypt_file(self._get_chunk_path(chain, chunk_id), session=session).encode()
+        except FileNotFoundError:
+            raise ValueError(f"Chunk {chunk_id} is missing")
+
+        # Chunks are authenticated, but a valid chunk could still have been swapped with another one
+        if not hmac.compare_digest(hmac.new(id_key, chunk, hashlib.sha256).hexdigest(), chunk_id):
+            raise ValueError(f"Chunk {chunk_id} does not match its ID")
+
+        return chunk
+
+    def _open_chain(self, kdf_profile: str | None) -> tuple[str, encryptor.SessionKey, BackupManifest | None]:
+        """Returns the chain to add a backup to, its session key and its latest manifest. A new chain is
+        started if the latest chain can't be decrypted (e.g. the password changed) or uses another KDF
+        profile."""
+
+        chain, session = self._get_latest_chain()
+
+        if session and (not kdf_profile or session.profile == kdf_profile):
+            try:
+                return chain, session, self._read_manifest(chain, self._list_manifests(chain)[-1], session)
+            except ValueError:
+                pass
+
+        session = self._encryptor.get_backup_session(kdf_profile=kdf_profile)
+        chain = os.path.join(self._directory, session.salt.hex())
+        os.makedirs(os.path.join(chain, "chunks"), exist_ok=True)
+
+        return chain, session, None
+
+    def backup(self, data: dict, kdf_profile: str | None = None) -> BackupManifest:
+        """Backs up a dict. Only chunks that aren't already in the chain are encrypted and written."""
+
+        chain, session, latest = self._open_chain(kdf_profile)
+        id_key: bytearray = session.derive_subkey(chunk_id_salt)
+        chunks: list[str] = []
+        size: int = 0
+        added: int = 0
+
+        try:
+            for chunk in iter_chunks(iter_records(data)):
+                chunk_id: str = hmac.new(id_key, chunk, hashlib.sha256).hexdigest()
+                chunk_path: str = self._get_chunk_path(chain, chunk_id)
+                chunks.append(chunk_id)
+                size += len(chunk)
+
+                if not os.path.exists(chunk_path):
+                    self._encryptor.encrypt_to_file(chunk, chunk_path, container="binary", session=session)
+                    added += 1
+        finally:
+            encryptor.BaseEncryptor.clear_key(id_key)
+
+        # Chunks are on disk, so the manifest can be written
+        manifest: BackupManifest = BackupManifest(
+            filename=self._filename,
+            seq=latest.seq + 1 if latest else 1,
+            chunks=chunks,
+            parent=latest.seq if latest else None,
+            size=size,
+            added=added
+        )
+        self._encryptor.encrypt_to_file(
+            json.dumps(manifest.to_dict()), self._get_manifest_path(chain, manifest.seq), container="binary",
+            session=session
+        )
+
+        # Mark chain as the newest one
+        os.utime(chain)
+
+        return manifest
+
+    def list_chains(self) -> list[str]:
+        """Returns the directories of this file's backup chains, newest first."""
+        return self._get_chains()
+
+    def list(self) -> list[BackupManifest]:
+        """Lists backups in the newest chain, oldest first."""
+
+        chain, session = self._get_latest_chain()
+
+        if not session:
+            return []
+
+        return [self._read_manifest(chain, seq, session) for seq in self._list_manifests(chain)]
+
+    def iter_restore(self, seq: int | None = None) -> typing.Iterator[bytes]:
+        """Yields the records of a backup in the newest chain. If no sequence number is given, the latest
+        backup is used. Raises ValueError if a chunk is missing or has been tampered with."""
+
+        chain, session = self._get_latest_chain()
+
+        if not session:
+            raise FileNotFoundError("No backups found")
+
+        manifest: BackupManifest = self._read_manifest(chain, seq or self._list_manifests(chain)[-1], session)
+        id_key: bytearray = session.derive_subkey(chunk_id_salt)
+
+        try:
+            for chunk_id in manifest.chunks:
+                yield from self._read_chunk(chain, chunk_id, session, id_key).splitlines(keepends=True)
+        finally:
+            encryptor.BaseEncryptor.clear_key(id_key)
+
+    def restore(self, seq: int | None = None) -> dict:
+        """Restores a backup in the newest chain. See iter_restore."""
+        return assemble(self.iter_restore(seq))
+
+    def copy_chain(self, chain: str, raw_encryptor, path: str, salt: bytes | None = None) -> bool:
+        """Writes a copy of a chain to a new directory, encrypted with another encryptor (e.g. after a password
+        change). Chunk IDs are keyed, so chunks are renamed along the way. Returns False without writing
+        anything if the chain can't be decrypted."""
+
+        manifests: list[int] = self._list_manifests(chain)
+        session: encryptor.SessionKey | None = self._get_session(chain)
+
+        if not session:
+            return False
+
+        try:
+            self._read_manifest(chain, manifests[-1], session)
+        except ValueError:
+            return False
+
+        new_session: encryptor.SessionKey = raw_encryptor.get_backup_session(salt, kdf_profile=session.profile)
+        id_key: bytearray = session.derive_subkey(chunk_id_salt)
+        new_id_key: bytearray = new_session.derive_subkey(chunk_id_salt)
+        chunk_ids: dict[str, str] = {}
+
+        os.makedirs(os.path.join(path, "chunks"), exist_ok=True)
+
+        try:
+            for seq in manifests:
+                manifest: BackupManifest = self._read_manifest(chain, seq, session)
+
+                for chunk_id in manifest.chunks:
+                    if chunk_id in chunk_ids:
+                        continue
+
+                    chunk: bytes = self._read_chunk(chain, chunk_id, session, id_key)
+                    new_chunk_id: str = hmac.new(new_id_key, chunk, hashlib.sha256).hexdigest()
+                    raw_encryptor.encrypt_to_file(
+                        chunk, self._get_chunk_path(path, new_chunk_id), container="binary", session=new_session
+                    )
+                    chunk_ids.update({chunk_id: new_chunk_id})
+
+                copied: BackupManifest = BackupManifest(
+                    filename=manifest.filename,
+                    seq=manifest.seq,
+                    chunks=[chunk_ids[chunk_id] for chunk_id in manifest.chunks],
+                    parent=manifest.parent,
+                    created=manifest.created,
+                    size=manifest.size,
+                    added=manifest.added
+                )
+                raw_encryptor.encrypt_to_file(
+                    json.dumps(copied.to_dict()), self._get_manifest_path(path, seq), container="binary",
+                    session=new_session
+                )
+        finally:
+            encryptor.BaseEncryptor.clear_key(id_key)
+            encryptor.BaseEncryptor.clear_key(new_id_key)
+
+        # Keep the chain's place among the file's chains
+        modified: float = os.path.getmtime(chain)
+        os.utime(path, (modified, modified))
+
+        return True
+
+    def prune(self, keep: int):
+        """Removes all but the newest backups, along with chunks no remaining backup needs. Older chains are
+        removed once the newest chain has enough backups."""
+
+        chain, session = self._get_latest_chain()
+
+        if not session or keep < 1:
+            return
+
+        manifests: list[int] = self._list_manifests(chain)
+
+        if len(manifests) >= keep:
+            for old_chain in self._get_chains():
+                if old_chain != chain:
+                    shutil.rmtree(old_chain, ignore_errors=True)
+
+        if len(manifests) <= keep:
+            return
+
+        for seq in manifests[:-keep]:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._get_manifest_path(chain, seq))
+
+        # Remove chunks that are no longer needed
+        needed: set[str] = set()
+        for seq in manifests[-keep:]:
+            needed.update(self._read_manifest(chain, seq, session).chunks)
+
+        for entry in os.listdir(os.path.join(chain, "chunks")):
+            if entry.endswith(".bin") and entry[:-4] not in needed:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(chain, "chunks", entry))
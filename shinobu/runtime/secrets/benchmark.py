@@ -0,0 +1,325 @@
+"""
+Shinobu - Converse from anywhere, anytime.
+Copyright (C) 2026-present  Green (@greeeen-dev)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+import time
+import platform
+import threading
+import statistics
+import psutil
+import ujson as json
+from Crypto import Random as CryptoRandom
+from shinobu.runtime.secrets import encryptor, storage
+
+# Payload sizes to benchmark (1 KB to 100 MB)
+payload_sizes: list[int] = [1000, 10000, 100000, 1000000, 10000000, 100000000]
+
+# Single-shot encryption base64-encodes the whole payload, so it's only benchmarked for small payloads
+single_shot_max_size: int = 1000000
+
+# Maximum bytes processed per benchmark case, so large payloads don't take forever
+case_byte_budget: int = 500000000
+
+# Results format version, bump this if the results format changes
+results_version: int = 1
+
+class RSSMonitor:
+    """Samples the resident set size of this process in a background thread and records the peak."""
+
+    def __init__(self, interval: float = 0.005):
+        self._process: psutil.Process = psutil.Process()
+        self._interval: float = interval
+        self._peak: int = 0
+        self._stop: threading.Event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def peak(self) -> int:
+        """Peak resident set size in bytes."""
+        return self._peak
+
+    def _sample(self):
+        self._peak = max(self._peak, self._process.memory_info().rss)
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self._sample()
+
+    def __enter__(self) -> 'RSSMonitor':
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+class BenchmarkResult:
+    """Results of a benchmark case."""
+
+    def __init__(self, name: str, params: dict, durations: list[float], size: int, peak_rss: int):
+        self._name: str = name
+        self._params: dict = params
+        self._durations: list[float] = durations
+        self._size: int = size
+        self._peak_rss: int = peak_rss
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def params(self) -> dict:
+        return self._params
+
+    @property
+    def durations(self) -> list[float]:
+        """Durations of each iteration in seconds."""
+        return self._durations
+
+    @property
+    def size(self) -> int:
+        """Payload size in bytes (0 if the case doesn't process a payload)."""
+        return self._size
+
+    @property
+    def peak_rss(self) -> int:
+        """Peak resident set size during the case in bytes."""
+        return self._peak_rss
+
+    def percentile(self, percentile: float) -> float:
+        """Returns a latency percentile in seconds (nearest-rank)."""
+
+        ordered: list[float] = sorted(self._durations)
+        index: int = max(0, min(len(ordered) - 1, round(percentile / 100 * len(ordered) + 0.5) - 1))
+        return ordered[index]
+
+    @property
+    def throughput(self) -> float | None:
+        """Median throughput in bytes per second."""
+
+        if not self._size:
+            return None
+
+        return self._size / statistics.median(self._durations)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self._name,
+            "params": self._params,
+            "size": self._size,
+            "iterations": len(self._durations),
+            "latency_ms": {
+                "min": min(self._durations) * 1000,
+                "p50": self.percentile(50) * 1000,
+                "p90": self.percentile(90) * 1000,
+                "p99": self.percentile(99) * 1000,
+                "max": max(self._durations) * 1000,
+                "mean": statistics.fmean(self._durations) * 1000
+            },
+            "throughput_mib_s": self.throughput / 1048576 if self.throughput else None,
+            "peak_rss_mib": self._peak_rss / 1048576
+        }
+
+def get_payload(size: int) -> str:
+    """Returns a random ASCII payload of the given size."""
+    return CryptoRandom.get_random_bytes(size // 2 + 1).hex()[:size]
+
+def get_iterations(iterations: int, size: int) -> int:
+    """Returns the number of iterations for a payload size. Large payloads get fewer iterations, though at
+    least 3 iterations are always run so percentiles stay meaningful."""
+
+    if not size:
+        return iterations
+
+    return max(3, min(iterations, case_byte_budget // size))
+
+def run_case(name: str, params: dict, func, iterations: int, size: int = 0) -> BenchmarkResult:
+    """Runs a benchmark case."""
+
+    durations: list[float] = []
+
+    # Warm up once, so one-time costs (imports, allocations) don't skew percentiles
+    func()
+
+    with RSSMonitor() as monitor:
+        for _ in range(iterations):
+            start: float = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start)
+
+    return BenchmarkResult(name, params, durations, size, monitor.peak)
+
+def benchmark_kdf(iterations: int = 10, progress=None) -> list[BenchmarkResult]:
+    """Benchmarks every available KDF profile."""
+
+    results: list[BenchmarkResult] = []
+
+    for kdf in encryptor.kdf_available:
+        for profile in encryptor.kdf_profiles[kdf]:
+            if kdf == "argon2" and profile not in encryptor.argon2_available:
+                continue
+
+            if progress:
+                progress("kdf", {"kdf": kdf, "profile": profile})
+
+            def derive(kdf=kdf, profile=profile):
+                key: bytearray = encryptor.BaseEncryptor.derive_password_hash(
+                    "benchmark", CryptoRandom.get_random_bytes(16), kdf=kdf, profile=profile
+                )
+                encryptor.BaseEncryptor.clear_key(key)
+
+            results.append(run_case("kdf", {"kdf": kdf, "profile": profile}, derive, iterations))
+
+    return results
+
+def benchmark_ciphers(sizes: list[int] | None = None, iterations: int = 20, progress=None) -> list[BenchmarkResult]:
+    """Benchmarks encryption and decryption for every algorithm and payload size. A session key is used,
+    so KDF costs are excluded (see benchmark_kdf)."""
+
+    results: list[BenchmarkResult] = []
+    session: encryptor.SessionKey = encryptor.SessionKey("benchmark")
+    auto_encryptor: encryptor.AutoEncryptor = encryptor.AutoEncryptor()
+
+    try:
+        for size in sizes or payload_sizes:
+            payload: str = get_payload(size)
+            size_iterations: int = get_iterations(iterations, size)
+
+            for algorithm in encryptor.algo_available:
+                params: dict = {"algorithm": algorithm}
+
+                if progress:
+                    progress("cipher", params | {"size": size})
+
+                # Chunked encryption (used for secure files)
+                def encrypt_stream(algorithm=algorithm):
+                    _, chunks = auto_encryptor.encrypt_stream(payload, "benchmark", algorithm=algorithm, session=session)
+                    for _ in chunks:
+                        pass
+
+                header, chunks = auto_encryptor.encrypt_stream(payload, "benchmark", algorithm=algorithm, session=session)
+                ciphertext: bytes = b"".join(chunks)
+
+                results.append(run_case(
+                    "encrypt_stream", params, encrypt_stream, size_iterations, size=size
+                ))
+                results.append(run_case(
+                    "decrypt_stream", params,
+                    lambda: auto_encryptor.decrypt_buffer(header, ciphertext, "benchmark", session=session),
+                    size_iterations, size=size
+                ))
+                del ciphertext
+
+                # Single-shot encryption (used for tokens and exports)
+                if size > single_shot_max_size:
+                    continue
+
+                encrypted_data: encryptor.EncryptedData = auto_encryptor.encrypt(
+                    payload, "benchmark", algorithm=algorithm, session=session
+                )
+
+                results.append(run_case(
+                    "encrypt", params,
+                    lambda algorithm=algorithm: auto_encryptor.encrypt(
+                        payload, "benchmark", algorithm=algorithm, session=session
+                    ),
+                    size_iterations, size=size
+                ))
+                results.append(run_case(
+                    "decrypt", params,
+                    lambda: auto_encryptor.decrypt(encrypted_data, "benchmark", session=session),
+                    size_iterations, size=size
+                ))
+
+            del payload
+    finally:
+        session.clear()
+
+    return results
+
+def benchmark_roundtrip(save, read, sizes: list[int] | None = None, iterations: int = 10,
+                        progress=None) -> list[BenchmarkResult]:
+    """Benchmarks saving and reading a secure file. save takes the data to save and read returns it."""
+
+    results: list[BenchmarkResult] = []
+
+    for size in sizes or payload_sizes:
+        payload: str = get_payload(size)
+        size_iterations: int = get_iterations(iterations, size)
+
+        if progress:
+            progress("roundtrip", {"size": size})
+
+        results.append(run_case("save", {}, lambda: save(payload), size_iterations, size=size))
+
+        def read_and_verify():
+            if read() != payload:
+                raise ValueError("Read data does not match saved data")
+
+        results.append(run_case("read", {}, read_and_verify, size_iterations, size=size))
+        del payload
+
+    return results
+
+def get_environment() -> dict:
+    """Returns information about the host, so results from different hosts aren't compared blindly."""
+
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "memory_mib": round(encryptor.available_mib),
+        "argon2_default": encryptor.argon2_default
+    }
+
+def run(sizes: list[int] | None = None, iterations: int = 20, kdf_iterations: int = 5,
+        save=None, read=None, progress=None) -> dict:
+    """Runs the benchmark suite and returns results as a dict. The secure file round-trip is only
+    benchmarked if save and read are given.
+
+    progress is called with the benchmark group and its parameters."""
+
+    started: float = time.time()
+    results: list[BenchmarkResult] = []
+
+    results.extend(benchmark_kdf(iterations=kdf_iterations, progress=progress))
+    results.extend(benchmark_ciphers(sizes=sizes, iterations=iterations, progress=progress))
+
+    if save and read:
+        results.extend(benchmark_roundtrip(save, read, sizes=sizes, iterations=iterations, progress=progress))
+
+    return {
+        "version": results_version,
+        "started": started,
+        "duration": time.time() - started,
+        "environment": get_environment(),
+        "peak_rss_mib": max([result.peak_rss for result in results]) / 1048576,
+        "results": [result.to_dict() for result in results]
+    }
+
+def write_results(results: dict, path: str):
+    """Writes benchmark results to a JSON file."""
+
+    with storage.atomic_open(path) as file:
+        # noinspection PyTypeChecker
+        json.dump(results, file, indent=4)
@@ -0,0 +1,188 @@
+"""
+Shinobu - Converse from anywhere, anytime.
+Copyright (C) 2026-present  Green (@greeeen-dev)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import statistics
+import argon2
+import ujson as json
+from Crypto import Random as CryptoRandom
+from shinobu.runtime.secrets import encryptor, storage
+
+# Calibrated profiles are stored here (these are only parameters, so they don't need to be encrypted)
+calibration_path: str = "data/kdf_profiles.json"
+
+# Minimum Argon2 parameters we'll accept, regardless of latency (OWASP recommendations)
+min_memory_cost: int = 19456 # 19 MiB
+min_time_cost: int = 2
+min_time_cost_memory: int = 47104 # 46 MiB, below this we need at least min_time_cost passes
+max_time_cost: int = encryptor.argon2_custom_max_time_cost
+
+class CalibrationResult:
+    """Results of an Argon2 calibration."""
+
+    def __init__(self, time_cost: int, memory_cost: int, parallelism: int, duration: float, target: float):
+        self._time_cost: int = time_cost
+        self._memory_cost: int = memory_cost
+        self._parallelism: int = parallelism
+        self._duration: float = duration
+        self._target: float = target
+
+    @property
+    def time_cost(self) -> int:
+        return self._time_cost
+
+    @property
+    def memory_cost(self) -> int:
+        """Memory cost in KiB."""
+        return self._memory_cost
+
+    @property
+    def parallelism(self) -> int:
+        return self._parallelism
+
+    @property
+    def duration(self) -> float:
+        """Median duration of a derivation in milliseconds."""
+        return self._duration
+
+    @property
+    def meets_target(self) -> bool:
+        """Whether the profile meets the target latency. The minimum parameters take priority over the target,
+        so this may be False on very slow hosts."""
+        return self._duration <= self._target
+
+    @property
+    def profile(self) -> str:
+        return encryptor.get_argon2_custom_name(self._time_cost, self._memory_cost, self._parallelism)
+
+def measure_argon2(time_cost: int, memory_cost: int, parallelism: int, rounds: int = 3) -> float:
+    """Returns the median duration of an Argon2id derivation in milliseconds."""
+
+    durations: list[float] = []
+    salt: bytes = CryptoRandom.get_random_bytes(16)
+
+    for _ in range(rounds):
+        start: float = time.perf_counter()
+        argon2.low_level.hash_secret_raw(
+            secret=b"shinobu-calibration",
+            salt=salt,
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism,
+            hash_len=32,
+            type=argon2.low_level.Type.ID
+        )
+        durations.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(durations)
+
+def calibrate_argon2(target: float = 250, max_memory: int = 64, parallelism: int | None = None,
+                     progress=None) -> CalibrationResult:
+    """Finds Argon2id parameters that take at most target milliseconds on this host and use at most
+    max_memory MiB. As much memory as possible is used first, then passes are added while the target allows.
+
+    progress is called with the parameters and duration of each measurement."""
+
+    parallelism = parallelism or min(os.cpu_count() or 1, 4)
+
+    # Don't use more than a quarter of the host's memory
+    memory_cost: int = max(min_memory_cost, min(max_memory * 1024, int(encryptor.available_mib * 256)))
+    time_cost: int = 1
+
+    # Reduce memory until a single pass fits the target
+    while True:
+        duration: float = measure_argon2(time_cost, memory_cost, parallelism)
+
+        if progress:
+            progress(time_cost, memory_cost, parallelism, duration)
+
+        if duration <= target or memory_cost <= min_memory_cost:
+            break
+
+        memory_cost = max(min_memory_cost, memory_cost // 2)
+
+    # Enforce minimum passes for low memory costs
+    if memory_cost < min_time_cost_memory:
+        time_cost = min_time_cost
+        duration = measure_argon2(time_cost, memory_cost, parallelism)
+
+        if progress:
+            progress(time_cost, memory_cost, parallelism, duration)
+
+    # Add passes while the target allows
+    while time_cost < max_time_cost:
+        next_duration: float = measure_argon2(time_cost + 1, memory_cost, parallelism)
+
+        if progress:
+            progress(time_cost + 1, memory_cost, parallelism, next_duration)
+
+        if next_duration > target:
+            break
+
+        time_cost += 1
+        duration = next_duration
+
+    return CalibrationResult(time_cost, memory_cost, parallelism, duration, target)
+
+def load_calibration(path: str = calibration_path) -> str | None:
+    """Loads calibrated Argon2 profiles and sets the calibrated default profile. Returns the default profile,
+    or None if there's no calibration."""
+
+    try:
+        with open(path, 'r') as file:
+            data: dict = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    for profile in data.get("profiles", []):
+        encryptor.register_argon2_profile(profile)
+
+    default: str | None = data.get("argon2_default")
+
+    if default:
+        try:
+            encryptor.set_argon2_default(default)
+        except ValueError:
+            return None
+
+    return default
+
+def save_calibration(result: CalibrationResult, path: str = calibration_path):
+    """Saves a calibrated profile and makes it the default profile for new data. Older calibrated profiles are
+    kept, so data encrypted with them remains listed."""
+
+    try:
+        with open(path, 'r') as file:
+            data: dict = json.load(file)
+    except (FileNotFoundError, ValueError):
+        data = {}
+
+    profiles: list[str] = data.get("profiles", [])
+    if result.profile not in profiles:
+        profiles.append(result.profile)
+
+    data.update({"argon2_default": result.profile, "profiles": profiles})
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    with storage.atomic_open(path) as file:
+        # noinspection PyTypeChecker
+        json.dump(data, file, indent=4)
+
+    encryptor.set_argon2_default(result.profile)
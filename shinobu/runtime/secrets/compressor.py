@@ -0,0 +1,136 @@
+"""
+Shinobu - Converse from anywhere, anytime.
+Copyright (C) 2026-present  Green (@greeeen-dev)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import zlib
+import typing
+
+# zstd is optional, zlib is always available
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Available compression algorithms
+compression_available: list[str] = ["zlib"]
+if zstandard:
+    compression_available.append("zstd")
+
+# Default compression levels
+default_levels: dict[str, int] = {
+    "zlib": 6,
+    "zstd": 3
+}
+
+# Size of pieces fed to the compressor, so large strings aren't encoded all at once
+compress_chunk_size: int = 1048576
+
+def get_preferred() -> str:
+    """Returns the preferred available compression algorithm."""
+    return "zstd" if "zstd" in compression_available else "zlib"
+
+def resolve(algorithm: str | None) -> str | None:
+    """Resolves a configured compression algorithm. "auto" picks the preferred algorithm, while "none" or
+    an empty value disables compression."""
+
+    if not algorithm or algorithm == "none":
+        return None
+
+    if algorithm == "auto":
+        return get_preferred()
+
+    if algorithm not in compression_available:
+        raise ValueError(f"Invalid compression algorithm {algorithm}")
+
+    return algorithm
+
+def iter_encoded(data: str | bytes) -> typing.Iterator[bytes | memoryview]:
+    """Splits a string or bytes into encoded pieces."""
+
+    if type(data) is str:
+        for index in range(0, len(data), compress_chunk_size):
+            yield data[index:index + compress_chunk_size].encode()
+    else:
+        view: memoryview = memoryview(data)
+        for index in range(0, len(view), compress_chunk_size):
+            yield view[index:index + compress_chunk_size]
+
+def _new_compressor(algorithm: str, level: int | None):
+    if algorithm not in compression_available:
+        raise ValueError(f"Invalid compression algorithm {algorithm}")
+
+    if level is None:
+        level = default_levels[algorithm]
+
+    if algorithm == "zstd":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+
+    return zlib.compressobj(level)
+
+def compress(data: str | bytes, algorithm: str, level: int | None = None) -> bytes:
+    """Compresses a string or bytes. Strings are encoded in pieces rather than all at once."""
+
+    compressor = _new_compressor(algorithm, level)
+
+    output: bytearray = bytearray()
+    for piece in iter_encoded(data):
+        output += compressor.compress(piece)
+    output += compressor.flush()
+
+    return bytes(output)
+
+def iter_compress(pieces: typing.Iterable[bytes], algorithm: str, level: int | None = None) -> typing.Iterator[bytes]:
+    """Compresses an iterable of bytes and yields compressed pieces as they become available."""
+
+    compressor = _new_compressor(algorithm, level)
+
+    for piece in pieces:
+        output: bytes = compressor.compress(piece)
+        if len(output) > 0:
+            yield output
+
+    yield compressor.flush()
+
+def iter_decompress(chunks: typing.Iterable[bytes], algorithm: str) -> typing.Iterator[bytes]:
+    """Decompresses data from an iterable of chunks and yields decompressed pieces."""
+
+    if algorithm not in compression_available:
+        raise ValueError(f"Unsupported compression algorithm {algorithm}")
+
+    if algorithm == "zstd":
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+    else:
+        decompressor = zlib.decompressobj()
+
+    try:
+        for chunk in chunks:
+            output: bytes = decompressor.decompress(chunk)
+            if len(output) > 0:
+                yield output
+
+        if algorithm == "zlib":
+            yield decompressor.flush()
+
+        # Both decompressors know whether the end of the stream (or zstd frame) has been reached
+        if not decompressor.eof:
+            raise ValueError("Compressed data is truncated")
+    except (zlib.error, zstandard.ZstdError if zstandard else zlib.error) as e:
+        raise ValueError("Compressed data is corrupted") from e
+
+def decompress_chunks(chunks: typing.Iterable[bytes], algorithm: str) -> bytes:
+    """Decompresses data from an iterable of chunks."""
+    return b"".join(iter_decompress(chunks, algorithm))
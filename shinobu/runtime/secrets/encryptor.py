@@ -16,16 +16,17 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import time
+import re
+import typing
+import dataclasses
 import base64
-import random
-import string
 import argon2
 import psutil
-from Crypto.Protocol.KDF import PBKDF2
+from Crypto.Protocol.KDF import PBKDF2, HKDF
 from Crypto.Cipher import AES, ChaCha20_Poly1305
 from Crypto import Hash
 from Crypto import Random as CryptoRandom
+from shinobu.runtime.secrets import compressor, gate
 
 available_mib: int = psutil.virtual_memory().total / 1048576
 
@@ -65,11 +66,86 @@ if available_mib >= 4096:
     # We need 2 GiB for argon2_high, so requiring 4 GiB is a safe minimum
     argon2_available.append("argon2_high")
 
+# Default Argon2 profile (this can be replaced by a calibrated profile)
+argon2_default: str = "argon2_low"
+
+# Custom Argon2 profile names encode their parameters, so data encrypted with them can always be decrypted
+argon2_custom_pattern: re.Pattern = re.compile(r"^argon2_custom_t(\d+)_m(\d+)_p(\d+)$")
+
+# Maximum parameters of custom Argon2 profiles. Profile names come from file headers, so without these limits
+# a tampered file could make us run a derivation of any cost. Memory is capped at argon2_high's cost (2 GiB).
+argon2_custom_max_memory_cost: int = argon2.profiles.RFC_9106_HIGH_MEMORY.memory_cost
+argon2_custom_max_time_cost: int = 10
+argon2_custom_max_parallelism: int = 16
+
+def get_argon2_custom_name(time_cost: int, memory_cost: int, parallelism: int) -> str:
+    """Returns the name of a custom Argon2 profile. Memory cost is in KiB."""
+
+    return f"argon2_custom_t{time_cost}_m{memory_cost}_p{parallelism}"
+
+def register_argon2_profile(profile: str) -> bool:
+    """Registers a custom Argon2 profile using the parameters in its name. Returns whether the profile
+    exists (built-in profiles are always considered registered). Profiles with parameters above the custom
+    profile limits are rejected, and profiles that need more memory than this host can spare are registered
+    without being made available."""
+
+    if profile in argon2_profiles:
+        return True
+
+    match: re.Match | None = argon2_custom_pattern.match(profile)
+    if not match:
+        return False
+
+    time_cost, memory_cost, parallelism = [int(value) for value in match.groups()]
+
+    if time_cost < 1 or memory_cost < 8 * parallelism or parallelism < 1:
+        return False
+
+    if (
+        time_cost > argon2_custom_max_time_cost or memory_cost > argon2_custom_max_memory_cost or
+        parallelism > argon2_custom_max_parallelism
+    ):
+        return False
+
+    argon2_profiles.update({profile: dataclasses.replace(
+        argon2.profiles.RFC_9106_LOW_MEMORY, time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+    )})
+
+    # Like argon2_high, hosts need twice the profile's memory
+    if memory_cost * 2 <= available_mib * 1024:
+        argon2_available.append(profile)
+
+    return True
+
+def set_argon2_default(profile: str):
+    """Sets the default Argon2 profile for new data."""
+
+    global argon2_default
+
+    if not register_argon2_profile(profile) or profile not in argon2_available:
+        raise ValueError("Argon2 profile not available")
+
+    argon2_default = profile
+
+# Limits the combined memory of concurrent Argon2 derivations (no limit until a budget is set)
+kdf_gate: gate.MemoryGate = gate.MemoryGate()
+
+def set_kdf_memory_budget(budget: int | None):
+    """Sets the memory budget for concurrent Argon2 derivations in bytes. None or 0 removes the limit."""
+    kdf_gate.budget = budget
+
+# HKDF context for subkeys derived from session keys
+subkey_context: bytes = b"shinobu-subkey-v1"
+
+# Plaintext chunk size for streaming encryption
+stream_chunk_size: int = 65536
+
 class EncryptedData:
     """A class representing data encrypted using any available algorithm."""
 
     def __init__(self, ciphertext: str, tag: str, nonce: str, salt: str, algorithm: str, kdf: str | None = None,
-                 profile: str | None = None):
+                 profile: str | None = None, subkey_salt: str | None = None, chunk_size: int | None = None,
+                 compression: str | None = None):
         self._ciphertext: str = ciphertext
         self._tag: str = tag
         self._nonce: str = nonce
@@ -77,6 +153,9 @@ class EncryptedData:
         self._algorithm: str = algorithm
         self._kdf: str = kdf or "pbkdf2"
         self._profile: str = profile or "pbkdf2_hmac_sha_1"
+        self._subkey_salt: str | None = subkey_salt
+        self._chunk_size: int | None = chunk_size
+        self._compression: str | None = compression
         self._outdated: bool = False
 
         if not profile and self._kdf == "pbkdf2":
@@ -85,6 +164,10 @@ class EncryptedData:
         if self._kdf not in kdf_available:
             raise ValueError("Invalid KDF")
 
+        if self._kdf == "argon2":
+            # Data may have been encrypted with a custom profile
+            register_argon2_profile(self._profile)
+
         if self._profile not in kdf_profiles[self._kdf]:
             raise ValueError("Invalid KDF profile")
 
@@ -130,6 +213,32 @@ class EncryptedData:
 
         return self._profile
 
+    @property
+    def subkey_salt(self) -> str | None:
+        """Salt used for subkey derivation in base64 format. Only set if the data was encrypted using a
+        session key."""
+
+        return self._subkey_salt
+
+    @property
+    def chunk_size(self) -> int | None:
+        """Plaintext size of each chunk. Only set if the data was encrypted in chunks, in which case
+        the ciphertext holds every chunk followed by its tag, and the nonce is the nonce prefix."""
+
+        return self._chunk_size
+
+    @property
+    def compression(self) -> str | None:
+        """Algorithm used to compress the plaintext before encryption. Only set if the data was compressed."""
+
+        return self._compression
+
+    @property
+    def chunked(self) -> bool:
+        """Indicates whether the data was encrypted in chunks."""
+
+        return self._chunk_size is not None
+
     @property
     def outdated(self) -> bool:
         """Indicates whether the secrets needs re-encrypting."""
@@ -139,7 +248,7 @@ class EncryptedData:
     def to_dict(self) -> dict:
         """Returns the class data as a dict file (usually for on-disk storage)."""
 
-        return {
+        data: dict = {
             "ciphertext": self._ciphertext,
             "tag": self.tag,
             "nonce": self.nonce,
@@ -149,6 +258,16 @@ class EncryptedData:
             "profile": self.profile
         }
 
+        # Only add subkey salt if needed so older versions can still read password-derived data
+        if self.subkey_salt:
+            data.update({"subkey_salt": self.subkey_salt})
+        if self.chunked:
+            data.update({"chunk_size": self.chunk_size})
+        if self.compression:
+            data.update({"compression": self.compression})
+
+        return data
+
     @classmethod
     def from_dict(cls, data: dict) -> 'EncryptedData':
         """Creates a new EncryptedData object from a dict object."""
@@ -164,15 +283,20 @@ class EncryptedData:
             salt=data["salt"],
             algorithm=data.get("algorithm", "aes-256-gcm"),
             kdf=data.get("kdf", "pbkdf2"),
-            profile=data.get("profile")
+            profile=data.get("profile"),
+            subkey_salt=data.get("subkey_salt"),
+            chunk_size=data.get("chunk_size"),
+            compression=data.get("compression")
         )
 
 class GCMEncryptedData(EncryptedData):
     """A class representing data encrypted using AES-256-GCM."""
 
     def __init__(self, ciphertext: str, tag: str, nonce: str, salt: str, kdf: str | None = None,
-                 profile: str | None = None):
-        super().__init__(ciphertext, tag, nonce, salt, "aes-256-gcm", kdf=kdf, profile=profile)
+                 profile: str | None = None, subkey_salt: str | None = None, chunk_size: int | None = None,
+                 compression: str | None = None):
+        super().__init__(ciphertext, tag, nonce, salt, "aes-256-gcm", kdf=kdf, profile=profile, subkey_salt=subkey_salt,
+                         chunk_size=chunk_size, compression=compression)
 
     @classmethod
     def from_dict(cls, data: dict) -> 'GCMEncryptedData':
@@ -189,7 +313,10 @@ class GCMEncryptedData(EncryptedData):
             nonce=data["nonce"],
             salt=data["salt"],
             kdf=data.get("kdf", "pbkdf2"),
-            profile=data.get("profile")
+            profile=data.get("profile"),
+            subkey_salt=data.get("subkey_salt"),
+            chunk_size=data.get("chunk_size"),
+            compression=data.get("compression")
         )
 
 
@@ -197,8 +324,10 @@ class XChaCha20EncryptedData(EncryptedData):
     """A class representing data encrypted using XChaCha20-Poly1305."""
 
     def __init__(self, ciphertext: str, tag: str, nonce: str, salt: str, kdf: str | None = None,
-                 profile: str | None = None):
-        super().__init__(ciphertext, tag, nonce, salt, "xchacha20-poly1305", kdf=kdf, profile=profile)
+                 profile: str | None = None, subkey_salt: str | None = None, chunk_size: int | None = None,
+                 compression: str | None = None):
+        super().__init__(ciphertext, tag, nonce, salt, "xchacha20-poly1305", kdf=kdf, profile=profile, subkey_salt=subkey_salt,
+                         chunk_size=chunk_size, compression=compression)
 
     @classmethod
     def from_dict(cls, data: dict) -> 'XChaCha20EncryptedData':
@@ -214,7 +343,10 @@ class XChaCha20EncryptedData(EncryptedData):
             nonce=data["nonce"],
             salt=data["salt"],
             kdf=data.get("kdf", "pbkdf2"),
-            profile=data.get("profile")
+            profile=data.get("profile"),
+            subkey_salt=data.get("subkey_salt"),
+            chunk_size=data.get("chunk_size"),
+            compression=data.get("compression")
         )
 
 class BaseEncryptor:
@@ -228,6 +360,44 @@ class BaseEncryptor:
         ciphertext: bytes = base64.b64decode(data.ciphertext)
         return nonce, tag, salt, ciphertext
 
+    @staticmethod
+    def get_default_profile(kdf: str) -> str | None:
+        """Returns the default profile for a KDF."""
+
+        if kdf == "argon2":
+            # For compatibility sake, we will use second-recommended Argon2 profile (unless calibrated)
+            return argon2_default
+        elif kdf == "pbkdf2":
+            return "pbkdf2_hmac_sha_256"
+
+        return None
+
+    @staticmethod
+    def encode_plaintext(plaintext_data: str | bytes, compression: str | None = None,
+                         compression_level: int | None = None) -> bytes:
+        """Encodes plaintext, compressing it if needed."""
+
+        if compression:
+            return compressor.compress(plaintext_data, compression, level=compression_level)
+
+        return plaintext_data.encode() if type(plaintext_data) is str else bytes(plaintext_data)
+
+    @staticmethod
+    def decode_plaintext(data: EncryptedData, chunks: typing.Iterable[bytes]) -> str:
+        """Decodes decrypted plaintext chunks, decompressing them if needed."""
+
+        if data.compression:
+            return compressor.decompress_chunks(chunks, data.compression).decode()
+
+        return b"".join(chunks).decode()
+
+    @staticmethod
+    def clear_key(key: bytearray):
+        """Overwrites a key with zeroes."""
+
+        for index in range(len(key)):
+            key[index] = 0
+
     @staticmethod
     def derive_password_hash(password: str, salt: bytes, kdf: str = "argon2", profile: str | None = None) -> bytearray:
         """Derives password hash using the KDF and KDF profile of choice."""
@@ -237,31 +407,29 @@ class BaseEncryptor:
 
         # Get KDF profile
         if not profile:
-            if kdf == "argon2":
-                # For compatibility sake, we will use second-recommended Argon2 profile
-                profile = "argon2_low"
-            elif kdf == "pbkdf2":
-                profile = "pbkdf2_hmac_sha_256"
+            profile = BaseEncryptor.get_default_profile(kdf)
 
         # Create password hash from selected KDF
         hashed_password: bytearray | None = None
 
         if kdf == "argon2":
-            if not profile in argon2_available:
+            if not register_argon2_profile(profile) or not profile in argon2_available:
                 raise ValueError("Argon2 profile not available")
 
             argon2_profile: argon2.Parameters = argon2_profiles[profile]
 
-            hashed_password = bytearray(argon2.low_level.hash_secret_raw(
-                secret=password.encode(),
-                salt=salt,
-                time_cost=argon2_profile.time_cost,
-                memory_cost=argon2_profile.memory_cost,
-                parallelism=argon2_profile.parallelism,
-                hash_len=argon2_profile.hash_len,
-                type=argon2_profile.type,
-                version=argon2_profile.version
-            ))
+            # Wait until there's enough memory budget for the derivation
+            with kdf_gate.admit(argon2_profile.memory_cost * 1024):
+                hashed_password = bytearray(argon2.low_level.hash_secret_raw(
+                    secret=password.encode(),
+                    salt=salt,
+                    time_cost=argon2_profile.time_cost,
+                    memory_cost=argon2_profile.memory_cost,
+                    parallelism=argon2_profile.parallelism,
+                    hash_len=argon2_profile.hash_len,
+                    type=argon2_profile.type,
+                    version=argon2_profile.version
+                ))
         elif kdf == "pbkdf2":
             if not profile in pbkdf2_profiles:
                 raise ValueError("PBKDF2 profile not available")
@@ -276,10 +444,114 @@ class BaseEncryptor:
 
         return hashed_password
 
+    @staticmethod
+    def derive_subkey(master_key: bytearray, subkey_salt: bytes) -> bytearray:
+        """Derives a subkey from a master key using HKDF-SHA256. This is cheap compared to the
+        password KDF, so it can be done on every write."""
+
+        return bytearray(HKDF(master_key, 32, subkey_salt, Hash.SHA256, context=subkey_context))
+
+    @staticmethod
+    def derive_key(data: EncryptedData, password: str, session: 'SessionKey | None' = None) -> bytearray:
+        """Derives the key needed to decrypt data. The session key is used where possible."""
+
+        salt: bytes = base64.b64decode(data.salt)
+
+        # Data encrypted without a session key uses the password hash as the key
+        if not data.subkey_salt:
+            return BaseEncryptor.derive_password_hash(password, salt, kdf=data.kdf, profile=data.profile)
+
+        subkey_salt: bytes = base64.b64decode(data.subkey_salt)
+
+        # If the data was encrypted in this session, we can skip the password KDF
+        if session and session.matches(data):
+            return session.derive_subkey(subkey_salt)
+
+        # Otherwise, we need to derive the master key for the session that encrypted the data
+        master_key: bytearray = BaseEncryptor.derive_password_hash(
+            password, salt, kdf=data.kdf, profile=data.profile
+        )
+        key: bytearray = BaseEncryptor.derive_subkey(master_key, subkey_salt)
+
+        # Clear master key
+        BaseEncryptor.clear_key(master_key)
+
+        return key
+
+class SessionKey:
+    """A master key derived once from the password. Subkeys for each write are derived from it using HKDF,
+    so the password KDF only needs to run once per process instead of once per write."""
+
+    def __init__(self, password: str, kdf: str = "argon2", profile: str | None = None, salt: bytes | None = None):
+        """If a salt is given, the master key of an earlier session is derived again instead of a new one."""
+
+        if kdf not in kdf_available:
+            raise ValueError("Invalid KDF")
+
+        self._kdf: str = kdf
+        self._profile: str = profile or BaseEncryptor.get_default_profile(kdf)
+        self._salt: bytes = salt or CryptoRandom.get_random_bytes(16)
+        self._key: bytearray | None = BaseEncryptor.derive_password_hash(
+            password, self._salt, kdf=self._kdf, profile=self._profile
+        )
+
+    @property
+    def salt(self) -> bytes:
+        """Salt used for master key derivation."""
+
+        return self._salt
+
+    @property
+    def kdf(self) -> str:
+        """KDF used for master key derivation."""
+
+        return self._kdf
+
+    @property
+    def profile(self) -> str:
+        """KDF profile used for master key derivation."""
+
+        return self._profile
+
+    @property
+    def cleared(self) -> bool:
+        """Indicates whether the master key has been cleared."""
+
+        return self._key is None
+
+    def matches(self, data: EncryptedData) -> bool:
+        """Checks if data was encrypted using a subkey of this session key."""
+
+        if self.cleared or not data.subkey_salt:
+            return False
+
+        return (
+            data.kdf == self._kdf and data.profile == self._profile and
+            base64.b64decode(data.salt) == self._salt
+        )
+
+    def derive_subkey(self, subkey_salt: bytes) -> bytearray:
+        """Derives a subkey from the master key."""
+
+        if self.cleared:
+            raise RuntimeError("Session key has been cleared")
+
+        return BaseEncryptor.derive_subkey(self._key, subkey_salt)
+
+    def clear(self):
+        """Overwrites the master key with zeroes. The session key can't be used after this."""
+
+        if self.cleared:
+            return
+
+        BaseEncryptor.clear_key(self._key)
+        self._key = None
+
 class GCMEncryptor(BaseEncryptor):
     @staticmethod
-    def encrypt(plaintext_data: str, password: str, kdf: str = "argon2", profile: str | None = None
-                ) -> GCMEncryptedData:
+    def encrypt(plaintext_data: str | bytes, password: str, kdf: str = "argon2", profile: str | None = None,
+                session: SessionKey | None = None, compression: str | None = None,
+                compression_level: int | None = None) -> GCMEncryptedData:
         """Encrypts a given string using AES-256-GCM and returns encrypted data."""
 
         if kdf and kdf not in kdf_available:
@@ -287,19 +559,24 @@ class GCMEncryptor(BaseEncryptor):
 
         # Get KDF profile
         if not profile:
-            if kdf == "argon2":
-                # For compatibility sake, we will use second-recommended Argon2 profile
-                profile = "argon2_low"
-            elif kdf == "pbkdf2":
-                profile = "pbkdf2_hmac_sha_256"
-
-        # Generate random salt and nonce
-        salt: bytes = CryptoRandom.get_random_bytes(16)
-        nonce: bytes = CryptoRandom.get_random_bytes(12)
-        encoded: bytes = plaintext_data.encode()
+            profile = BaseEncryptor.get_default_profile(kdf)
 
-        # Create password hash from selected KDF
-        key: bytearray = GCMEncryptor.derive_password_hash(password, salt, kdf=kdf, profile=profile)
+        # Generate random nonce
+        nonce: bytes = CryptoRandom.get_random_bytes(12)
+        encoded: bytes = BaseEncryptor.encode_plaintext(plaintext_data, compression, compression_level)
+        subkey_salt: bytes | None = None
+
+        if session:
+            # Derive a subkey from the session key instead of running the KDF again
+            salt: bytes = session.salt
+            subkey_salt = CryptoRandom.get_random_bytes(16)
+            kdf = session.kdf
+            profile = session.profile
+            key: bytearray = session.derive_subkey(subkey_salt)
+        else:
+            # Generate random salt and create password hash from selected KDF
+            salt: bytes = CryptoRandom.get_random_bytes(16)
+            key: bytearray = GCMEncryptor.derive_password_hash(password, salt, kdf=kdf, profile=profile)
 
         # Create encryption key
         cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
@@ -308,8 +585,7 @@ class GCMEncryptor(BaseEncryptor):
         result, tag = cipher.encrypt_and_digest(encoded)
 
         # Clear password hash
-        for index in range(len(key)):
-            key[index] = 0
+        GCMEncryptor.clear_key(key)
 
         # Return GCMEncryptedData object
         return GCMEncryptedData(
@@ -318,40 +594,38 @@ class GCMEncryptor(BaseEncryptor):
             nonce=base64.b64encode(nonce).decode('ascii'),
             salt=base64.b64encode(salt).decode('ascii'),
             kdf=kdf,
-            profile=profile
+            profile=profile,
+            subkey_salt=base64.b64encode(subkey_salt).decode('ascii') if subkey_salt else None,
+            compression=compression
         )
 
     @staticmethod
-    def decrypt(data: GCMEncryptedData | EncryptedData, password: str):
+    def decrypt(data: GCMEncryptedData | EncryptedData, password: str, session: SessionKey | None = None):
         """Decrypts data encrypted using AES-256-GCM."""
 
         # Decode base64 strings to bytes
         if data.algorithm != "aes-256-gcm":
             raise ValueError("Algorithm mismatch")
 
-        nonce, tag, salt, ciphertext = BaseEncryptor.decode_base64(data)
-
-        # Create password hash from selected KDF
-        kdf: str = data.kdf
-        profile: str = data.profile
+        nonce, tag, _, ciphertext = BaseEncryptor.decode_base64(data)
 
         # Generate key
-        key: bytearray = GCMEncryptor.derive_password_hash(password, salt, kdf=kdf, profile=profile)
+        key: bytearray = GCMEncryptor.derive_key(data, password, session=session)
         cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
 
         # Get result
         result: bytes = cipher.decrypt_and_verify(ciphertext, tag)
 
         # Clear password hash
-        for index in range(len(key)):
-            key[index] = 0
+        GCMEncryptor.clear_key(key)
 
-        return result.decode()
+        return GCMEncryptor.decode_plaintext(data, [result])
 
 class XChaCha20Encryptor(BaseEncryptor):
     @staticmethod
-    def encrypt(plaintext_data: str, password: str, kdf: str = "argon2", profile: str | None = None
-                ) -> XChaCha20EncryptedData:
+    def encrypt(plaintext_data: str | bytes, password: str, kdf: str = "argon2", profile: str | None = None,
+                session: SessionKey | None = None, compression: str | None = None,
+                compression_level: int | None = None) -> XChaCha20EncryptedData:
         """Encrypts a given string using XChaCha20-Poly1305 and returns encrypted data."""
 
         if kdf and kdf not in kdf_available:
@@ -359,19 +633,24 @@ class XChaCha20Encryptor(BaseEncryptor):
 
         # Get KDF profile
         if not profile:
-            if kdf == "argon2":
-                # For compatibility sake, we will use second-recommended Argon2 profile
-                profile = "argon2_low"
-            elif kdf == "pbkdf2":
-                profile = "pbkdf2_hmac_sha_256"
-
-        # Generate random salt and nonce
-        salt: bytes = CryptoRandom.get_random_bytes(16)
-        nonce: bytes = CryptoRandom.get_random_bytes(24)
-        encoded: bytes = plaintext_data.encode()
+            profile = BaseEncryptor.get_default_profile(kdf)
 
-        # Create password hash from selected KDF
-        key: bytearray = XChaCha20Encryptor.derive_password_hash(password, salt, kdf=kdf, profile=profile)
+        # Generate random nonce
+        nonce: bytes = CryptoRandom.get_random_bytes(24)
+        encoded: bytes = BaseEncryptor.encode_plaintext(plaintext_data, compression, compression_level)
+        subkey_salt: bytes | None = None
+
+        if session:
+            # Derive a subkey from the session key instead of running the KDF again
+            salt: bytes = session.salt
+            subkey_salt = CryptoRandom.get_random_bytes(16)
+            kdf = session.kdf
+            profile = session.profile
+            key: bytearray = session.derive_subkey(subkey_salt)
+        else:
+            # Generate random salt and create password hash from selected KDF
+            salt: bytes = CryptoRandom.get_random_bytes(16)
+            key: bytearray = XChaCha20Encryptor.derive_password_hash(password, salt, kdf=kdf, profile=profile)
 
         # Create encryption key
         cipher = ChaCha20_Poly1305.new(key=key, nonce=nonce)
@@ -380,8 +659,7 @@ class XChaCha20Encryptor(BaseEncryptor):
         result, tag = cipher.encrypt_and_digest(encoded)
 
         # Clear password hash
-        for index in range(len(key)):
-            key[index] = 0
+        XChaCha20Encryptor.clear_key(key)
 
         # Return XChaCha20EncryptedData object
         return XChaCha20EncryptedData(
@@ -390,128 +668,327 @@ class XChaCha20Encryptor(BaseEncryptor):
             nonce=base64.b64encode(nonce).decode('ascii'),
             salt=base64.b64encode(salt).decode('ascii'),
             kdf=kdf,
-            profile=profile
+            profile=profile,
+            subkey_salt=base64.b64encode(subkey_salt).decode('ascii') if subkey_salt else None,
+            compression=compression
         )
 
     @staticmethod
-    def decrypt(data: XChaCha20EncryptedData | EncryptedData, password: str):
+    def decrypt(data: XChaCha20EncryptedData | EncryptedData, password: str, session: SessionKey | None = None):
         """Decrypts data encrypted using XChaCha20-Poly1305."""
 
         if data.algorithm != "xchacha20-poly1305":
             raise ValueError("Algorithm mismatch")
 
         # Decode base64 strings to bytes
-        nonce, tag, salt, ciphertext = BaseEncryptor.decode_base64(data)
-
-        # Create password hash from selected KDF
-        kdf: str = data.kdf
-        profile: str = data.profile
+        nonce, tag, _, ciphertext = BaseEncryptor.decode_base64(data)
 
         # Generate key
-        key: bytearray = XChaCha20Encryptor.derive_password_hash(password, salt, kdf=kdf, profile=profile)
+        key: bytearray = XChaCha20Encryptor.derive_key(data, password, session=session)
         cipher = ChaCha20_Poly1305.new(key=key, nonce=nonce)
 
         # Get result
         result: bytes = cipher.decrypt_and_verify(ciphertext, tag)
 
         # Clear password hash
-        for index in range(len(key)):
-            key[index] = 0
+        XChaCha20Encryptor.clear_key(key)
+
+        return XChaCha20Encryptor.decode_plaintext(data, [result])
+
+class StreamEncryptor(BaseEncryptor):
+    """An encryptor that encrypts data in fixed-size chunks using the STREAM construction.
+
+    Each chunk is encrypted with its own nonce (nonce prefix, chunk counter and a flag marking the last chunk)
+    and carries its own tag, so chunks can be encrypted and written one at a time. Reordered, dropped or
+    truncated chunks fail authentication."""
+
+    @staticmethod
+    def _new_cipher(algorithm: str, key: bytearray, nonce: bytes):
+        if algorithm == "xchacha20-poly1305":
+            return ChaCha20_Poly1305.new(key=key, nonce=nonce)
+        else:
+            return AES.new(key, AES.MODE_GCM, nonce=nonce)
+
+    @staticmethod
+    def get_nonce_prefix_size(algorithm: str) -> int:
+        """Returns the nonce prefix size for an algorithm. 5 bytes of the nonce are used for the chunk counter
+        and last chunk flag."""
+
+        return (24 if algorithm == "xchacha20-poly1305" else 12) - 5
+
+    @staticmethod
+    def get_chunk_nonce(nonce_prefix: bytes, counter: int, last: bool) -> bytes:
+        """Returns the nonce for a chunk."""
+
+        return nonce_prefix + counter.to_bytes(4, "big") + (b"\x01" if last else b"\x00")
+
+    @staticmethod
+    def iter_plaintext(plaintext_data: str | bytes | typing.Iterable[bytes], chunk_size: int):
+        """Splits plaintext into chunks without encoding or copying the whole plaintext at once. Plaintext
+        can also be an iterable of bytes, which is consumed one piece at a time."""
+
+        if type(plaintext_data) in (bytes, bytearray, memoryview):
+            view: memoryview = memoryview(plaintext_data)
+
+            for index in range(0, len(view), chunk_size):
+                yield view[index:index + chunk_size]
+
+            return
+
+        if type(plaintext_data) is str:
+            pieces: typing.Iterable[bytes] = (
+                plaintext_data[index:index + chunk_size].encode()
+                for index in range(0, len(plaintext_data), chunk_size)
+            )
+        else:
+            pieces: typing.Iterable[bytes] = plaintext_data
+
+        buffer: bytearray = bytearray()
+
+        for piece in pieces:
+            buffer += piece
+
+            while len(buffer) >= chunk_size:
+                yield bytes(buffer[:chunk_size])
+                del buffer[:chunk_size]
+
+        if len(buffer) > 0:
+            yield bytes(buffer)
+
+    @staticmethod
+    def _encrypt_chunks(plaintext_data: str | bytes | typing.Iterable[bytes], key: bytearray, nonce_prefix: bytes, algorithm: str,
+                        chunk_size: int):
+        counter: int = 0
+        previous: bytes | memoryview | None = None
+
+        try:
+            # We need to know which chunk is last, so we'll always encrypt the previous chunk
+            for chunk in StreamEncryptor.iter_plaintext(plaintext_data, chunk_size):
+                if previous is not None:
+                    cipher = StreamEncryptor._new_cipher(
+                        algorithm, key, StreamEncryptor.get_chunk_nonce(nonce_prefix, counter, False)
+                    )
+                    result, tag = cipher.encrypt_and_digest(previous)
+                    yield result + tag
+                    counter += 1
+
+                previous = chunk
+
+            # Encrypt last chunk (this can be empty if there's no plaintext)
+            cipher = StreamEncryptor._new_cipher(
+                algorithm, key, StreamEncryptor.get_chunk_nonce(nonce_prefix, counter, True)
+            )
+            result, tag = cipher.encrypt_and_digest(previous if previous is not None else b"")
+            yield result + tag
+        finally:
+            # Clear key
+            StreamEncryptor.clear_key(key)
+
+    @staticmethod
+    def encrypt(plaintext_data: str | bytes | typing.Iterable[bytes], password: str,
+                algorithm: str = "xchacha20-poly1305", kdf: str = "argon2", profile: str | None = None,
+                session: SessionKey | None = None, chunk_size: int = stream_chunk_size,
+                compression: str | None = None,
+                compression_level: int | None = None) -> tuple[EncryptedData, typing.Iterator[bytes]]:
+        """Encrypts a given string, bytes or iterable of bytes in chunks. Returns encrypted data without the
+        ciphertext, and an iterator yielding each encrypted chunk followed by its tag. Iterables are only
+        consumed as chunks are encrypted, so plaintext can be generated on the fly.
+
+        If a compression algorithm is given, the plaintext is compressed before it's encrypted."""
 
-        return result.decode()
+        if algorithm not in algo_available:
+            raise ValueError(f"Invalid algorithm {algorithm}")
+
+        if kdf and kdf not in kdf_available:
+            raise ValueError("Invalid KDF")
+
+        # Get KDF profile
+        if not profile:
+            profile = StreamEncryptor.get_default_profile(kdf)
+
+        # Compress plaintext (compressed data is much smaller, so it's fine to hold it at once unless it's
+        # being generated on the fly)
+        if compression and type(plaintext_data) in (str, bytes, bytearray, memoryview):
+            plaintext_data = compressor.compress(plaintext_data, compression, level=compression_level)
+        elif compression:
+            plaintext_data = compressor.iter_compress(plaintext_data, compression, level=compression_level)
+
+        # Generate random nonce prefix
+        nonce_prefix: bytes = CryptoRandom.get_random_bytes(StreamEncryptor.get_nonce_prefix_size(algorithm))
+        subkey_salt: bytes | None = None
+
+        if session:
+            # Derive a subkey from the session key instead of running the KDF again
+            salt: bytes = session.salt
+            subkey_salt = CryptoRandom.get_random_bytes(16)
+            kdf = session.kdf
+            profile = session.profile
+            key: bytearray = session.derive_subkey(subkey_salt)
+        else:
+            # Generate random salt and create password hash from selected KDF
+            salt: bytes = CryptoRandom.get_random_bytes(16)
+            key: bytearray = StreamEncryptor.derive_password_hash(password, salt, kdf=kdf, profile=profile)
+
+        header: EncryptedData = EncryptedData(
+            ciphertext="",
+            tag="",
+            nonce=base64.b64encode(nonce_prefix).decode('ascii'),
+            salt=base64.b64encode(salt).decode('ascii'),
+            algorithm=algorithm,
+            kdf=kdf,
+            profile=profile,
+            subkey_salt=base64.b64encode(subkey_salt).decode('ascii') if subkey_salt else None,
+            chunk_size=chunk_size,
+            compression=compression
+        )
+
+        return header, StreamEncryptor._encrypt_chunks(plaintext_data, key, nonce_prefix, algorithm, chunk_size)
+
+    @staticmethod
+    def decrypt_chunks(data: EncryptedData, ciphertext: bytes | memoryview, password: str,
+                       session: SessionKey | None = None):
+        """Decrypts chunked ciphertext and yields each plaintext chunk. The ciphertext can be any buffer
+        (including memory-mapped files)."""
+
+        if not data.chunked:
+            raise ValueError("Data is not chunked")
+
+        nonce_prefix: bytes = base64.b64decode(data.nonce)
+        view: memoryview = memoryview(ciphertext)
+        encrypted_chunk_size: int = data.chunk_size + 16
+
+        if len(view) < 16:
+            raise ValueError("Ciphertext is truncated")
+
+        key: bytearray = StreamEncryptor.derive_key(data, password, session=session)
+
+        try:
+            counter: int = 0
+            for index in range(0, len(view), encrypted_chunk_size):
+                chunk: memoryview = view[index:index + encrypted_chunk_size]
+                last: bool = index + encrypted_chunk_size >= len(view)
+
+                if len(chunk) < 16:
+                    raise ValueError("Ciphertext is truncated")
+
+                cipher = StreamEncryptor._new_cipher(
+                    data.algorithm, key, StreamEncryptor.get_chunk_nonce(nonce_prefix, counter, last)
+                )
+                yield cipher.decrypt_and_verify(chunk[:-16], chunk[-16:])
+                counter += 1
+        finally:
+            # Clear key
+            StreamEncryptor.clear_key(key)
+
+    @staticmethod
+    def iter_decrypt(data: EncryptedData, ciphertext: bytes | memoryview, password: str,
+                     session: SessionKey | None = None) -> typing.Iterator[bytes]:
+        """Decrypts chunked ciphertext and yields plaintext pieces, decompressing them if needed. Each chunk
+        is authenticated before it's yielded, but truncation is only detected once the last chunk is reached."""
+
+        chunks: typing.Iterator[bytes] = StreamEncryptor.decrypt_chunks(data, ciphertext, password, session=session)
+
+        if data.compression:
+            yield from compressor.iter_decompress(chunks, data.compression)
+        else:
+            yield from chunks
+
+    @staticmethod
+    def decrypt(data: EncryptedData, password: str, session: SessionKey | None = None) -> str:
+        """Decrypts data encrypted in chunks."""
+
+        ciphertext: bytes = base64.b64decode(data.ciphertext)
+        return StreamEncryptor.decode_plaintext(
+            data, StreamEncryptor.decrypt_chunks(data, ciphertext, password, session=session)
+        )
 
 class AutoEncryptor:
     """An encryptor that encrypts and decrypts data using multiple algorithms."""
 
     @staticmethod
-    def encrypt(plaintext_data: str, password: str, algorithm: str = "xchacha20-poly1305", kdf: str = "argon2",
-                profile: str | None = None) -> EncryptedData:
+    def encrypt(plaintext_data: str | bytes, password: str, algorithm: str = "xchacha20-poly1305",
+                kdf: str = "argon2", profile: str | None = None, session: SessionKey | None = None,
+                compression: str | None = None, compression_level: int | None = None) -> EncryptedData:
         """Encrypts a given string using the algorithm of choice and returns encrypted data.
 
         XChaCha20-Poly1305 (xchacha20-poly1305) algorithm with Argon2 KDF (argon2) using
-        argon2_low profile (argon2_high for cold storage if available) is recommended."""
+        argon2_low profile (argon2_high for cold storage if available) is recommended.
+
+        If a session key is given, the key is derived from the session key instead of the password.
+        If a compression algorithm is given, the plaintext is compressed before it's encrypted."""
 
         if algorithm not in algo_available:
             raise ValueError(f"Invalid algorithm {algorithm}")
 
         if algorithm == "xchacha20-poly1305":
-            return XChaCha20Encryptor.encrypt(plaintext_data, password, kdf=kdf, profile=profile)
+            return XChaCha20Encryptor.encrypt(
+                plaintext_data, password, kdf=kdf, profile=profile, session=session, compression=compression,
+                compression_level=compression_level
+            )
         else:
             # Fallback to AES-256-GCM (although this should've been handled)
-            return GCMEncryptor.encrypt(plaintext_data, password, kdf=kdf, profile=profile)
+            return GCMEncryptor.encrypt(
+                plaintext_data, password, kdf=kdf, profile=profile, session=session, compression=compression,
+                compression_level=compression_level
+            )
 
     @staticmethod
-    def decrypt(data: EncryptedData, password: str) -> str:
+    def encrypt_stream(plaintext_data: str | bytes | typing.Iterable[bytes], password: str,
+                       algorithm: str = "xchacha20-poly1305", kdf: str = "argon2", profile: str | None = None,
+                       session: SessionKey | None = None, chunk_size: int = stream_chunk_size,
+                       compression: str | None = None,
+                       compression_level: int | None = None) -> tuple[EncryptedData, typing.Iterator[bytes]]:
+        """Encrypts a given string, bytes or iterable of bytes in chunks. See StreamEncryptor.encrypt."""
+
+        return StreamEncryptor.encrypt(
+            plaintext_data, password, algorithm=algorithm, kdf=kdf, profile=profile, session=session,
+            chunk_size=chunk_size, compression=compression, compression_level=compression_level
+        )
+
+    @staticmethod
+    def decrypt(data: EncryptedData, password: str, session: SessionKey | None = None) -> str:
         """Decrypts encrypted data."""
 
         if data.algorithm not in algo_available:
             raise ValueError(f"Invalid algorithm {data.algorithm}")
 
-        if data.algorithm == "xchacha20-poly1305":
-            return XChaCha20Encryptor.decrypt(data, password)
+        if data.chunked:
+            return StreamEncryptor.decrypt(data, password, session=session)
+        elif data.algorithm == "xchacha20-poly1305":
+            return XChaCha20Encryptor.decrypt(data, password, session=session)
         else:
             # Fallback to AES-256-GCM (although this should've been handled)
-            return GCMEncryptor.decrypt(data, password)
-
-# Debug mode (generate a testing-only encryptor)
-if __name__ == "__main__":
-    random_plaintext_length = 100
-    encryptor = AutoEncryptor()
-
-    # Set encryption configs here
-    algo = "xchacha20-poly1305"
-    kdf_used = "argon2"
-    kdf_profile = "argon2_low"
-
-    algo_mapping = {
-        "aes-256-gcm": "GCM",
-        "xchacha20-poly1305": "XChaCha20"
-    }
-    kdf_mapping = {
-        "argon2": "Argon2",
-        "pbkdf2": "PBKDF2"
-    }
-
-    # Print available KDF and Profiles
-    print("Available KDFs:")
-    for kdf_entry in kdf_available:
-        print(f"- {kdf_entry} ({', '.join(kdf_profiles[kdf_entry])})")
-    print("")
-
-    # Generate plaintext
-    plaintext = ''.join([random.choice(string.ascii_letters + string.digits) for _ in range(random_plaintext_length)])
-    print(f"Testing {algo_mapping[algo]}Encryptor encryption (KDF {kdf_mapping[kdf_used]}, {kdf_profile}) with {len(plaintext)}-char plaintext with password 'password'...")
-    print("")
-
-    # Test encryption
-    stime = time.time()
-    encrypted_data: EncryptedData = encryptor.encrypt(
-        plaintext, "password", algorithm=algo, kdf=kdf_used, profile=kdf_profile
-    )
-    etime = time.time() - stime
-
-    # Test decryption
-    stime = time.time()
-    decrypted_data: str = encryptor.decrypt(encrypted_data, "password")
-    dtime = time.time() - stime
-
-    # Print encrypted data
-    print("Encrypted data info:")
-    print(f"- ciphertext: {encrypted_data.ciphertext if len(plaintext) <= 1000 else '[omitted]'}")
-    print(f"- tag: {encrypted_data.tag}")
-    print(f"- nonce: {encrypted_data.nonce}")
-    print(f"- salt: {encrypted_data.salt}")
-    print(f"- algorithm: {encrypted_data.algorithm}")
-    print(f"- kdf: {encrypted_data.kdf}")
-    print(f"- kdf profile: {encrypted_data.profile}")
-    print(f"- duration: {round(etime * 1000, 2)}ms")
-    print("")
-
-    # Print decrypted data
-    print("Decrypted data info:")
-    print(f"- plaintext: {decrypted_data if len(plaintext) <= 1000 else '[omitted]'}")
-    print(f"- duration: {round(dtime * 1000, 2)}ms")
-    print("")
-
-    # Test success!
-    print("Encryptor works!")
+            return GCMEncryptor.decrypt(data, password, session=session)
+
+    @staticmethod
+    def decrypt_buffer(data: EncryptedData, ciphertext: bytes | memoryview, password: str,
+                       session: SessionKey | None = None) -> str:
+        """Decrypts raw ciphertext stored outside the encrypted data (e.g. in a binary container)."""
+
+        if data.algorithm not in algo_available:
+            raise ValueError(f"Invalid algorithm {data.algorithm}")
+
+        if data.chunked:
+            return StreamEncryptor.decode_plaintext(
+                data, StreamEncryptor.decrypt_chunks(data, ciphertext, password, session=session)
+            )
+
+        # Single-shot ciphertext needs to be wrapped in encrypted data
+        encrypted_data: EncryptedData = EncryptedData.from_dict(
+            data.to_dict() | {"ciphertext": base64.b64encode(ciphertext).decode('ascii')}
+        )
+        return AutoEncryptor.decrypt(encrypted_data, password, session=session)
+
+    @staticmethod
+    def iter_decrypt_buffer(data: EncryptedData, ciphertext: bytes | memoryview, password: str,
+                            session: SessionKey | None = None) -> typing.Iterator[bytes]:
+        """Decrypts raw ciphertext stored outside the encrypted data and yields plaintext pieces. Only chunked
+        ciphertext is decrypted one chunk at a time."""
+
+        if data.algorithm not in algo_available:
+            raise ValueError(f"Invalid algorithm {data.algorithm}")
+
+        if data.chunked:
+            yield from StreamEncryptor.iter_decrypt(data, ciphertext, password, session=session)
+        else:
+            yield AutoEncryptor.decrypt_buffer(data, ciphertext, password, session=session).encode()
@@ -16,7 +16,10 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import typing
+from concurrent.futures import Future
 from shinobu.runtime.secrets.encryptor import EncryptedData
+from shinobu.runtime.secrets.archive import ArchiveDocument
 
 # Note: This class is only to be used for typing in development. It does absolutely nothing
 # except providing the structure of the secrets wrapper.
@@ -53,8 +56,64 @@ class FineGrainedSecureFiles(FineGrainedWrapper):
         """Saves a string to a secure file."""
         return
 
-    def save_json(self, filename: str, data: dict):
-        """Saves a dict object to a secure file."""
+    def save_json(self, filename: str, data: dict) -> int:
+        """Saves a dict object to a secure file. Returns the size of the serialized object in bytes."""
+        return 0
+
+    async def save_async(self, filename: str, data: str):
+        """Saves a string to a secure file without blocking the event loop."""
+        return
+
+    async def save_json_async(self, filename: str, data: dict) -> int:
+        """Saves a dict object to a secure file without blocking the event loop. Returns the size of the
+        serialized object in bytes."""
+        return 0
+
+    def list_segments(self, filename: str) -> list[str]:
+        """Lists the segments stored for a secure file."""
+        return []
+
+    def read_segment_json(self, filename: str, segment: str) -> dict:
+        """Reads a dict object from a secure file segment."""
+        return {}
+
+    def save_segment_json(self, filename: str, segment: str, data: dict):
+        """Saves a dict object to a secure file segment."""
+        return
+
+    async def save_segment_json_async(self, filename: str, segment: str, data: dict):
+        """Saves a dict object to a secure file segment without blocking the event loop."""
+        return
+
+    def remove_segment(self, filename: str, segment: str):
+        """Removes a secure file segment."""
+        return
+
+    async def remove_segment_async(self, filename: str, segment: str):
+        """Removes a secure file segment without blocking the event loop."""
+        return
+
+    def read_journal_json(self, filename: str) -> list[dict]:
+        """Reads all records from a secure file's journal."""
+        return []
+
+    async def append_json_async(self, filename: str, data: dict) -> int:
+        """Appends a dict object to a secure file's journal without blocking the event loop. Returns the size
+        of the serialized object in bytes."""
+        return 0
+
+    def compact_json(self, filename: str, data: dict) -> int:
+        """Saves a dict object to a secure file, then discards the file's journal. Returns the size of the
+        serialized object in bytes."""
+        return 0
+
+    async def compact_json_async(self, filename: str, data: dict) -> int:
+        """Saves a dict object to a secure file, then discards the file's journal without blocking the
+        event loop. Returns the size of the serialized object in bytes."""
+        return 0
+
+    async def flush(self):
+        """Waits for all pending asynchronous saves to complete."""
         return
 
     def export(self, filename: str, data: str, use_strong_kdf: bool = True) -> EncryptedData | None:
@@ -64,3 +123,87 @@ class FineGrainedSecureFiles(FineGrainedWrapper):
     def export_json(self, filename: str, data: dict, use_strong_kdf: bool = True) -> EncryptedData | None:
         """Exports secure file data as an EncryptedData object."""
         return None
+
+    def backup_json(self, filename: str, data: dict, use_strong_kdf: bool = True) -> dict:
+        """Takes an incremental backup of a dict object. Returns the backup's manifest."""
+        return {}
+
+    async def backup_json_async(self, filename: str, data: dict, use_strong_kdf: bool = True) -> dict:
+        """Takes an incremental backup of a dict object without blocking the event loop. Returns the
+        backup's manifest."""
+        return {}
+
+    def list_backups(self, filename: str) -> list[dict]:
+        """Lists the manifests of a secure file's backups, oldest first."""
+        return []
+
+    def restore_backup_json(self, filename: str, seq: int | None = None) -> dict:
+        """Restores a dict object from a backup. The latest backup is used if no sequence number is given."""
+        return {}
+
+    def write_archive(self, name: str, documents: typing.Iterable[ArchiveDocument], progress=None,
+                      use_strong_kdf: bool = True) -> dict:
+        """Streams documents into a full backup archive. Returns the archive's summary."""
+        return {}
+
+    def verify_archive(self, name: str, progress=None) -> dict:
+        """Decrypts and validates a whole archive. Returns the archive's summary."""
+        return {}
+
+    def iter_archive(self, name: str, progress=None) -> typing.Iterator[tuple[ArchiveDocument, dict | list]]:
+        """Yields each document of an archive with its contents. Archives should be verified first."""
+        return iter([])
+
+    def list_archives(self) -> list[str]:
+        """Lists archives, newest first."""
+        return []
+
+    def store_put_json(self, filename: str, key: str, data: dict, aliases: typing.Iterable[str] = ()):
+        """Stores a dict object in a secure file's encrypted store. Aliases can be used to find it later."""
+        return
+
+    def store_get_json(self, filename: str, key: str) -> dict | None:
+        """Reads a dict object from a secure file's encrypted store."""
+        return None
+
+    def store_find_json(self, filename: str, alias: str) -> dict | None:
+        """Reads a dict object from a secure file's encrypted store by one of its aliases."""
+        return None
+
+    def store_remove(self, filename: str, key: str):
+        """Removes a dict object and its aliases from a secure file's encrypted store."""
+        return
+
+    def store_prune(self, filename: str, max_age: float) -> int:
+        """Removes dict objects that were stored more than max_age seconds ago from a secure file's encrypted
+        store. Returns how many were removed."""
+        return 0
+
+    def store_open(self, filename: str):
+        """Opens a secure file's encrypted store, so the first read or write doesn't have to. This can take a
+        while, as the store's key needs to be derived."""
+        return
+
+    def queue_store_put_json(self, filename: str, key: str, data: dict,
+                             aliases: typing.Iterable[str] = ()) -> Future | None:
+        """Queues a dict object to be stored in a secure file's encrypted store. Store operations run in order
+        on a dedicated thread. Returns a future that completes once the object is stored."""
+        return None
+
+    def queue_store_remove(self, filename: str, key: str) -> Future | None:
+        """Queues a dict object and its aliases to be removed from a secure file's encrypted store."""
+        return None
+
+    def queue_store_prune(self, filename: str, max_age: float) -> Future | None:
+        """Queues old dict objects to be removed from a secure file's encrypted store (see store_prune)."""
+        return None
+
+    async def store_get_json_async(self, filename: str, key: str) -> dict | None:
+        """Reads a dict object from a secure file's encrypted store without blocking the event loop. Reads
+        are queued behind pending store operations."""
+        return None
+
+    async def store_find_json_async(self, filename: str, alias: str) -> dict | None:
+        """Reads a dict object from a secure file's encrypted store by one of its aliases without blocking the
+        event loop. Reads are queued behind pending store operations."""
+        return None
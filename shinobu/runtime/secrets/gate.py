@@ -0,0 +1,138 @@
+"""
+Shinobu - Converse from anywhere, anytime.
+Copyright (C) 2026-present  Green (@greeeen-dev)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import threading
+import contextlib
+import collections
+
+class MemoryGate:
+    """Limits the combined memory of concurrent operations. Operations that would exceed the budget wait
+    in a first-come, first-served queue, so large operations aren't starved by smaller ones.
+
+    An operation larger than the whole budget is admitted once nothing else is running."""
+
+    def __init__(self, budget: int | None = None):
+        self._budget: int | None = budget
+        self._condition: threading.Condition = threading.Condition()
+        self._queue: collections.deque = collections.deque()
+        self._in_use: int = 0
+        self._running: int = 0
+
+        # Metrics
+        self._admitted: int = 0
+        self._waited: int = 0
+        self._wait_time: float = 0
+        self._max_wait_time: float = 0
+        self._max_queued: int = 0
+        self._max_in_use: int = 0
+
+    @property
+    def budget(self) -> int | None:
+        """Memory budget in bytes. None means there's no limit."""
+        return self._budget
+
+    @budget.setter
+    def budget(self, value: int | None):
+        with self._condition:
+            self._budget = value or None
+            self._condition.notify_all()
+
+    @property
+    def in_use(self) -> int:
+        """Memory used by running operations in bytes."""
+        return self._in_use
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        """Number of operations waiting to be admitted."""
+        return len(self._queue)
+
+    def _fits(self, memory: int) -> bool:
+        return self._budget is None or self._running == 0 or self._in_use + memory <= self._budget
+
+    def acquire(self, memory: int):
+        """Waits until an operation using the given memory (in bytes) can run."""
+
+        ticket: object = object()
+        start: float = time.perf_counter()
+
+        with self._condition:
+            if len(self._queue) > 0 or not self._fits(memory):
+                # Wait for our turn
+                self._queue.append(ticket)
+                self._max_queued = max(self._max_queued, len(self._queue))
+
+                try:
+                    self._condition.wait_for(lambda: self._queue[0] is ticket and self._fits(memory))
+                finally:
+                    self._queue.remove(ticket)
+
+                    # The next operation in the queue may fit now
+                    self._condition.notify_all()
+
+                waited: float = time.perf_counter() - start
+                self._waited += 1
+                self._wait_time += waited
+                self._max_wait_time = max(self._max_wait_time, waited)
+
+            self._in_use += memory
+            self._running += 1
+            self._admitted += 1
+            self._max_in_use = max(self._max_in_use, self._in_use)
+
+    def release(self, memory: int):
+        """Marks an operation as finished."""
+
+        with self._condition:
+            self._in_use -= memory
+            self._running -= 1
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def admit(self, memory: int):
+        """Runs an operation within the gate."""
+
+        self.acquire(memory)
+
+        try:
+            yield
+        finally:
+            self.release(memory)
+
+    def stats(self) -> dict:
+        """Returns gate metrics. Wait times are in milliseconds."""
+
+        with self._condition:
+            return {
+                "budget": self._budget,
+                "in_use": self._in_use,
+                "running": self._running,
+                "queued": len(self._queue),
+                "admitted": self._admitted,
+                "waited": self._waited,
+                "wait_time_total": self._wait_time * 1000,
+                "wait_time_mean": self._wait_time * 1000 / self._waited if self._waited else 0,
+                "wait_time_max": self._max_wait_time * 1000,
+                "max_queued": self._max_queued,
+                "max_in_use": self._max_in_use
+            }
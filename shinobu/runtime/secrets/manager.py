@@ -16,25 +16,234 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import base64
 import ujson as json
 import traceback
+import threading
+import time
 import string
 import copy
+import typing
 from Crypto.Random import random
-from shinobu.runtime.secrets import encryptor
+from shinobu.runtime.secrets import encryptor, storage, reencryptor, compressor
 
 class RawEncryptor:
     """A raw encryptor, usually used for file encryption."""
 
-    def __init__(self, password):
+    def __init__(self, password, session_key: bool = False, compression: str | None = None,
+                 compression_level: int | None = None):
         self.__password = password
         self.__encryptor: encryptor.AutoEncryptor = encryptor.AutoEncryptor()
+        self.__session: encryptor.SessionKey | None = None
+
+        # Compress files and exports before encrypting them (journal records are too small to benefit)
+        if compression and compression not in compressor.compression_available:
+            raise ValueError(f"Invalid compression algorithm {compression}")
+
+        self.__compression: str | None = compression
+        self.__compression_level: int | None = compression_level
+
+        # Session keys of backup chains and earlier sessions (by salt, KDF and profile), so the KDF only runs
+        # once per chain or session rather than once per file or record
+        self.__sessions: dict[tuple[bytes, str, str], encryptor.SessionKey] = {}
+        self.__sessions_lock: threading.Lock = threading.Lock()
+
+        # Derive session key (this is the only time the KDF needs to run for writes)
+        if session_key:
+            self.__session = encryptor.SessionKey(password)
+
+    @property
+    def uses_session_key(self) -> bool:
+        return self.__session is not None and not self.__session.cleared
+
+    def _get_session(self, kdf_profile: str | None = None) -> encryptor.SessionKey | None:
+        """Returns the session key if it can be used for the given KDF profile."""
+
+        if not self.uses_session_key:
+            return None
+
+        # Exports may request a stronger profile, so we shouldn't use the session key for those
+        if kdf_profile and kdf_profile != self.__session.profile:
+            return None
+
+        return self.__session
+
+    def __getstate__(self) -> dict:
+        # Encryptors are sent to re-encryption worker processes, but locks can't be pickled and cached
+        # session keys shouldn't leave this process
+        state: dict = self.__dict__.copy()
+        state.pop("_RawEncryptor__sessions_lock")
+        state.update({"_RawEncryptor__sessions": {}})
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.__sessions_lock = threading.Lock()
+
+    def _get_cached_session(self, salt: bytes | None, kdf: str, kdf_profile: str) -> encryptor.SessionKey:
+        """Returns the session key for a salt, deriving its master key if it isn't cached. If no salt is given,
+        a new session key is created."""
+
+        with self.__sessions_lock:
+            session: encryptor.SessionKey | None = self.__sessions.get((salt, kdf, kdf_profile)) if salt else None
+
+            if not session or session.cleared:
+                session = encryptor.SessionKey(self.__password, kdf=kdf, profile=kdf_profile, salt=salt)
+                self.__sessions.update({(session.salt, kdf, kdf_profile): session})
+
+            return session
+
+    def get_backup_session(self, salt: bytes | None = None, kdf_profile: str | None = None) -> encryptor.SessionKey:
+        """Returns the session key for a backup chain. If no salt is given, a new chain is started.
+        Master keys are kept until the encryptor is cleared, so frequent backups only need HKDF."""
+
+        kdf_profile = kdf_profile or encryptor.BaseEncryptor.get_default_profile("argon2")
+        return self._get_cached_session(salt, "argon2", kdf_profile)
+
+    def _get_read_session(self, data: encryptor.EncryptedData,
+                          session: encryptor.SessionKey | None = None) -> encryptor.SessionKey | None:
+        """Returns the session key that encrypted data. Data written by earlier sessions shares their salt,
+        so their master keys are derived once and cached instead of once per file or record."""
+
+        for candidate in (session, self._get_session()):
+            if candidate and candidate.matches(data):
+                return candidate
+
+        # Data encrypted without a session key uses the password hash as the key
+        if not data.subkey_salt:
+            return session or self._get_session()
+
+        return self._get_cached_session(base64.b64decode(data.salt), data.kdf, data.profile)
+
+    @property
+    def compression(self) -> str | None:
+        return self.__compression
+
+    @property
+    def compression_level(self) -> int | None:
+        return self.__compression_level
 
     def encrypt(self, data, kdf_profile: str | None = None) -> encryptor.EncryptedData:
-        return self.__encryptor.encrypt(data, self.__password, profile=kdf_profile)
+        return self.__encryptor.encrypt(
+            data, self.__password, profile=kdf_profile, session=self._get_session(kdf_profile),
+            compression=self.__compression, compression_level=self.__compression_level
+        )
 
     def decrypt(self, encrypted_data: encryptor.EncryptedData) -> str:
-        return self.__encryptor.decrypt(encrypted_data, self.__password)
+        return self.__encryptor.decrypt(
+            encrypted_data, self.__password, session=self._get_read_session(encrypted_data)
+        )
+
+    def encrypt_to_file(self, data: str | bytes | typing.Iterable[bytes], path: str, kdf_profile: str | None = None,
+                        container: str = "json", session: encryptor.SessionKey | None = None):
+        """Encrypts data in chunks and atomically writes it to a file. Data can be an iterable of bytes, which
+        is consumed as it's written. If a session key is given, it's used instead of this encryptor's session
+        key."""
+
+        if container not in storage.container_extensions:
+            raise ValueError(f"Invalid container {container}")
+
+        header, chunks = self.__encryptor.encrypt_stream(
+            data, self.__password, profile=kdf_profile, session=session or self._get_session(kdf_profile),
+            compression=self.__compression, compression_level=self.__compression_level
+        )
+
+        if container == "binary":
+            with storage.atomic_open(path, "wb") as file:
+                storage.write_binary_stream(file, header, chunks)
+        else:
+            with storage.atomic_open(path) as file:
+                storage.write_json_stream(file, header, chunks)
+
+    def decrypt_file(self, path: str, session: encryptor.SessionKey | None = None) -> str:
+        """Reads and decrypts a file. Binary containers are memory-mapped rather than read into memory."""
+
+        if storage.is_binary(path):
+            with storage.open_binary(path) as (header, ciphertext):
+                return self.__encryptor.decrypt_buffer(
+                    header, ciphertext, self.__password, session=self._get_read_session(header, session)
+                )
+
+        encrypted_data: encryptor.EncryptedData = storage.read_json(path)
+        return self.__encryptor.decrypt(
+            encrypted_data, self.__password, session=self._get_read_session(encrypted_data, session)
+        )
+
+    def iter_decrypt_file(self, path: str, session: encryptor.SessionKey | None = None) -> typing.Iterator[bytes]:
+        """Reads and decrypts a binary container, yielding plaintext pieces one chunk at a time. The file stays
+        memory-mapped until the iterator is exhausted or closed."""
+
+        with storage.open_binary(path) as (header, ciphertext):
+            yield from self.__encryptor.iter_decrypt_buffer(
+                header, ciphertext, self.__password, session=self._get_read_session(header, session)
+            )
+
+    def encrypt_to_bytes(self, data: str | bytes, session: encryptor.SessionKey | None = None) -> bytes:
+        """Encrypts data into a binary container held in memory (e.g. for storing in a database)."""
+
+        header, chunks = self.__encryptor.encrypt_stream(
+            data, self.__password, session=session or self._get_session(), compression=self.__compression,
+            compression_level=self.__compression_level
+        )
+        ciphertext: bytes = b"".join(chunks)
+
+        return storage.pack_binary_header(header, len(ciphertext)) + ciphertext
+
+    def decrypt_bytes(self, data: bytes, session: encryptor.SessionKey | None = None) -> str:
+        """Decrypts a binary container held in memory."""
+
+        header, length = storage.unpack_binary_header(data)
+
+        if len(data) < storage.binary_header.size + length:
+            raise ValueError("Ciphertext is truncated")
+
+        return self.__encryptor.decrypt_buffer(
+            header, memoryview(data)[storage.binary_header.size:storage.binary_header.size + length],
+            self.__password, session=self._get_read_session(header, session)
+        )
+
+    def append_to_file(self, data: str | bytes, path: str):
+        """Encrypts data and appends it to a journal as a new record."""
+
+        header, chunks = self.__encryptor.encrypt_stream(data, self.__password, session=self._get_session())
+        storage.append_binary_record(path, header, chunks)
+
+    def encrypt_records_to_file(self, records: list[str], path: str):
+        """Encrypts records and atomically replaces a journal with them."""
+
+        with storage.atomic_open(path, "wb") as file:
+            for record in records:
+                header, chunks = self.__encryptor.encrypt_stream(record, self.__password, session=self._get_session())
+                storage.write_binary_record(file, header, chunks)
+
+    def decrypt_records(self, path: str) -> list[str]:
+        """Reads and decrypts all records in a journal. If a record can't be decrypted, it and all records
+        after it are skipped, as the journal can't be trusted from that point onwards."""
+
+        records: list[str] = []
+
+        with storage.open_binary_records(path) as encrypted_records:
+            for header, ciphertext in encrypted_records:
+                try:
+                    records.append(self.__encryptor.decrypt_buffer(
+                        header, ciphertext, self.__password, session=self._get_read_session(header)
+                    ))
+                except ValueError:
+                    break
+
+        return records
+
+    def clear(self):
+        """Clears the session key from memory."""
+
+        if self.__session:
+            self.__session.clear()
+
+        with self.__sessions_lock:
+            for session in self.__sessions.values():
+                session.clear()
+
+            self.__sessions.clear()
 
 class TokenStore:
     """Shinobu's secret manager. Should only be used in the context of the bootscript to enforce module-level
@@ -42,7 +251,7 @@ class TokenStore:
 
     def __init__(self, password: str, filename: str | None = None, debug: bool = False,
                  content_override: dict | None = None, onetime: list | None = None, read_only: bool = True,
-                 write_only: bool = False):
+                 write_only: bool = False, cache_ttl: int | None = None):
         self.__encryptor: encryptor.AutoEncryptor = encryptor.AutoEncryptor()
         self.__password: str = password
         self.__filename: str = filename or '.secrets.json'
@@ -53,6 +262,14 @@ class TokenStore:
         self.__data: dict = copy.copy(content_override) if content_override else {}
         self.__debug = debug
 
+        # Decrypted secret cache (disabled unless a TTL is given)
+        self.__cache_ttl: int | None = cache_ttl
+        self.__cache: dict[str, tuple[bytearray, float]] = {}
+        self.__cache_lock: threading.Lock = threading.Lock()
+        self.__cache_timer: threading.Timer | None = None
+        self.__cache_hits: int = 0
+        self.__cache_misses: int = 0
+
         # Prevent TokenStore from being read-only and write-only at the same time
         if read_only and write_only:
             raise ValueError("TokenStore can't be read-only AND write-only, make up your mind please")
@@ -96,6 +313,18 @@ class TokenStore:
     def write_only(self):
         return self.__write_only
 
+    @property
+    def cache_enabled(self) -> bool:
+        return bool(self.__cache_ttl)
+
+    @property
+    def cache_hits(self) -> int:
+        return self.__cache_hits
+
+    @property
+    def cache_misses(self) -> int:
+        return self.__cache_misses
+
     @property
     def needs_reencryption(self) -> bool:
         test_data: encryptor.EncryptedData = encryptor.EncryptedData.from_dict(self.__data['test'])
@@ -108,6 +337,9 @@ class TokenStore:
         with open(filename, 'r') as file:
             self.__data = json.load(file)
 
+        # Cached secrets may be outdated now
+        self.clear_cache()
+
     def _create_test_key(self):
         """Creates a test key for decryption testing."""
         if not 'test' in self.__data.keys():
@@ -152,11 +384,103 @@ class TokenStore:
             # Allow access to secret, but prevent any further access attempts
             self.__accessed.append(identifier)
 
+        # One-time secrets are never cached, as they can't be retrieved again anyway
+        should_cache: bool = self.cache_enabled and identifier not in self.__one_time
+
+        # Check cache
+        if should_cache:
+            cached: str | None = self._get_cached(identifier)
+
+            if cached is not None:
+                return cached
+
         # Create encrypted data object
         data: encryptor.EncryptedData = encryptor.EncryptedData.from_dict(self.__data[identifier])
 
         # Decrypt and return
-        return self.__encryptor.decrypt(data, self.__password)
+        secret: str = self.__encryptor.decrypt(data, self.__password)
+
+        if should_cache:
+            self._set_cached(identifier, secret)
+
+        return secret
+
+    def _get_cached(self, identifier: str) -> str | None:
+        with self.__cache_lock:
+            entry: tuple[bytearray, float] | None = self.__cache.get(identifier)
+
+            if not entry or entry[1] <= time.time():
+                self.__cache_misses += 1
+                return None
+
+            self.__cache_hits += 1
+            return entry[0].decode()
+
+    def _set_cached(self, identifier: str, secret: str):
+        expiry: float = time.time() + self.__cache_ttl
+
+        with self.__cache_lock:
+            old_entry: tuple[bytearray, float] | None = self.__cache.pop(identifier, None)
+            if old_entry:
+                encryptor.BaseEncryptor.clear_key(old_entry[0])
+
+            self.__cache.update({identifier: (bytearray(secret.encode()), expiry)})
+
+            # Zeroize the entry once it expires, even if it's never retrieved again
+            self._schedule_purge()
+
+    def _schedule_purge(self):
+        """Starts the cache's purge timer for the next secret to expire, unless it's already running. The cache
+        lock must be held."""
+
+        if self.__cache_timer or len(self.__cache) == 0:
+            return
+
+        delay: float = max(min([expiry for _, expiry in self.__cache.values()]) - time.time(), 0)
+        self.__cache_timer = threading.Timer(delay, self._run_purge)
+        self.__cache_timer.daemon = True
+        self.__cache_timer.start()
+
+    def _run_purge(self):
+        with self.__cache_lock:
+            self.__cache_timer = None
+
+        self.purge_cache()
+
+    def purge_cache(self):
+        """Zeroizes and removes expired secrets from the cache."""
+
+        now: float = time.time()
+
+        with self.__cache_lock:
+            for identifier in list(self.__cache.keys()):
+                if self.__cache[identifier][1] <= now:
+                    encryptor.BaseEncryptor.clear_key(self.__cache.pop(identifier)[0])
+
+            # Wait for the next secret to expire
+            self._schedule_purge()
+
+    def invalidate_cache(self, identifier: str):
+        """Zeroizes and removes a secret from the cache."""
+
+        with self.__cache_lock:
+            entry: tuple[bytearray, float] | None = self.__cache.pop(identifier, None)
+
+            if entry:
+                encryptor.BaseEncryptor.clear_key(entry[0])
+
+    def clear_cache(self):
+        """Zeroizes and removes all secrets from the cache."""
+
+        with self.__cache_lock:
+            for secret, _ in self.__cache.values():
+                encryptor.BaseEncryptor.clear_key(secret)
+
+            self.__cache.clear()
+
+            if self.__cache_timer:
+                self.__cache_timer.cancel()
+                self.__cache_timer = None
 
     def retrieve_raw(self, identifier):
         """Retrieves the ciphertext for a secret.
@@ -176,7 +500,7 @@ class TokenStore:
             raise KeyError('Secret already exists')
 
         # Encrypt and save token
-        encrypted_data = encryptor.EncryptedData = self.__encryptor.encrypt(token, self.__password)
+        encrypted_data: encryptor.EncryptedData = self.__encryptor.encrypt(token, self.__password)
         self.__data.update({identifier: encrypted_data.to_dict()})
         self.save()
         return len(self.__data)
@@ -203,6 +527,7 @@ class TokenStore:
 
         # Overwrite old secret
         self.__data.update({identifier: encrypted_data.to_dict()})
+        self.invalidate_cache(identifier)
         self.save()
 
     def delete_token(self, identifier, password):
@@ -226,28 +551,48 @@ class TokenStore:
 
         # Delete token
         del self.__data[identifier]
+        self.invalidate_cache(identifier)
         self.save()
 
         # Return remaining tokens
         return len(self.__data)
 
-    def reencrypt(self, current_password, password):
-        """Re-encrypts entire TokenStore data with a new password. Current password is required for confirmation."""
+    def reencrypt(self, current_password, password, workers: int = 1, memory_budget: int | None = None,
+                  progress=None):
+        """Re-encrypts entire TokenStore data with a new password. Current password is required for confirmation.
+
+        Secrets can be re-encrypted in parallel using worker processes (0 uses all CPUs), while keeping the
+        estimated memory usage within the memory budget (in bytes). Nothing is changed unless every secret
+        is re-encrypted successfully."""
 
         # Prevent access for read-only mode
         if self.read_only:
             raise RuntimeError("TokenStore is in read-only mode")
 
+        # Prevent access for write-only mode
+        if self.write_only:
+            raise RuntimeError("TokenStore is in write-only mode")
+
         # Check password
         if not self.test_decrypt(password=current_password):
             raise ValueError('Invalid password')
 
+        # Create jobs
+        jobs: list[reencryptor.ReencryptionJob] = []
+        new_kdf_memory: int = reencryptor.get_new_kdf_memory()
+
+        for key, data in self.__data.items():
+            kdf_memory: int = reencryptor.get_data_kdf_memory(encryptor.EncryptedData.from_dict(data))
+            jobs.append(reencryptor.ReencryptionJob(
+                key, reencryptor.reencrypt_token, (data, current_password, password),
+                memory=max(kdf_memory, new_kdf_memory)
+            ))
+
         # Re-encrypt everything
-        for key in self.__data.keys():
-            token = self.retrieve(key)
-            encrypted: encryptor.EncryptedData = self.__encryptor.encrypt(token, password)
-            self.__data[key] = encrypted.to_dict()
+        results: dict = reencryptor.run_jobs(jobs, workers=workers, memory_budget=memory_budget, progress=progress)
 
+        # Only replace data once everything has been re-encrypted
+        self.__data = {key: results[key] for key in self.__data.keys()}
         self.__password = password
         self.save()
 
@@ -265,7 +610,7 @@ class TokenStore:
         # Ensure test value exists
         self._create_test_key()
 
-        # Write file
-        with open(filename, 'w+') as file:
+        # Write file (the old file is only replaced once the new one is fully written)
+        with storage.atomic_open(filename) as file:
             # noinspection PyTypeChecker
             json.dump(self.__data, file)
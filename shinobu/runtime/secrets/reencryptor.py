@@ -0,0 +1,305 @@
+"""
+Shinobu - Converse from anywhere, anytime.
+Copyright (C) 2026-present  Green (@greeeen-dev)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import shutil
+import itertools
+import contextlib
+from concurrent.futures import Future, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from shinobu.runtime.secrets import encryptor, storage, store, backup
+
+# Estimated memory used by each worker process on its own (interpreter, imports, etc.)
+worker_overhead: int = 64 * 1048576
+
+# Estimated memory used by streamed jobs on top of key derivation (a few chunks at a time)
+stream_overhead: int = 16 * 1048576
+
+class ReencryptionError(Exception):
+    """Raised when a re-encryption job fails. Holds the results of jobs that did finish, so staging files
+    can be cleaned up."""
+
+    def __init__(self, name: str, results: dict):
+        super().__init__(f"Failed to re-encrypt {name}")
+        self.name: str = name
+        self.results: dict = results
+
+class ReencryptionJob:
+    """A re-encryption job. Jobs are run in worker processes, so the function and its arguments must be
+    picklable."""
+
+    def __init__(self, name: str, func, args: tuple, memory: int):
+        self._name: str = name
+        self._func = func
+        self._args: tuple = args
+        self._memory: int = memory
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def func(self):
+        return self._func
+
+    @property
+    def args(self) -> tuple:
+        return self._args
+
+    @property
+    def memory(self) -> int:
+        """Estimated peak memory usage of the job in bytes."""
+        return self._memory
+
+def get_kdf_memory(kdf: str | None = None, profile: str | None = None) -> int:
+    """Returns the memory needed by a KDF profile in bytes. If no profile is given, the most memory-hungry
+    available Argon2 profile is assumed."""
+
+    if kdf == "pbkdf2":
+        return 0
+
+    if not profile:
+        return max([encryptor.argon2_profiles[available].memory_cost for available in encryptor.argon2_available]) * 1024
+
+    # Calibrated profiles may not be registered yet
+    encryptor.register_argon2_profile(profile)
+
+    argon2_profile = encryptor.argon2_profiles.get(profile)
+    return argon2_profile.memory_cost * 1024 if argon2_profile else 0
+
+def get_new_kdf_memory() -> int:
+    """Returns the memory needed to derive keys for re-encrypted data in bytes. New data uses the default
+    profile, which may have been calibrated for this host."""
+    return get_kdf_memory("argon2", encryptor.BaseEncryptor.get_default_profile("argon2"))
+
+def get_data_kdf_memory(data: encryptor.EncryptedData | None) -> int:
+    """Returns the memory needed to derive the key of encrypted data in bytes. If the data's header isn't
+    known, the most memory-hungry available profile is assumed."""
+
+    if not data:
+        return get_kdf_memory()
+
+    return get_kdf_memory(data.kdf, data.profile or encryptor.BaseEncryptor.get_default_profile(data.kdf))
+
+def estimate_file_memory(path: str) -> int:
+    """Estimates the peak memory needed to re-encrypt a secure file in bytes."""
+
+    # Only binary containers can tell us their KDF profile without being read entirely
+    header: encryptor.EncryptedData | None = storage.read_binary_header(path)
+
+    # Keys are derived one at a time, but we'll need the ciphertext, plaintext and new ciphertext at once
+    return max(get_data_kdf_memory(header), get_new_kdf_memory()) + os.path.getsize(path) * 3
+
+def estimate_stream_memory(path: str | None = None) -> int:
+    """Estimates the peak memory needed to re-encrypt data that's streamed rather than read entirely (archives,
+    stores and backup chains) in bytes. If no binary container is given, the most memory-hungry profile is
+    assumed."""
+
+    header: encryptor.EncryptedData | None = storage.read_binary_header(path) if path else None
+    return max(get_data_kdf_memory(header), get_new_kdf_memory()) + stream_overhead
+
+def reencrypt_token(data: dict, current_password: str, password: str) -> dict:
+    """Re-encrypts a TokenStore secret."""
+
+    auto_encryptor: encryptor.AutoEncryptor = encryptor.AutoEncryptor()
+    plaintext: str = auto_encryptor.decrypt(encryptor.EncryptedData.from_dict(data), current_password)
+    return auto_encryptor.encrypt(plaintext, password).to_dict()
+
+def reencrypt_file(current_encryptor, new_encryptor, path: str, target_path: str, container: str) -> str:
+    """Re-encrypts a secure file into a staging file next to its target. Returns the path of the staging
+    file, which should be moved into place with commit_staged."""
+
+    data: str = current_encryptor.decrypt_file(path)
+    staging_path: str = storage.get_temp_path(target_path)
+
+    try:
+        new_encryptor.encrypt_to_file(data, staging_path, container=container)
+    finally:
+        del data
+
+    return staging_path
+
+def reencrypt_journal(current_encryptor, new_encryptor, path: str) -> str:
+    """Re-encrypts a journal into a staging file. Returns the path of the staging file."""
+
+    records: list[str] = current_encryptor.decrypt_records(path)
+    staging_path: str = storage.get_temp_path(path)
+    new_encryptor.encrypt_records_to_file(records, staging_path)
+
+    return staging_path
+
+def reencrypt_store(current_encryptor, new_encryptor, path: str) -> str:
+    """Re-encrypts a store into a staging file. Returns the path of the staging file."""
+
+    staging_path: str = storage.get_temp_path(path)
+    secure_store: store.SecureStore = store.SecureStore(path, current_encryptor)
+
+    try:
+        secure_store.copy_to(staging_path, new_encryptor)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(staging_path)
+
+        raise
+    finally:
+        secure_store.close()
+
+    return staging_path
+
+def reencrypt_backup_chain(current_encryptor, new_encryptor, filename: str, chain: str, target_path: str) -> str | None:
+    """Re-encrypts a backup chain into a staging directory. The chain is named after its new salt, so the
+    target directory's name should be a random salt in hex. Returns the path of the staging directory, or None
+    if the chain can't be decrypted (e.g. it was left behind by an earlier password change)."""
+
+    staging_path: str = storage.get_temp_path(target_path)
+
+    try:
+        copied: bool = backup.BackupStore(filename, current_encryptor).copy_chain(
+            chain, new_encryptor, staging_path, salt=bytes.fromhex(os.path.basename(target_path))
+        )
+    except BaseException:
+        shutil.rmtree(staging_path, ignore_errors=True)
+        raise
+
+    return staging_path if copied else None
+
+def reencrypt_archive(current_encryptor, new_encryptor, path: str) -> str | None:
+    """Re-encrypts an archive into a staging file, one chunk at a time. Returns the path of the staging file,
+    or None if the archive can't be decrypted (e.g. it was left behind by an earlier password change)."""
+
+    header: encryptor.EncryptedData | None = storage.read_binary_header(path)
+    pieces = current_encryptor.iter_decrypt_file(path)
+
+    try:
+        first: bytes = next(pieces, b"")
+    except ValueError:
+        return None
+
+    staging_path: str = storage.get_temp_path(path)
+    new_encryptor.encrypt_to_file(
+        itertools.chain([first], pieces), staging_path, kdf_profile=header.profile if header else None,
+        container="binary"
+    )
+
+    return staging_path
+
+def commit_staged(staged: dict[str, str]):
+    """Moves staging files (or directories) into place. Takes a mapping of target paths to staging paths."""
+
+    directories: set[str] = set()
+
+    for target_path, staging_path in staged.items():
+        os.replace(staging_path, target_path)
+        directories.add(os.path.dirname(target_path) or ".")
+
+    for directory in directories:
+        storage.sync_directory(directory)
+
+def discard_staged(staged: dict[str, str]):
+    """Removes staging files (or directories). Takes a mapping of target paths to staging paths."""
+
+    for staging_path in staged.values():
+        if os.path.isdir(staging_path):
+            shutil.rmtree(staging_path, ignore_errors=True)
+            continue
+
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(staging_path)
+
+def run_jobs(jobs: list[ReencryptionJob], workers: int = 1, memory_budget: int | None = None,
+             progress=None) -> dict:
+    """Runs re-encryption jobs and returns their results by job name.
+
+    With more than one worker, jobs run in a process pool. A job is only started if the estimated memory of
+    running jobs stays within the memory budget (in bytes), though at least one job always runs. If a job
+    fails, no further jobs are started and the error is raised once running jobs finish.
+
+    progress is called with the number of finished jobs, the total number of jobs and the job name."""
+
+    results: dict = {}
+    total: int = len(jobs)
+
+    if total == 0:
+        return results
+
+    workers = min(workers if workers > 0 else (os.cpu_count() or 1), total)
+
+    if memory_budget:
+        # Worker processes need memory of their own, so fewer workers may fit the budget
+        smallest: int = min([job.memory for job in jobs])
+        workers = max(1, min(workers, memory_budget // (worker_overhead + smallest)))
+
+    if workers == 1:
+        # No need for a process pool
+        for job in jobs:
+            try:
+                results.update({job.name: job.func(*job.args)})
+            except Exception as e:
+                raise ReencryptionError(job.name, results) from e
+
+            if progress:
+                progress(len(results), total, job.name)
+
+        return results
+
+    available: int | None = memory_budget - worker_overhead * workers if memory_budget else None
+    queue: list[ReencryptionJob] = list(jobs)
+    running: dict[Future, ReencryptionJob] = {}
+    used: int = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while len(queue) > 0 or len(running) > 0:
+            # Start as many jobs as the budget allows
+            while len(queue) > 0 and len(running) < workers:
+                job: ReencryptionJob | None = None
+
+                for queued_job in queue:
+                    if available is None or len(running) == 0 or used + queued_job.memory <= available:
+                        job = queued_job
+                        break
+
+                if not job:
+                    break
+
+                queue.remove(job)
+                running.update({executor.submit(job.func, *job.args): job})
+                used += job.memory
+
+            done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                job: ReencryptionJob = running.pop(future)
+                used -= job.memory
+
+                try:
+                    results.update({job.name: future.result()})
+                except Exception:
+                    # Stop starting new jobs and wait for running ones
+                    queue.clear()
+                    wait(running.keys())
+
+                    # Give staging files of finished jobs back to the caller for cleanup
+                    for other_future, other_job in running.items():
+                        if not other_future.cancelled() and not other_future.exception():
+                            results.update({other_job.name: other_future.result()})
+
+                    raise ReencryptionError(job.name, results) from future.exception()
+
+                if progress:
+                    progress(len(results), total, job.name)
+
+    return results
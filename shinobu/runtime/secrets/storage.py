@@ -0,0 +1,417 @@
+"""
+Shinobu - Converse from anywhere, anytime.
+Copyright (C) 2026-present  Green (@greeeen-dev)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import mmap
+import uuid
+import shutil
+import base64
+import struct
+import typing
+import contextlib
+import ujson as json
+from shinobu.runtime.secrets import encryptor
+
+# Container formats and their file extensions
+container_extensions: dict[str, str] = {
+    "binary": "bin", # Recommended
+    "json": "json" # Compatibility only
+}
+
+# Binary container header
+# magic, version, algorithm, kdf, flags, nonce size, chunk size, ciphertext length, profile, salt, subkey salt,
+# nonce, tag
+binary_magic: bytes = b"SHNB"
+binary_version: int = 2
+
+# Containers are written with the oldest version that can read them, so only compressed containers need version 2
+binary_version_compression: int = 2
+binary_header: struct.Struct = struct.Struct(">4sBBBBBIQ32s16s16s24s16s")
+
+# Binary container IDs (do not reorder these, only append!)
+binary_algorithms: list[str] = ["aes-256-gcm", "xchacha20-poly1305"]
+binary_kdfs: list[str] = ["argon2", "pbkdf2"]
+
+# Binary container flags
+binary_flag_chunked: int = 1
+binary_flag_subkey: int = 2
+binary_flag_zlib: int = 4
+binary_flag_zstd: int = 8
+
+# Compression flags by algorithm
+binary_compression_flags: dict[str, int] = {
+    "zlib": binary_flag_zlib,
+    "zstd": binary_flag_zstd
+}
+
+def get_temp_path(path: str) -> str:
+    """Returns a unique temporary path next to a file. Leftover temporary files are removed on startup."""
+
+    directory: str = os.path.dirname(path) or "."
+    return os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+
+@contextlib.contextmanager
+def atomic_open(path: str, mode: str = "w"):
+    """Opens a temporary file for writing, then moves it into place once it's been written and synced.
+    If anything goes wrong, the original file is left untouched."""
+
+    directory: str = os.path.dirname(path) or "."
+    temp_path: str = get_temp_path(path)
+
+    try:
+        with open(temp_path, mode) as file:
+            yield file
+
+            # Ensure data is on disk before we replace the original file
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, path)
+    except BaseException:
+        # Remove temporary file
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_path)
+
+        raise
+
+    # Ensure rename is on disk as well
+    sync_directory(directory)
+
+def sync_directory(directory: str):
+    """Syncs a directory's entries to disk. This does nothing on platforms that don't support it."""
+
+    try:
+        directory_fd: int = os.open(directory, os.O_RDONLY)
+    except (OSError, AttributeError):
+        return
+
+    try:
+        os.fsync(directory_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(directory_fd)
+
+def remove_temp_files(directory: str):
+    """Removes temporary files and directories left behind by interrupted writes."""
+
+    if not os.path.isdir(directory):
+        return
+
+    # Segments are stored in subdirectories, so we need to check those as well
+    for root, directories, filenames in os.walk(directory):
+        for name in list(directories):
+            if name.startswith(".") and name.endswith(".tmp"):
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+                directories.remove(name)
+
+        for filename in filenames:
+            if filename.startswith(".") and filename.endswith(".tmp"):
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(root, filename))
+
+def write_json_stream(file: typing.TextIO, header: encryptor.EncryptedData, chunks: typing.Iterable[bytes]):
+    """Writes chunked encrypted data as a JSON envelope. The ciphertext is base64-encoded one chunk at a time,
+    so the whole ciphertext never needs to be held in memory."""
+
+    file.write('{"ciphertext":"')
+
+    # base64 encodes 3 bytes at a time, so we'll carry over any leftover bytes to the next chunk
+    carry: bytes = b""
+    for chunk in chunks:
+        data: bytes = carry + chunk
+        cutoff: int = len(data) - len(data) % 3
+
+        file.write(base64.b64encode(data[:cutoff]).decode('ascii'))
+        carry = data[cutoff:]
+
+    file.write(base64.b64encode(carry).decode('ascii'))
+    file.write('",')
+
+    # Write the rest of the envelope
+    envelope: dict = header.to_dict()
+    envelope.pop("ciphertext")
+    file.write(json.dumps(envelope)[1:])
+
+def pack_binary_header(header: encryptor.EncryptedData, length: int) -> bytes:
+    """Returns the binary container header for encrypted data."""
+
+    flags: int = 0
+    if header.chunked:
+        flags |= binary_flag_chunked
+    if header.subkey_salt:
+        flags |= binary_flag_subkey
+    if header.compression:
+        flags |= binary_compression_flags[header.compression]
+
+    nonce: bytes = base64.b64decode(header.nonce)
+
+    return binary_header.pack(
+        binary_magic,
+        binary_version_compression if header.compression else 1,
+        binary_algorithms.index(header.algorithm),
+        binary_kdfs.index(header.kdf),
+        flags,
+        len(nonce),
+        header.chunk_size or 0,
+        length,
+        header.profile.encode('ascii'),
+        base64.b64decode(header.salt),
+        base64.b64decode(header.subkey_salt) if header.subkey_salt else b"",
+        nonce,
+        base64.b64decode(header.tag) if header.tag else b""
+    )
+
+def unpack_binary_header(data: bytes | memoryview) -> tuple[encryptor.EncryptedData, int]:
+    """Reads a binary container header. Returns encrypted data without the ciphertext, and the ciphertext
+    length."""
+
+    if len(data) < binary_header.size:
+        raise ValueError("Header is truncated")
+
+    (
+        magic, version, algorithm, kdf, flags, nonce_size, chunk_size, length, profile, salt, subkey_salt, nonce, tag
+    ) = binary_header.unpack(data[:binary_header.size])
+
+    if magic != binary_magic:
+        raise ValueError("Not a binary container")
+
+    if version > binary_version:
+        raise ValueError("Unsupported container version")
+
+    if algorithm >= len(binary_algorithms) or kdf >= len(binary_kdfs):
+        raise ValueError("Unsupported algorithm or KDF")
+
+    chunked: bool = bool(flags & binary_flag_chunked)
+    compression: str | None = None
+    for name, flag in binary_compression_flags.items():
+        if flags & flag:
+            compression = name
+
+    header: encryptor.EncryptedData = encryptor.EncryptedData(
+        ciphertext="",
+        tag="" if chunked else base64.b64encode(tag).decode('ascii'),
+        nonce=base64.b64encode(nonce[:nonce_size]).decode('ascii'),
+        salt=base64.b64encode(salt).decode('ascii'),
+        algorithm=binary_algorithms[algorithm],
+        kdf=binary_kdfs[kdf],
+        profile=profile.rstrip(b"\x00").decode('ascii'),
+        subkey_salt=base64.b64encode(subkey_salt).decode('ascii') if flags & binary_flag_subkey else None,
+        chunk_size=chunk_size if chunked else None,
+        compression=compression
+    )
+
+    return header, length
+
+def write_binary_stream(file: typing.BinaryIO, header: encryptor.EncryptedData, chunks: typing.Iterable[bytes]):
+    """Writes chunked encrypted data as a binary container. The file must be seekable, as the ciphertext length
+    is only known once all chunks are written."""
+
+    # Write placeholder header
+    file.write(pack_binary_header(header, 0))
+
+    length: int = 0
+    for chunk in chunks:
+        file.write(chunk)
+        length += len(chunk)
+
+    # Write actual header
+    file.seek(0)
+    file.write(pack_binary_header(header, length))
+    file.seek(0, os.SEEK_END)
+
+def read_binary_header(path: str) -> encryptor.EncryptedData | None:
+    """Reads a binary container's header without reading the ciphertext. Returns None for other formats."""
+
+    with open(path, 'rb') as file:
+        data: bytes = file.read(binary_header.size)
+
+    try:
+        header, _ = unpack_binary_header(data)
+    except ValueError:
+        return None
+
+    return header
+
+def is_binary(path: str) -> bool:
+    """Checks if a file is a binary container."""
+
+    with open(path, 'rb') as file:
+        return file.read(len(binary_magic)) == binary_magic
+
+def close_mapped(mapped: mmap.mmap):
+    """Closes a memory map. If a failed decryption left views of it in an exception's traceback, the map
+    can't be closed yet, so it's left for the garbage collector rather than hiding the original error."""
+
+    try:
+        mapped.close()
+    except BufferError:
+        pass
+
+@contextlib.contextmanager
+def open_binary(path: str):
+    """Memory-maps a binary container. Yields encrypted data without the ciphertext, and a memoryview of the
+    ciphertext. The memoryview can't be used once the context manager exits."""
+
+    with open(path, 'rb') as file:
+        mapped: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view: memoryview = memoryview(mapped)
+
+        try:
+            header, length = unpack_binary_header(view)
+
+            if len(view) < binary_header.size + length:
+                raise ValueError("Ciphertext is truncated")
+
+            ciphertext: memoryview = view[binary_header.size:binary_header.size + length]
+
+            try:
+                yield header, ciphertext
+            finally:
+                ciphertext.release()
+        finally:
+            view.release()
+            close_mapped(mapped)
+
+def write_binary_record(file: typing.BinaryIO, header: encryptor.EncryptedData, chunks: typing.Iterable[bytes]):
+    """Writes chunked encrypted data as a journal record. As each container's header stores its ciphertext
+    length, records can be read back without any extra framing."""
+
+    ciphertext: bytes = b"".join(chunks)
+    file.write(pack_binary_header(header, len(ciphertext)) + ciphertext)
+
+def append_binary_record(path: str, header: encryptor.EncryptedData, chunks: typing.Iterable[bytes]):
+    """Appends chunked encrypted data to a journal as a new record."""
+
+    with open(path, 'ab') as file:
+        write_binary_record(file, header, chunks)
+        file.flush()
+
+@contextlib.contextmanager
+def open_binary_records(path: str):
+    """Memory-maps a journal. Yields a list of encrypted data without the ciphertext and memoryviews of the
+    ciphertext for each record. A truncated record at the end of the journal (e.g. from a crash while
+    appending) is ignored, along with anything after it."""
+
+    if os.path.getsize(path) == 0:
+        yield []
+        return
+
+    with open(path, 'rb') as file:
+        mapped: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view: memoryview = memoryview(mapped)
+        records: list[tuple[encryptor.EncryptedData, memoryview]] = []
+
+        try:
+            offset: int = 0
+            while offset < len(view):
+                try:
+                    header, length = unpack_binary_header(view[offset:offset + binary_header.size])
+                except ValueError:
+                    break
+
+                start: int = offset + binary_header.size
+                if len(view) < start + length:
+                    break
+
+                records.append((header, view[start:start + length]))
+                offset = start + length
+
+            yield records
+        finally:
+            for _, ciphertext in records:
+                ciphertext.release()
+
+            view.release()
+            close_mapped(mapped)
+
+def get_secure_file_path(filename: str, container: str = "binary") -> str:
+    """Returns the path of a secure file for a container format."""
+
+    if container not in container_extensions:
+        raise ValueError(f"Invalid container {container}")
+
+    return os.path.join("data", f"{filename}.{container_extensions[container]}")
+
+def get_segment_name(filename: str, segment: str) -> str:
+    """Returns the name of a secure file segment. Segments are stored in a directory named after the file."""
+
+    if not segment.isalnum():
+        raise ValueError("Segment name should be alphanumeric")
+
+    return f"{filename}/{segment}"
+
+def list_segments(filename: str) -> list[str]:
+    """Returns the names of all segments stored for a secure file."""
+
+    directory: str = os.path.join("data", filename)
+
+    if not os.path.isdir(directory):
+        return []
+
+    extensions: list[str] = [f".{extension}" for extension in container_extensions.values()]
+    segments: set[str] = set()
+
+    for entry in os.listdir(directory):
+        name, extension = os.path.splitext(entry)
+
+        if extension in extensions and name.isalnum():
+            segments.add(name)
+
+    return sorted(segments)
+
+def get_journal_path(filename: str) -> str:
+    """Returns the path of a secure file's journal."""
+
+    return os.path.join("data", f"{filename}.journal")
+
+def find_secure_file(filename: str) -> str | None:
+    """Returns the path of an existing secure file, preferring the binary container."""
+
+    for container in container_extensions:
+        path: str = get_secure_file_path(filename, container)
+
+        if os.path.exists(path):
+            return path
+
+    return None
+
+def remove_other_containers(filename: str, container: str):
+    """Removes copies of a secure file stored in other container formats, so they don't shadow the new copy."""
+
+    for other_container in container_extensions:
+        if other_container == container:
+            continue
+
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(get_secure_file_path(filename, other_container))
+
+def remove_secure_file(filename: str):
+    """Removes a secure file in all container formats."""
+
+    for container in container_extensions:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(get_secure_file_path(filename, container))
+
+def read_json(path: str) -> encryptor.EncryptedData:
+    """Reads a JSON envelope."""
+
+    with open(path, 'r') as file:
+        data: dict = json.load(file)
+
+    return encryptor.EncryptedData.from_dict(data)
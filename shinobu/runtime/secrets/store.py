@@ -0,0 +1,243 @@
+"""
+Shinobu - Converse from anywhere, anytime.
+Copyright (C) 2026-present  Green (@greeeen-dev)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import hmac
+import typing
+import sqlite3
+import hashlib
+import threading
+import ujson as json
+from shinobu.runtime.secrets import encryptor
+
+# Stores are kept next to secure files
+store_extension: str = "store"
+
+# HKDF salt for the key used to hash keys (keys shouldn't be readable from the database)
+key_hash_salt: bytes = b"shinobu-store-key"
+
+# Value used to check if the store can be decrypted with the current password
+check_value: str = "shinobu-store"
+
+def get_store_path(filename: str) -> str:
+    """Returns the path of a secure file's store."""
+
+    if not filename.isalnum():
+        raise ValueError("Filename should be alphanumeric")
+
+    return os.path.join("data", f"{filename}.{store_extension}")
+
+def create_tables(connection: sqlite3.Connection):
+    """Creates a store's tables if they don't exist yet."""
+
+    with connection:
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value BLOB NOT NULL)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key BLOB PRIMARY KEY, value BLOB NOT NULL, updated REAL NOT NULL)"
+        )
+        connection.execute("CREATE TABLE IF NOT EXISTS aliases (alias BLOB PRIMARY KEY, key BLOB NOT NULL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS entries_updated ON entries (updated)")
+        connection.execute("CREATE INDEX IF NOT EXISTS aliases_key ON aliases (key)")
+
+class SecureStore:
+    """An encrypted key-value store backed by SQLite, for data that doesn't fit in memory.
+
+    Values are encrypted one at a time with subkeys of a key that's derived once per store, and keys are
+    replaced with keyed hashes. Each value can have aliases, so it can also be found by other keys (e.g. a
+    message group by any of its message IDs). If the store can't be decrypted (e.g. the password changed), it
+    starts over empty."""
+
+    def __init__(self, path: str, raw_encryptor):
+        self._path: str = path
+        self._encryptor = raw_encryptor
+        self._lock: threading.Lock = threading.Lock()
+        self._connection: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+
+        # WAL lets us commit every write without syncing each time
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+
+        create_tables(self._connection)
+
+        self._session: encryptor.SessionKey = self._open_session()
+        self._key: bytearray = self._open_key()
+
+    def _get_meta(self, name: str) -> bytes | None:
+        row: tuple | None = self._connection.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _open_session(self) -> encryptor.SessionKey:
+        """Returns the store's session key, starting over if the store can't be decrypted."""
+
+        salt: bytes | None = self._get_meta("salt")
+        profile: bytes | None = self._get_meta("profile")
+        check: bytes | None = self._get_meta("check")
+
+        if salt and profile and check:
+            session: encryptor.SessionKey = self._encryptor.get_backup_session(salt, kdf_profile=profile.decode())
+
+            try:
+                if self._encryptor.decrypt_bytes(check, session=session) == check_value:
+                    return session
+            except ValueError:
+                pass
+
+        # Start over with a new key
+        session: encryptor.SessionKey = self._encryptor.get_backup_session()
+
+        with self._connection:
+            self._connection.execute("DELETE FROM entries")
+            self._connection.execute("DELETE FROM aliases")
+            self._connection.execute("DELETE FROM meta")
+            self._connection.executemany("INSERT INTO meta (name, value) VALUES (?, ?)", [
+                ("salt", session.salt),
+                ("profile", session.profile.encode()),
+                ("check", self._encryptor.encrypt_to_bytes(check_value, session=session))
+            ])
+
+        return session
+
+    def _open_key(self) -> bytearray:
+        """Returns the key used to hash keys. Re-encrypted stores keep the key of the store they were copied
+        from, so it's stored with them."""
+
+        wrapped: bytes | None = self._get_meta("key")
+
+        if not wrapped:
+            return self._session.derive_subkey(key_hash_salt)
+
+        return bytearray.fromhex(self._encryptor.decrypt_bytes(wrapped, session=self._session))
+
+    def _hash(self, key: str) -> bytes:
+        return hmac.new(self._key, key.encode(), hashlib.sha256).digest()
+
+    def put(self, key: str, value: str, aliases: typing.Iterable[str] = ()):
+        """Stores a value, replacing any existing value and aliases for the key."""
+
+        # The key is stored with the value, so values can't be swapped between keys
+        data: bytes = self._encryptor.encrypt_to_bytes(json.dumps([key, value]), session=self._session)
+
+        with self._lock, self._connection:
+            key_hash: bytes = self._hash(key)
+            self._connection.execute("DELETE FROM aliases WHERE key = ?", (key_hash,))
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, updated) VALUES (?, ?, ?)", (key_hash, data, time.time())
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO aliases (alias, key) VALUES (?, ?)",
+                [(self._hash(alias), key_hash) for alias in aliases]
+            )
+
+    def _read(self, key_hash: bytes) -> tuple[str, str] | None:
+        row: tuple | None = self._connection.execute(
+            "SELECT value FROM entries WHERE key = ?", (key_hash,)
+        ).fetchone()
+
+        if not row:
+            return None
+
+        key, value = json.loads(self._encryptor.decrypt_bytes(row[0], session=self._session))
+
+        if not hmac.compare_digest(self._hash(key), key_hash):
+            raise ValueError("Value does not match its key")
+
+        return key, value
+
+    def get(self, key: str) -> str | None:
+        """Returns the value stored for a key."""
+
+        with self._lock:
+            entry: tuple[str, str] | None = self._read(self._hash(key))
+
+        return entry[1] if entry else None
+
+    def find(self, alias: str) -> tuple[str, str] | None:
+        """Returns the key and value an alias points to."""
+
+        with self._lock:
+            row: tuple | None = self._connection.execute(
+                "SELECT key FROM aliases WHERE alias = ?", (self._hash(alias),)
+            ).fetchone()
+
+            if not row:
+                return None
+
+            return self._read(row[0])
+
+    def remove(self, key: str):
+        """Removes a value and its aliases."""
+
+        with self._lock, self._connection:
+            key_hash: bytes = self._hash(key)
+            self._connection.execute("DELETE FROM aliases WHERE key = ?", (key_hash,))
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (key_hash,))
+
+    def prune(self, max_age: float) -> int:
+        """Removes values that haven't been stored for the given number of seconds. Returns how many were
+        removed."""
+
+        with self._lock, self._connection:
+            cutoff: float = time.time() - max_age
+            self._connection.execute(
+                "DELETE FROM aliases WHERE key IN (SELECT key FROM entries WHERE updated < ?)", (cutoff,)
+            )
+            return self._connection.execute("DELETE FROM entries WHERE updated < ?", (cutoff,)).rowcount
+
+    def copy_to(self, path: str, raw_encryptor):
+        """Writes a copy of the store to a new file, encrypted with another encryptor (e.g. after a password
+        change). Keys keep their hashes, so aliases still point to their values."""
+
+        connection: sqlite3.Connection = sqlite3.connect(path)
+
+        try:
+            create_tables(connection)
+            session: encryptor.SessionKey = raw_encryptor.get_backup_session(kdf_profile=self._session.profile)
+
+            with self._lock, connection:
+                connection.executemany("INSERT INTO meta (name, value) VALUES (?, ?)", [
+                    ("salt", session.salt),
+                    ("profile", session.profile.encode()),
+                    ("check", raw_encryptor.encrypt_to_bytes(check_value, session=session)),
+                    ("key", raw_encryptor.encrypt_to_bytes(self._key.hex(), session=session))
+                ])
+                connection.executemany(
+                    "INSERT INTO entries (key, value, updated) VALUES (?, ?, ?)",
+                    ((key_hash, raw_encryptor.encrypt_to_bytes(
+                        self._encryptor.decrypt_bytes(value, session=self._session), session=session
+                    ), updated) for key_hash, value, updated in self._connection.execute(
+                        "SELECT key, value, updated FROM entries"
+                    ))
+                )
+                connection.executemany(
+                    "INSERT INTO aliases (alias, key) VALUES (?, ?)",
+                    self._connection.execute("SELECT alias, key FROM aliases")
+                )
+        finally:
+            connection.close()
+
+    def count(self) -> int:
+        """Returns the number of stored values."""
+
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            encryptor.BaseEncryptor.clear_key(self._key)
+            self._connection.close()
@@ -0,0 +1,211 @@
+"""
+Shinobu - Converse from anywhere, anytime.
+Copyright (C) 2026-present  Green (@greeeen-dev)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+class SecureFileWriter:
+    """Writes secure files on dedicated threads. If multiple writes are pending for the same file, only
+    the newest data is encrypted and written."""
+
+    def __init__(self, save_func, max_workers: int = 2):
+        self._save_func = save_func
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="shinobu-writer"
+        )
+        self._lock: threading.Lock = threading.Lock()
+        self._pending: dict[str, tuple] = {}
+        self._running: dict[str, Future] = {}
+        self._written: int = 0
+        self._coalesced: int = 0
+        self._closed: bool = False
+
+    @property
+    def pending(self) -> int:
+        """Number of files waiting to be written."""
+
+        with self._lock:
+            return len(self._pending)
+
+    @property
+    def written(self) -> int:
+        """Number of writes done by the writer."""
+
+        return self._written
+
+    @property
+    def coalesced(self) -> int:
+        """Number of writes that were skipped because newer data was submitted."""
+
+        return self._coalesced
+
+    def submit(self, filename: str, *args) -> Future:
+        """Queues a write. Returns a future that completes once the newest data for the file is written."""
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Writer is closed")
+
+            if filename in self._pending:
+                # Older data will never be written, so we'll only keep the newest
+                self._coalesced += 1
+
+            self._pending.update({filename: args})
+
+            # If the file is already being written, the running write will pick up the new data
+            future: Future | None = self._running.get(filename)
+            if not future:
+                future = self._executor.submit(self._run, filename)
+                self._running.update({filename: future})
+
+        return future
+
+    async def write(self, filename: str, *args):
+        """Queues a write and waits for it to complete."""
+
+        await asyncio.wrap_future(self.submit(filename, *args))
+
+    def _run(self, filename: str):
+        error: Exception | None = None
+
+        while True:
+            with self._lock:
+                args: tuple | None = self._pending.pop(filename, None)
+
+                if args is None:
+                    # Nothing left to write
+                    self._running.pop(filename, None)
+                    break
+
+            try:
+                self._save_func(filename, *args)
+            except Exception as e:
+                # We'll try again if newer data comes in, so only raise if this is the last write
+                error = e
+            else:
+                error = None
+
+                with self._lock:
+                    self._written += 1
+
+        if error:
+            raise error
+
+    async def flush(self):
+        """Waits for all pending writes to complete."""
+
+        while True:
+            with self._lock:
+                futures: list[Future] = list(self._running.values())
+
+            if len(futures) == 0:
+                break
+
+            await asyncio.gather(*[asyncio.wrap_future(future) for future in futures], return_exceptions=True)
+
+    def close(self):
+        """Writes any pending data and stops the writer. This blocks until all writes are done."""
+
+        with self._lock:
+            self._closed = True
+
+        self._executor.shutdown(wait=True)
+
+class SecureJournalWriter:
+    """Appends records to secure journals and compacts them on a single dedicated thread, so records are
+    always written in the order they were submitted."""
+
+    def __init__(self, append_func, compact_func):
+        self._append_func = append_func
+        self._compact_func = compact_func
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="shinobu-journal"
+        )
+        self._lock: threading.Lock = threading.Lock()
+        self._futures: set[Future] = set()
+        self._appended: int = 0
+        self._compacted: int = 0
+        self._closed: bool = False
+
+    @property
+    def appended(self) -> int:
+        """Number of records appended by the writer."""
+
+        return self._appended
+
+    @property
+    def compacted(self) -> int:
+        """Number of compactions done by the writer."""
+
+        return self._compacted
+
+    def _submit(self, func, *args) -> Future:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Writer is closed")
+
+            future: Future = self._executor.submit(func, *args)
+            self._futures.add(future)
+
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _append(self, filename: str, *args):
+        self._append_func(filename, *args)
+
+        with self._lock:
+            self._appended += 1
+
+    def _compact(self, filename: str, *args):
+        self._compact_func(filename, *args)
+
+        with self._lock:
+            self._compacted += 1
+
+    def append(self, filename: str, *args) -> Future:
+        """Queues a record to be appended to a journal."""
+
+        return self._submit(self._append, filename, *args)
+
+    def compact(self, filename: str, *args) -> Future:
+        """Queues a compaction. As all records submitted before this are appended first, the journal can
+        safely be discarded once the snapshot is written."""
+
+        return self._submit(self._compact, filename, *args)
+
+    async def flush(self):
+        """Waits for all queued records and compactions to complete."""
+
+        with self._lock:
+            futures: list[Future] = list(self._futures)
+
+        if len(futures) > 0:
+            await asyncio.gather(*[asyncio.wrap_future(future) for future in futures], return_exceptions=True)
+
+    def close(self):
+        """Writes any queued records and stops the writer. This blocks until all writes are done."""
+
+        with self._lock:
+            self._closed = True
+
+        self._executor.shutdown(wait=True)